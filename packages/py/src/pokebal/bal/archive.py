@@ -0,0 +1,298 @@
+"""Append-only archive of Block Access Lists.
+
+An archive keeps many blocks in one file instead of one JSON file per block.
+Each block is a record holding its SSZ encoding, compressed with zlib::
+
+    file   = "PBAL" version:u32 record*
+    record = block_number:u64 codec:u8 stored_length:u32 raw_length:u32
+             crc32:u32 payload
+
+Writing a block again appends a new record, which replaces the earlier one.
+A sidecar index, ``<archive>.idx``, maps block numbers to record offsets
+and is rewritten on ``close``. Records appended after the index was last
+written, for instance by a writer that did not close, are found by
+scanning from the end the index covers; a torn last record is dropped.
+
+``Archive`` memory-maps the file and reads the index into two arrays, so
+opening it costs one read of the index whatever the number of blocks.
+Blocks are decompressed and decoded only when accessed, either fully or as
+a lazy ``BlockAccessListView``. Full decodes pause the garbage collector,
+like ``TraceStore.load_block``.
+"""
+
+import mmap
+import os
+import struct
+import zlib
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .construct import gc_paused
+from .ssz import encode
+from .sszview import BlockAccessListView, decode
+from .types import BlockAccessList
+
+ARCHIVE_VERSION = 1
+
+INDEX_SUFFIX = ".idx"
+
+_MAGIC = b"PBAL"
+_INDEX_MAGIC = b"PBAI"
+# magic, version
+_FILE_HEADER = struct.Struct("<4sI")
+# block number, codec, stored length, raw length, crc32 of the stored payload
+_RECORD = struct.Struct("<QBIII")
+# magic, version, archive length covered, entry count
+_INDEX_HEADER = struct.Struct("<4sIQQ")
+
+_RAW = 0
+_ZLIB = 1
+
+
+def _scan(data: Any, start: int, end: int, offsets: Dict[int, int]) -> int:
+    """Add the records between ``start`` and ``end`` to ``offsets``.
+
+    Returns the end of the last complete record.
+    """
+    position = start
+    while position + _RECORD.size <= end:
+        block_number, _, stored, _, crc = _RECORD.unpack_from(data, position)
+        payload_end = position + _RECORD.size + stored
+        if payload_end > end:
+            break
+        if zlib.crc32(data[position + _RECORD.size : payload_end]) != crc:
+            break
+        offsets[block_number] = position
+        position = payload_end
+    return position
+
+
+def _read_index(path: str, data: Any) -> Tuple[array, array, int]:
+    """Read the sidecar index of an archive mapped as ``data``.
+
+    Returns sorted block numbers, their record offsets and the end of the
+    last complete record.
+    """
+    numbers, offsets, covered = array("Q"), array("Q"), _FILE_HEADER.size
+    index_path = path + INDEX_SUFFIX
+    if os.path.exists(index_path):
+        with open(index_path, "rb") as file:
+            raw = file.read()
+        if len(raw) < _INDEX_HEADER.size:
+            raise ValueError("Archive index is truncated")
+        magic, version, length, count = _INDEX_HEADER.unpack_from(raw, 0)
+        if magic != _INDEX_MAGIC or version != ARCHIVE_VERSION:
+            raise ValueError(f"Unsupported archive index version {version}")
+        if len(raw) < _INDEX_HEADER.size + 16 * count:
+            raise ValueError("Archive index is truncated")
+        # An index newer than the archive, e.g. after truncation, is ignored
+        if length <= len(data):
+            entries = array("Q", raw[_INDEX_HEADER.size : _INDEX_HEADER.size + 16 * count])
+            numbers, offsets, covered = entries[0::2], entries[1::2], length
+
+    tail: Dict[int, int] = {}
+    end = _scan(data, covered, len(data), tail)
+    if tail:
+        merged = dict(zip(numbers, offsets))
+        merged.update(tail)
+        numbers = array("Q", sorted(merged))
+        offsets = array("Q", (merged[number] for number in numbers))
+    return numbers, offsets, end
+
+
+def _write_index(path: str, numbers: Iterable[int], offsets: Dict[int, int], end: int) -> None:
+    entries = array("Q")
+    for number in numbers:
+        entries.extend((number, offsets[number]))
+    index_path = path + INDEX_SUFFIX
+    with open(index_path + ".tmp", "wb") as file:
+        file.write(_INDEX_HEADER.pack(_INDEX_MAGIC, ARCHIVE_VERSION, end, len(entries) // 2))
+        file.write(entries.tobytes())
+    os.replace(index_path + ".tmp", index_path)
+
+
+def _map(path: str) -> Any:
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _check_header(data: Any) -> None:
+    if len(data) < _FILE_HEADER.size:
+        raise ValueError("Not a BAL archive: file is too short")
+    magic, version = _FILE_HEADER.unpack_from(data, 0)
+    if magic != _MAGIC:
+        raise ValueError("Not a BAL archive")
+    if version != ARCHIVE_VERSION:
+        raise ValueError(f"Unsupported archive version {version}")
+
+
+class ArchiveWriter:
+    """Appends blocks to an archive file, creating it if needed.
+
+    The index is written on ``close``.
+
+    Args:
+        path: Archive file
+        level: zlib compression level, 0 to store blocks uncompressed
+    """
+
+    def __init__(self, path: str, level: int = 6):
+        self.path = path
+        self.level = level
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, "wb") as file:
+                file.write(_FILE_HEADER.pack(_MAGIC, ARCHIVE_VERSION))
+
+        data = _map(path)
+        try:
+            _check_header(data)
+            numbers, offsets, end = _read_index(path, data)
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+        self._offsets = dict(zip(numbers, offsets))
+        self._file = open(path, "r+b")
+        # Drop a torn record left by an interrupted writer
+        self._file.truncate(end)
+        self._file.seek(end)
+        self._end = end
+
+    def write_block(self, block_number: int, bal: BlockAccessList) -> None:
+        raw = encode(bal)
+        if self.level:
+            codec, payload = _ZLIB, zlib.compress(raw, self.level)
+        else:
+            codec, payload = _RAW, raw
+        header = _RECORD.pack(block_number, codec, len(payload), len(raw), zlib.crc32(payload))
+        self._file.write(header)
+        self._file.write(payload)
+        self._offsets[block_number] = self._end
+        self._end += len(header) + len(payload)
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self._file.close()
+        _write_index(self.path, sorted(self._offsets), self._offsets, self._end)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Archive:
+    """Reads blocks from an archive file through a memory map.
+
+    Raises:
+        ValueError: If the file or its index is not a supported archive
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._data = _map(path)
+        _check_header(self._data)
+        self._numbers, self._offsets, _ = _read_index(path, self._data)
+
+    def __contains__(self, block_number: int) -> bool:
+        position = bisect_left(self._numbers, block_number)
+        return position < len(self._numbers) and self._numbers[position] == block_number
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def block_numbers(self) -> List[int]:
+        return self._numbers.tolist()
+
+    def _payload(self, offset: int) -> bytes:
+        _, codec, stored, raw_length, _ = _RECORD.unpack_from(self._data, offset)
+        start = offset + _RECORD.size
+        with memoryview(self._data) as data:
+            stored_payload = data[start : start + stored]
+            if codec == _ZLIB:
+                payload = zlib.decompress(stored_payload, bufsize=raw_length)
+            elif codec == _RAW:
+                payload = bytes(stored_payload)
+            else:
+                raise ValueError(f"Unknown codec {codec} at offset {offset}")
+            stored_payload.release()
+        return payload
+
+    def _offset(self, block_number: int) -> int:
+        position = bisect_left(self._numbers, block_number)
+        if position == len(self._numbers) or self._numbers[position] != block_number:
+            raise KeyError(f"Block {block_number} is not in the archive")
+        return self._offsets[position]
+
+    def encoded_block(self, block_number: int) -> bytes:
+        """Return the SSZ encoding of a block.
+
+        Raises:
+            KeyError: If the block is not in the archive
+        """
+        return self._payload(self._offset(block_number))
+
+    def load_block(self, block_number: int) -> BlockAccessList:
+        """Decode the BlockAccessList of a block.
+
+        Raises:
+            KeyError: If the block is not in the archive
+        """
+        payload = self.encoded_block(block_number)
+        with gc_paused():
+            return decode(payload)
+
+    def view(self, block_number: int) -> BlockAccessListView:
+        """Return a lazy view of a block, decoding only the accounts accessed.
+
+        Raises:
+            KeyError: If the block is not in the archive
+        """
+        return BlockAccessListView(self.encoded_block(block_number))
+
+    def iter_blocks(
+        self, start: Optional[int] = None, stop: Optional[int] = None
+    ) -> Iterator[Tuple[int, BlockAccessList]]:
+        """Yield ``(block_number, bal)`` for blocks in ``[start, stop)``, in order."""
+        for block_number, offset in self._range(start, stop):
+            payload = self._payload(offset)
+            with gc_paused():
+                bal = decode(payload)
+            yield block_number, bal
+
+    def iter_views(
+        self, start: Optional[int] = None, stop: Optional[int] = None
+    ) -> Iterator[Tuple[int, BlockAccessListView]]:
+        """Yield ``(block_number, view)`` for blocks in ``[start, stop)``, in order."""
+        for block_number, offset in self._range(start, stop):
+            yield block_number, BlockAccessListView(self._payload(offset))
+
+    def _range(self, start: Optional[int], stop: Optional[int]) -> Iterator[Tuple[int, int]]:
+        numbers = self._numbers
+        first = 0 if start is None else bisect_left(numbers, start)
+        last = len(numbers) if stop is None else bisect_left(numbers, stop)
+        return zip(numbers[first:last], self._offsets[first:last])
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_blocks(path: str, blocks: Iterable[Tuple[int, BlockAccessList]], level: int = 6) -> int:
+    """Append ``(block_number, bal)`` pairs to an archive, returning the count."""
+    count = 0
+    with ArchiveWriter(path, level) as writer:
+        for block_number, bal in blocks:
+            writer.write_block(block_number, bal)
+            count += 1
+    return count
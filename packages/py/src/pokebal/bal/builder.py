@@ -1,24 +1,30 @@
 """Builder for constructing Block Access Lists from execution traces."""
 
-from .types import (
-    BlockAccessList,
-    AccountBalanceDiff,
-    BalanceChange,
-    AccountAccess,
-    SlotAccess,
-    PerTxAccess,
-    AccountCodeDiff,
-    AccountNonce,
-    MAX_CODE_SIZE,
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from .merkle import hash_tree_root
+from .types import AccountChanges, BlockAccessList, MAX_CODE_SIZE, SlotChanges
+from pokebal.rpc.parallel import map_trace_slices
+from pokebal.rpc.types import (
+    AccountState,
+    TransactionTrace,
+    PrestateTransactionTrace,
+    BlockDebugTraceResult,
+    CompactAccountRecord,
+    CompactBlockTraceResult,
 )
-from .utils import encode_balance_delta
-from pokebal.rpc.types import TransactionTrace, BlockDebugTraceResult
 
 ZERO_WORD = "0x" + "0" * 64
 
 
 class BlockAccessListBuilder:
-    """Builds block access lists from transaction execution data."""
+    """Builds block access lists from transaction execution data.
+
+    Expects diff-mode prestate traces: ``pre`` holds the full state of every
+    touched account and ``post`` only the fields that changed. An account
+    missing from ``post`` was deleted, a field missing from a present ``post``
+    entry was left untouched.
+    """
 
     def __init__(self):
         """Initialize the builder."""
@@ -37,56 +43,45 @@ class BlockAccessListBuilder:
         """
         return account_state.storage if account_state and account_state.storage else {}
 
-    def _create_or_get(self, collection: list, key: str, factory_func, key_attr: str):
-        """Generic function to find existing item by key or create new one.
-
-        Pure functional approach - searches collection for item with matching key.
-        If found, returns existing item. If not found, creates new item using factory_func
-        and appends to collection.
+    def _touched_addresses(self, transaction_trace: TransactionTrace) -> list:
+        """Return all addresses in pre/post states in first-seen order."""
+        pre = transaction_trace.result.pre
+        post = transaction_trace.result.post
+        return list(pre.keys()) + [address for address in post if address not in pre]
 
-        Args:
-            collection: List to search in (e.g., self.bal.balance_diffs)
-            key: Key to match against item's key attribute
-            factory_func: Function that creates new item when called with key
-            key_attr: Attribute name to match against (e.g., "address", "slot")
+    def _post_field(
+        self, pre_state: AccountState, post_state: AccountState, field: str
+    ):
+        """Resolve a post-transaction field value from a diff-mode trace.
 
-        Returns:
-            Existing or newly created item from collection
+        Returns the post value when present, the pre value when the account
+        survived but the field did not change, and None for deleted accounts.
         """
-        # Search for existing item with matching key
-        for item in collection:
-            if getattr(item, key_attr) == key:
-                return item
-
-        # Create new item if none found
-        new_item = factory_func(key)
-        collection.append(new_item)
-        return new_item
+        if post_state is None:
+            return None
+        value = getattr(post_state, field)
+        if value is None and pre_state is not None:
+            return getattr(pre_state, field)
+        return value
 
     def add_balance_change(
         self, tx_index: int, transaction_trace: TransactionTrace
     ) -> None:
         """Add balance changes from a transaction trace.
 
-        Extracts balance changes from pre/post states and processes each one.
-        Composes pure functions to calculate, validate, and encode balance changes.
-        Only mutates state when valid, non-zero changes are detected.
+        Extracts balances from pre/post states and records the post-transaction
+        balance of every account whose balance changed.
 
         Args:
             tx_index: Transaction index in block
             transaction_trace: TransactionTrace containing pre/post states
-
-        Raises:
-            ValueError: If balance delta exceeds 12-byte two's complement range
         """
-        # Extract balance changes from transaction trace
-        all_addresses = set(transaction_trace.result.pre.keys()) | set(
-            transaction_trace.result.post.keys()
-        )
+        pre = transaction_trace.result.pre
+        post = transaction_trace.result.post
 
-        for address in all_addresses:
-            pre_state = transaction_trace.result.pre.get(address)
-            post_state = transaction_trace.result.post.get(address)
+        for address in self._touched_addresses(transaction_trace):
+            pre_state = pre.get(address)
+            post_state = post.get(address)
 
             # Extract balances, defaulting to 0 if not present
             pre_balance = 0
@@ -94,56 +89,41 @@ class BlockAccessListBuilder:
                 pre_balance = int(pre_state.balance, 16)
 
             post_balance = 0
-            if post_state and post_state.balance:
-                post_balance = int(post_state.balance, 16)
+            post_value = self._post_field(pre_state, post_state, "balance")
+            if post_value:
+                post_balance = int(post_value, 16)
 
             # Only process if there's a balance change
             if pre_balance != post_balance:
-                # Step 1: Calculate delta (pure function)
-                delta = post_balance - pre_balance
-
-                # Step 2: Encode delta as two's complement hex string
-                encoded_delta = encode_balance_delta(delta)
-
-                # Step 3: Create balance change entry (pure function, returns None if delta=0)
-                balance_change = BalanceChange(tx_index=tx_index, delta=encoded_delta)
-
-                # Step 4: Get or create AccountBalanceDiff and append balance change
-                account_diff = self._create_or_get(
-                    self.bal.balance_diffs,
-                    address,
-                    lambda addr: AccountBalanceDiff(address=addr),
-                    key_attr="address",
-                )
-                account_diff.changes.append(balance_change)
+                self.bal.add_balance_change(address, tx_index, post_balance)
 
     def add_account_access(
         self, tx_index: int, transaction_trace: TransactionTrace
     ) -> None:
-        """Add storage access information from a transaction trace.
+        """Add storage writes from a transaction trace.
 
-        Extracts storage accesses from pre/post states and processes each one.
-        Composes pure functions to identify, compare, and track storage changes.
-        Only mutates state when actual storage changes are detected.
+        Compares pre/post storage states and records each modified slot with
+        its post-transaction value.
 
         Args:
             tx_index: Transaction index in block
             transaction_trace: TransactionTrace containing pre/post states
 
         Note:
-            This tracks storage slot accesses by comparing pre/post storage states.
-            Each modified storage slot is recorded with its post-transaction value.
+            Diff-mode traces omit slots that were only read, so this records
+            writes only.
         """
 
         pre = transaction_trace.result.pre
         post = transaction_trace.result.post
-        touched_addresses = set(pre.keys()) | set(post.keys())
 
         # Step 1: Iterate over all touched addresses
-        for address in touched_addresses:
+        for address in self._touched_addresses(transaction_trace):
             pre_storage = self._get_storage(pre.get(address))
             post_storage = self._get_storage(post.get(address))
-            touched_slots = set(pre_storage.keys()) | set(post_storage.keys())
+            touched_slots = list(pre_storage.keys()) + [
+                slot for slot in post_storage if slot not in pre_storage
+            ]
 
             # Step 2: Iterate over all touched slots
             for slot in touched_slots:
@@ -160,45 +140,28 @@ class BlockAccessListBuilder:
                     post_value = ZERO_WORD
 
                 if is_write:
-                    # Step x: Create or get account access entry
-                    account_access = self._create_or_get(
-                        self.bal.account_accesses,
-                        address,
-                        lambda addr: AccountAccess(address=addr),
-                        key_attr="address",
-                    )
+                    # Step 3: Record the post-transaction value of the slot
+                    self.bal.add_storage_write(address, slot, tx_index, post_value)
 
-                    # Step x: Create or get slot access entry
-                    slot_access = self._create_or_get(
-                        account_access.accesses,
-                        slot,
-                        lambda slot_key: SlotAccess(slot=slot_key),
-                        key_attr="slot",
-                    )
-
-                    # Step x: Add per-transaction access to slot
-                    slot_access.accesses.append(
-                        PerTxAccess(tx_index=tx_index, value_after=post_value)
-                    )
-
-    def add_code_changes(self, transaction_trace: TransactionTrace) -> None:
+    def add_code_changes(
+        self, tx_index: int, transaction_trace: TransactionTrace
+    ) -> None:
         """Add code changes from a transaction trace.
 
         Args:
+            tx_index: Transaction index in block
             transaction_trace: TransactionTrace containing pre/post states
 
         Raises:
             ValueError: If code size exceeds MAX_CODE_SIZE limit
         """
-        # Extract all addresses that might have code changes
-        all_addresses = set(transaction_trace.result.pre.keys()) | set(
-            transaction_trace.result.post.keys()
-        )
+        pre = transaction_trace.result.pre
+        post = transaction_trace.result.post
 
         # Step 1: Iterate over all addresses in pre/post states
-        for address in all_addresses:
-            pre_state = transaction_trace.result.pre.get(address)
-            post_state = transaction_trace.result.post.get(address)
+        for address in self._touched_addresses(transaction_trace):
+            pre_state = pre.get(address)
+            post_state = post.get(address)
 
             # Step 2: Gather pre/post code.
             pre_code = None
@@ -211,65 +174,131 @@ class BlockAccessListBuilder:
 
             # Step 3: Check if code was changed
             if pre_code != post_code and post_code is not None:
-                # Validate code size
-                code_bytes = bytes.fromhex(post_code[2:])  # Remove '0x' prefix
-                if len(code_bytes) > MAX_CODE_SIZE:
+                # Validate code size, the hex was validated when parsing
+                code_size = (len(post_code) - 2) // 2  # Remove '0x' prefix
+                if code_size > MAX_CODE_SIZE:
                     raise ValueError(
-                        f"Code size {len(code_bytes)} exceeds maximum {MAX_CODE_SIZE} bytes"
+                        f"Code size {code_size} exceeds maximum {MAX_CODE_SIZE} bytes"
                     )
 
-                # Step 4: Update the code diff entry (last change wins)
-                code_diff = self._create_or_get(
-                    self.bal.code_diffs,
-                    address,
-                    lambda addr: AccountCodeDiff(address=addr, new_code=post_code),
-                    key_attr="address",
-                )
-                code_diff.new_code = post_code
+                # Step 4: Record the new code for this transaction
+                self.bal.add_code_change(address, tx_index, post_code)
 
-    def add_nonce_changes(self, transaction_trace: TransactionTrace) -> None:
+    def add_nonce_changes(
+        self, tx_index: int, transaction_trace: TransactionTrace
+    ) -> None:
         """Add nonce changes from a transaction trace.
 
-        Extracts nonce changes from pre/post states and processes each one.
-        Composes pure functions to identify, compare, and track nonce changes.
-        Only mutates state when actual nonce changes are detected.
+        Compares pre/post nonce values and records the post-transaction nonce
+        of every account whose nonce changed.
 
         Args:
+            tx_index: Transaction index in block
             transaction_trace: TransactionTrace containing pre/post states
-
-        Note:
-            This tracks nonce changes by comparing pre/post nonce values.
-            Only the final nonce value (post-transaction) is stored.
         """
-        # Extract all addresses that might have nonce changes
-        all_addresses = set(transaction_trace.result.pre.keys()) | set(
-            transaction_trace.result.post.keys()
-        )
+        pre = transaction_trace.result.pre
+        post = transaction_trace.result.post
 
         # Step 1: Iterate over all addresses in pre/post states
-        for address in all_addresses:
-            pre_state = transaction_trace.result.pre.get(address)
-            post_state = transaction_trace.result.post.get(address)
+        for address in self._touched_addresses(transaction_trace):
+            pre_state = pre.get(address)
+            post_state = post.get(address)
 
             # Step 2: Extract nonces, defaulting to 0 if not present
             pre_nonce = 0
             if pre_state and pre_state.nonce is not None:
                 pre_nonce = pre_state.nonce
 
-            post_nonce = 0
-            if post_state and post_state.nonce is not None:
-                post_nonce = post_state.nonce
+            post_nonce = self._post_field(pre_state, post_state, "nonce") or 0
 
             # Step 3: Check if nonce was changed
             if pre_nonce != post_nonce:
-                # Step 4: Update the nonce diff entry (last change wins)
-                nonce_diff = self._create_or_get(
-                    self.bal.nonce_diffs,
-                    address,
-                    lambda addr: AccountNonce(address=addr, nonce=post_nonce),
-                    key_attr="address",
+                self.bal.add_nonce_change(address, tx_index, post_nonce)
+
+    def add_storage_reads(
+        self, transaction_trace: TransactionTrace, prestate: PrestateTransactionTrace
+    ) -> None:
+        """Add storage reads by merging a diff-mode and a full prestate trace.
+
+        The full prestate lists every slot the transaction accessed, the
+        diff-mode trace every slot it changed. The difference is the set of
+        slots that were only read.
+
+        Args:
+            transaction_trace: Diff-mode TransactionTrace of the transaction
+            prestate: Full PrestateTransactionTrace of the same transaction
+        """
+        pre = transaction_trace.result.pre
+        post = transaction_trace.result.post
+
+        for address, account_state in prestate.result.items():
+            accessed = self._get_storage(account_state)
+            if not accessed:
+                continue
+
+            written = set(self._get_storage(pre.get(address))) | set(
+                self._get_storage(post.get(address))
+            )
+            for slot in accessed:
+                if slot not in written:
+                    self.bal.add_storage_read(address, slot)
+
+    def add_compact_record(self, tx_index: int, record: CompactAccountRecord) -> None:
+        """Add one account record from the compact BAL tracer.
+
+        Args:
+            tx_index: Transaction index in block
+            record: Account record holding post values of changed fields
+
+        Raises:
+            ValueError: If code size exceeds MAX_CODE_SIZE limit
+        """
+        address = record.address
+
+        if record.balance is not None:
+            self.bal.add_balance_change(address, tx_index, int(record.balance, 16))
+
+        if record.nonce is not None:
+            self.bal.add_nonce_change(address, tx_index, record.nonce)
+
+        if record.code is not None:
+            code_size = (len(record.code) - 2) // 2
+            if code_size > MAX_CODE_SIZE:
+                raise ValueError(
+                    f"Code size {code_size} exceeds maximum {MAX_CODE_SIZE} bytes"
                 )
-                nonce_diff.nonce = post_nonce
+            self.bal.add_code_change(address, tx_index, record.code)
+
+        for slot, value in record.storage_writes.items():
+            self.bal.add_storage_write(address, slot, tx_index, value)
+
+        for slot in record.storage_reads:
+            self.bal.add_storage_read(address, slot)
+
+    def prune_written_reads(self) -> None:
+        """Drop storage reads of slots that are also written in the block.
+
+        A slot that is both read and written is listed only under
+        ``storage_changes``.
+        """
+        for account in self.bal.account_changes:
+            written = {slot_changes.slot for slot_changes in account.storage_changes}
+            if not any(slot_read.slot in written for slot_read in account.storage_reads):
+                continue
+            account.storage_reads = [
+                slot_read
+                for slot_read in account.storage_reads
+                if slot_read.slot not in written
+            ]
+            self.bal.mark_changed(account.address)
+
+    def hash_tree_root(self) -> bytes:
+        """Return the SSZ hash tree root of the list built so far.
+
+        Subtree roots are cached, so calling this after every transaction
+        only re-hashes what the transaction changed.
+        """
+        return hash_tree_root(self.bal)
 
     def build(self) -> BlockAccessList:
         """Build the final BlockAccessList."""
@@ -279,7 +308,7 @@ class BlockAccessListBuilder:
 def from_execution_trace(trace_data: BlockDebugTraceResult) -> BlockAccessList:
     """Build BlockAccessList from execution trace data.
 
-    Processes each transaction trace to extract balance changes, storage accesses,
+    Processes each transaction trace to extract balance changes, storage writes,
     code changes, and nonce changes using functional programming approach.
 
     Args:
@@ -298,9 +327,138 @@ def from_execution_trace(trace_data: BlockDebugTraceResult) -> BlockAccessList:
         builder.add_account_access(tx_index, transaction_trace)
 
         # Process code changes from this transaction
-        builder.add_code_changes(transaction_trace)
+        builder.add_code_changes(tx_index, transaction_trace)
 
         # Process nonce changes from this transaction
-        builder.add_nonce_changes(transaction_trace)
+        builder.add_nonce_changes(tx_index, transaction_trace)
+
+    return builder.build()
+
+
+def from_compact_trace(trace_data: CompactBlockTraceResult) -> BlockAccessList:
+    """Build BlockAccessList from compact BAL tracer output.
 
+    Unlike diff-mode prestate traces, compact traces carry storage reads.
+
+    Args:
+        trace_data: CompactBlockTraceResult
+
+    Returns:
+        Complete BlockAccessList including storage reads
+    """
+    builder = BlockAccessListBuilder()
+
+    for tx_index, transaction_trace in enumerate(trace_data):
+        for record in transaction_trace.result:
+            builder.add_compact_record(tx_index, record)
+
+    builder.prune_written_reads()
     return builder.build()
+
+
+def from_merged_traces(
+    trace_pairs: Iterable[Tuple[TransactionTrace, PrestateTransactionTrace]],
+) -> BlockAccessList:
+    """Build BlockAccessList, including storage reads, from paired traces.
+
+    Consumes ``(diff_trace, full_prestate)`` pairs one transaction at a time,
+    as produced by ``EthereumMethods.trace_block_with_reads``.
+
+    Args:
+        trace_pairs: Diff-mode and full prestate trace of each transaction
+
+    Returns:
+        Complete BlockAccessList including storage reads
+    """
+    builder = BlockAccessListBuilder()
+
+    for tx_index, (transaction_trace, prestate) in enumerate(trace_pairs):
+        builder.add_balance_change(tx_index, transaction_trace)
+        builder.add_account_access(tx_index, transaction_trace)
+        builder.add_code_changes(tx_index, transaction_trace)
+        builder.add_nonce_changes(tx_index, transaction_trace)
+        builder.add_storage_reads(transaction_trace, prestate)
+
+    builder.prune_written_reads()
+    return builder.build()
+
+
+def merge_access_lists(parts: Iterable[Tuple[int, BlockAccessList]]) -> BlockAccessList:
+    """Merge BlockAccessLists built from consecutive runs of transactions.
+
+    The result equals building the whole block at once. Parts are consumed,
+    their entries are moved into the merged list.
+
+    Args:
+        parts: ``(tx_count, bal)`` for each run, in block order. Transaction
+            indices of each ``bal`` start at 0
+
+    Returns:
+        BlockAccessList of the whole block
+    """
+    merged = BlockAccessList()
+    accounts: Dict[str, AccountChanges] = {}
+    slots: Dict[Tuple[str, str], SlotChanges] = {}
+    reads: Dict[str, Set[str]] = {}
+    offset = 0
+
+    for tx_count, bal in parts:
+        for account in bal.account_changes:
+            address = account.address
+            for change in account.balance_changes + account.nonce_changes + account.code_changes:
+                change.tx_index += offset
+            for slot_changes in account.storage_changes:
+                for change in slot_changes.changes:
+                    change.tx_index += offset
+
+            target = accounts.get(address)
+            if target is None:
+                target = accounts[address] = account
+                merged.account_changes.append(account)
+                reads[address] = {slot_read.slot for slot_read in account.storage_reads}
+                for slot_changes in account.storage_changes:
+                    slots[(address, slot_changes.slot)] = slot_changes
+                continue
+
+            target.balance_changes.extend(account.balance_changes)
+            target.nonce_changes.extend(account.nonce_changes)
+            target.code_changes.extend(account.code_changes)
+            for slot_changes in account.storage_changes:
+                existing = slots.get((address, slot_changes.slot))
+                if existing is None:
+                    slots[(address, slot_changes.slot)] = slot_changes
+                    target.storage_changes.append(slot_changes)
+                else:
+                    existing.changes.extend(slot_changes.changes)
+            for slot_read in account.storage_reads:
+                if slot_read.slot not in reads[address]:
+                    reads[address].add(slot_read.slot)
+                    target.storage_reads.append(slot_read)
+
+        offset += tx_count
+
+    return merged
+
+
+def _build_slice(trace_data: BlockDebugTraceResult) -> Tuple[int, BlockAccessList]:
+    return len(trace_data), from_execution_trace(trace_data)
+
+
+def from_trace_body(body: bytes, workers: Optional[int] = None) -> BlockAccessList:
+    """Build BlockAccessList from a raw ``debug_traceBlockByNumber`` body.
+
+    Slices of the block are validated and built in parallel worker
+    processes, and only the per-slice access lists are merged here.
+
+    Args:
+        body: Raw JSON-RPC response body of a diff-mode prestate trace
+        workers: Worker processes, defaults to the number of CPUs
+
+    Returns:
+        Complete BlockAccessList with all tracked changes
+
+    Raises:
+        RPCError: If the body is an error response
+        ValueError: If the body is not a valid block trace
+    """
+    return merge_access_lists(map_trace_slices(body, _build_slice, workers))
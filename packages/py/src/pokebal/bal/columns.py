@@ -0,0 +1,169 @@
+"""Columnar export of BAL changes for vectorized analytics.
+
+Flattens Block Access Lists into one fixed-width row per change:
+
+============  =======  ====================================================
+column        type     content
+============  =======  ====================================================
+block_number  uint64   block of the change
+address       20 bytes account
+slot          32 bytes storage slot, zero for balance, nonce and code rows
+tx_index      uint32   transaction index, ``NO_TX`` for storage reads
+kind          uint8    ``ChangeKind``
+value         32 bytes new value, post balance or new nonce, big-endian so
+                       byte order sorts like the number; the code length for
+                       code changes; zero for storage reads
+============  =======  ====================================================
+
+``pack_rows`` writes the rows of many blocks into one buffer in a single
+pass. ``to_numpy`` views that buffer as a NumPy structured array without
+copying, and ``to_arrow`` and ``write_parquet`` turn the columns into an
+Arrow table. NumPy and pyarrow are optional and imported on use.
+"""
+
+import struct
+from enum import IntEnum
+from typing import Any, Iterable, List, Tuple
+
+from .types import BlockAccessList
+
+# tx_index of storage reads, which belong to no transaction
+NO_TX = 2**32 - 1
+
+ROW = struct.Struct("<Q20s32sIB32s")
+
+# Byte columns are raw void fields: NumPy strips trailing NUL bytes from
+# "S" strings when an element is read, which would shorten addresses and
+# slots and shift big-endian values
+DTYPE_FIELDS: List[Tuple[str, str]] = [
+    ("block_number", "<u8"),
+    ("address", "V20"),
+    ("slot", "V32"),
+    ("tx_index", "<u4"),
+    ("kind", "u1"),
+    ("value", "V32"),
+]
+
+_ZERO = bytes(32)
+
+
+class ChangeKind(IntEnum):
+    """Kind of change a row holds."""
+
+    STORAGE_WRITE = 0
+    STORAGE_READ = 1
+    BALANCE = 2
+    NONCE = 3
+    CODE = 4
+
+
+def _word(value: str) -> bytes:
+    return bytes.fromhex(value[2:]).rjust(32, b"\x00")
+
+
+def pack_rows(blocks: Iterable[Tuple[int, BlockAccessList]]) -> bytearray:
+    """Pack the changes of ``(block_number, bal)`` pairs into ``ROW`` records.
+
+    Rows follow the order of the lists: per account, storage writes,
+    storage reads, balance, nonce and code changes.
+    """
+    out = bytearray()
+    pack = ROW.pack
+    fromhex = bytes.fromhex
+    for block_number, bal in blocks:
+        for account in bal.account_changes:
+            address = fromhex(account.address[2:])
+            for slot_changes in account.storage_changes:
+                slot = _word(slot_changes.slot)
+                for change in slot_changes.changes:
+                    out += pack(
+                        block_number,
+                        address,
+                        slot,
+                        change.tx_index,
+                        ChangeKind.STORAGE_WRITE,
+                        _word(change.new_value),
+                    )
+            for slot_read in account.storage_reads:
+                out += pack(
+                    block_number,
+                    address,
+                    _word(slot_read.slot),
+                    NO_TX,
+                    ChangeKind.STORAGE_READ,
+                    _ZERO,
+                )
+            for change in account.balance_changes:
+                out += pack(
+                    block_number,
+                    address,
+                    _ZERO,
+                    change.tx_index,
+                    ChangeKind.BALANCE,
+                    change.post_balance.to_bytes(32, "big"),
+                )
+            for change in account.nonce_changes:
+                out += pack(
+                    block_number,
+                    address,
+                    _ZERO,
+                    change.tx_index,
+                    ChangeKind.NONCE,
+                    change.new_nonce.to_bytes(32, "big"),
+                )
+            for change in account.code_changes:
+                out += pack(
+                    block_number,
+                    address,
+                    _ZERO,
+                    change.tx_index,
+                    ChangeKind.CODE,
+                    ((len(change.new_code) - 2) // 2).to_bytes(32, "big"),
+                )
+    return out
+
+
+def to_numpy(blocks: Iterable[Tuple[int, BlockAccessList]]) -> Any:
+    """Return the changes of ``(block_number, bal)`` pairs as a structured array.
+
+    Requires NumPy. The array has the fields of ``DTYPE_FIELDS`` and shares
+    the buffer ``pack_rows`` filled.
+    """
+    import numpy
+
+    return numpy.frombuffer(pack_rows(blocks), dtype=numpy.dtype(DTYPE_FIELDS))
+
+
+def to_arrow(blocks: Iterable[Tuple[int, BlockAccessList]]) -> Any:
+    """Return the changes of ``(block_number, bal)`` pairs as an Arrow table.
+
+    Requires NumPy and pyarrow. Byte columns become fixed-size binary columns.
+    """
+    import numpy
+    import pyarrow
+
+    rows = to_numpy(blocks)
+    columns = {}
+    for name, dtype in DTYPE_FIELDS:
+        column = numpy.ascontiguousarray(rows[name])
+        if dtype.startswith("V"):
+            columns[name] = pyarrow.FixedSizeBinaryArray.from_buffers(
+                pyarrow.binary(column.itemsize),
+                len(column),
+                [None, pyarrow.py_buffer(column.tobytes())],
+            )
+        else:
+            columns[name] = pyarrow.array(column)
+    return pyarrow.table(columns)
+
+
+def write_parquet(blocks: Iterable[Tuple[int, BlockAccessList]], path: str) -> int:
+    """Write the changes of ``(block_number, bal)`` pairs to a Parquet file.
+
+    Requires NumPy and pyarrow. Returns the number of rows written.
+    """
+    import pyarrow.parquet
+
+    table = to_arrow(blocks)
+    pyarrow.parquet.write_table(table, path)
+    return table.num_rows
@@ -0,0 +1,67 @@
+"""Fast creation of models from decoded values.
+
+Binary decoders create millions of small models from values they already
+checked, so validating them again, or even ``model_construct`` with its
+per-field default handling, costs more than the decoding itself.
+``construct`` fills in a model directly. The ``*_FIELDS`` sets are the
+fields set on each BlockAccessList model when every field is given; they
+are shared between instances, which pydantic only ever adds those same
+names to.
+"""
+
+import gc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+from pydantic import BaseModel
+
+from .types import (
+    AccountChanges,
+    BalanceChange,
+    CodeChange,
+    NonceChange,
+    SlotChanges,
+    SlotRead,
+    StorageChange,
+)
+
+STORAGE_CHANGE_FIELDS = set(StorageChange.model_fields)
+BALANCE_CHANGE_FIELDS = set(BalanceChange.model_fields)
+NONCE_CHANGE_FIELDS = set(NonceChange.model_fields)
+CODE_CHANGE_FIELDS = set(CodeChange.model_fields)
+SLOT_READ_FIELDS = set(SlotRead.model_fields)
+SLOT_CHANGES_FIELDS = set(SlotChanges.model_fields)
+ACCOUNT_CHANGES_FIELDS = set(AccountChanges.model_fields)
+
+
+# Slot descriptors of BaseModel, faster to call than object.__setattr__
+_set_fields_set = BaseModel.__pydantic_fields_set__.__set__
+_set_extra = BaseModel.__pydantic_extra__.__set__
+_set_private = BaseModel.__pydantic_private__.__set__
+
+
+def construct(model: type, values: Dict[str, Any], fields_set: set) -> Any:
+    """Create a model from trusted values, like ``model_construct`` but
+    without its per-field default handling, which dominates decode time."""
+    instance = object.__new__(model)
+    object.__setattr__(instance, "__dict__", values)
+    _set_fields_set(instance, fields_set)
+    _set_extra(instance, None)
+    _set_private(instance, None)
+    return instance
+
+
+@contextmanager
+def gc_paused() -> Iterator[None]:
+    """Pause the cyclic garbage collector while decoding.
+
+    Decoding allocates many acyclic objects, which otherwise trigger
+    repeated collections that take as long as the decoding itself.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
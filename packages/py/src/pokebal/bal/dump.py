@@ -0,0 +1,235 @@
+"""Parallel ingestion of JSONL trace dumps.
+
+Bulk exports hold one JSON value per line, in block order. A line is either
+a single transaction trace carrying its block number::
+
+    {"blockNumber": 22739638, "txHash": "0x...", "result": {"pre": ..., "post": ...}}
+
+or a whole block, as a wrapped or bare ``debug_traceBlockByNumber`` result::
+
+    {"blockNumber": 22739638, "result": [{"txHash": "0x...", "result": ...}, ...]}
+    [{"txHash": "0x...", "result": ...}, ...]
+
+Consecutive lines with the same block number form one block. The file is
+memory-mapped, cut into ranges at line boundaries and parsed by a process
+pool, so multi-gigabyte dumps are validated on every core.
+``iter_dump_access_lists`` also builds the access lists in the workers, so
+only BALs are sent back rather than validated traces.
+"""
+
+import functools
+import itertools
+import json
+import mmap
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Iterator, List, Optional, Tuple
+
+from .builder import from_execution_trace, merge_access_lists
+from .types import BlockAccessList
+from pokebal.rpc.types import BlockDebugTraceResult, TransactionTrace
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+DumpBlock = Tuple[Optional[int], BlockDebugTraceResult]
+# Block number, transaction count and the BAL of a block or of its part in a range
+BuiltBlock = Tuple[Optional[int], int, BlockAccessList]
+BuildFunc = Callable[[BlockDebugTraceResult], BlockAccessList]
+
+
+def _block_number(value: Any) -> Optional[int]:
+    if value is None:
+        return None
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+def _parse_line(line: bytes) -> DumpBlock:
+    data = json.loads(line)
+    if isinstance(data, list):
+        return None, [TransactionTrace.model_validate(item) for item in data]
+    number = _block_number(data.get("blockNumber"))
+    if isinstance(data.get("result"), list):
+        return number, [TransactionTrace.model_validate(item) for item in data["result"]]
+    return number, [TransactionTrace.model_validate(data)]
+
+
+def _append(
+    blocks: List[DumpBlock], number: Optional[int], traces: BlockDebugTraceResult
+) -> None:
+    if blocks and number is not None and blocks[-1][0] == number:
+        blocks[-1][1].extend(traces)
+    else:
+        blocks.append((number, traces))
+
+
+def _parse_range(path: str, start: int, end: int) -> List[DumpBlock]:
+    """Parse the lines of ``[start, end)``, grouped into blocks."""
+    blocks: List[DumpBlock] = []
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            position = start
+            while position < end:
+                newline = data.find(b"\n", position, end)
+                line_end = end if newline < 0 else newline
+                line = data[position:line_end]
+                position = line_end + 1
+                if line.strip():
+                    _append(blocks, *_parse_line(line))
+    return blocks
+
+
+def _build_range(path: str, start: int, end: int, build: BuildFunc) -> List[BuiltBlock]:
+    """Parse the lines of ``[start, end)`` and build the BAL of each block."""
+    blocks = _parse_range(path, start, end)
+    return [(number, len(traces), build(traces)) for number, traces in blocks]
+
+
+def split_lines(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[Tuple[int, int]]:
+    """Cut a file into ``[start, end)`` ranges of about ``chunk_size`` bytes.
+
+    Every range ends just after a newline (or at the end of the file), so no
+    line is split between ranges.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    ranges = []
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = 0
+            while start < size:
+                end = min(start + chunk_size, size)
+                if end < size:
+                    newline = data.find(b"\n", end - 1)
+                    end = size if newline < 0 else newline + 1
+                ranges.append((start, end))
+                start = end
+    return ranges
+
+
+def iter_trace_dump(
+    path: str,
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    read_ahead: Optional[int] = None,
+) -> Iterator[DumpBlock]:
+    """Yield ``(block_number, traces)`` for every block of a JSONL dump.
+
+    Blocks are yielded in file order. ``block_number`` is None for bare
+    block lines, which carry no number.
+
+    Args:
+        path: JSONL dump file
+        workers: Parsing processes, 1 parses in this process. Defaults to the
+            number of CPUs
+        chunk_size: Approximate bytes handed to a worker at a time
+        read_ahead: Ranges parsed ahead of the consumer, which bounds memory.
+            Defaults to twice the number of workers
+
+    Raises:
+        ValueError: If a line is not valid JSON or not a valid trace
+    """
+    task = functools.partial(_parse_range, path)
+    yield from _merge_ranges(_map_ranges(path, task, workers, chunk_size, read_ahead))
+
+
+def _map_ranges(
+    path: str,
+    task: Callable[[int, int], Any],
+    workers: Optional[int],
+    chunk_size: int,
+    read_ahead: Optional[int],
+) -> Iterator[Any]:
+    """Yield ``task(start, end)`` for the ranges of a file, in file order."""
+    ranges = split_lines(path, chunk_size)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(ranges) <= 1:
+        yield from (task(start, end) for start, end in ranges)
+        return
+
+    read_ahead = read_ahead or 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from _bounded_map(pool, task, ranges, read_ahead)
+
+
+def _bounded_map(
+    pool: ProcessPoolExecutor,
+    task: Callable[[int, int], Any],
+    ranges: List[Tuple[int, int]],
+    read_ahead: int,
+) -> Iterator[Any]:
+    remaining = iter(ranges)
+    pending: Deque[Future] = deque(
+        pool.submit(task, start, end) for start, end in itertools.islice(remaining, read_ahead)
+    )
+    while pending:
+        result = pending.popleft().result()
+        next_range = next(remaining, None)
+        if next_range is not None:
+            pending.append(pool.submit(task, *next_range))
+        yield result
+
+
+def _merge_ranges(results: Iterator[List[DumpBlock]]) -> Iterator[DumpBlock]:
+    """Join blocks cut in two at a range boundary, yielding complete ones."""
+    current: Optional[DumpBlock] = None
+    for blocks in results:
+        for number, traces in blocks:
+            if current is not None and number is not None and current[0] == number:
+                current[1].extend(traces)
+                continue
+            if current is not None:
+                yield current
+            current = (number, traces)
+    if current is not None:
+        yield current
+
+
+def _merge_built(
+    results: Iterator[List[BuiltBlock]],
+) -> Iterator[Tuple[Optional[int], BlockAccessList]]:
+    """Join the BALs of blocks cut at a range boundary, yielding complete ones."""
+    number: Optional[int] = None
+    parts: List[Tuple[int, BlockAccessList]] = []
+    for blocks in results:
+        for block_number, tx_count, bal in blocks:
+            if parts and block_number is not None and number == block_number:
+                parts.append((tx_count, bal))
+                continue
+            if parts:
+                yield number, parts[0][1] if len(parts) == 1 else merge_access_lists(parts)
+            number, parts = block_number, [(tx_count, bal)]
+    if parts:
+        yield number, parts[0][1] if len(parts) == 1 else merge_access_lists(parts)
+
+
+def iter_dump_access_lists(
+    path: str,
+    build: BuildFunc = from_execution_trace,
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    read_ahead: Optional[int] = None,
+) -> Iterator[Tuple[Optional[int], BlockAccessList]]:
+    """Yield ``(block_number, BlockAccessList)`` for every block of a dump.
+
+    Each worker builds the BALs of the blocks in its range, and a block cut
+    at a range boundary is built in parts joined with ``merge_access_lists``.
+
+    Args:
+        path: JSONL dump file
+        build: Picklable function building a BAL from the traces of a block,
+            or of a run of its transactions with indices starting at 0. It
+            runs in the worker processes
+        workers: Building processes, 1 builds in this process. Defaults to
+            the number of CPUs
+        chunk_size: Approximate bytes handed to a worker at a time
+        read_ahead: Ranges built ahead of the consumer, which bounds memory.
+            Defaults to twice the number of workers
+
+    Raises:
+        ValueError: If a line is not valid JSON or not a valid trace
+    """
+    task = functools.partial(_build_range, path, build=build)
+    yield from _merge_built(_map_ranges(path, task, workers, chunk_size, read_ahead))
@@ -0,0 +1,336 @@
+"""Streaming JSON serialization and decoding of Block Access Lists.
+
+``model_dump_json`` builds the whole document as one string, which for a
+BlockAccessList near its limits is hundreds of megabytes. ``iter_json``
+produces the same bytes in chunks of about ``chunk_size``, formatting a
+few hundred entries at a time, so the extra memory stays bounded whatever
+the size of the list. ``write_json`` sends the chunks to a file or socket.
+
+The output is byte-identical to ``bal.model_dump_json()``: compact, fields
+in declaration order. Every string of a BlockAccessList is a hex string
+and every number an integer, so no value needs escaping.
+
+``iter_account_changes`` goes the other way: it reads a BAL document chunk
+by chunk and yields one ``AccountChanges`` as soon as its JSON is complete,
+holding only that account in memory.
+"""
+
+import codecs
+import json
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Union
+
+from .types import (
+    AccountChanges,
+    BalanceChange,
+    BlockAccessList,
+    CodeChange,
+    NonceChange,
+    SlotChanges,
+    SlotRead,
+    StorageChange,
+)
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Entries formatted at a time: about 25 KiB of storage changes, but up to
+# 12 MiB of maximum-size code changes
+_BATCH = 256
+
+
+def _batches(entries: List[Any], format_entry: Callable[[Any], str]) -> Iterator[str]:
+    """Yield the comma-separated JSON of ``entries``, ``_BATCH`` entries at a time."""
+    for start in range(0, len(entries), _BATCH):
+        batch = ",".join([format_entry(entry) for entry in entries[start : start + _BATCH]])
+        yield batch if start == 0 else "," + batch
+
+
+def _storage_change(change: Any) -> str:
+    return f'{{"tx_index":{change.tx_index},"new_value":"{change.new_value}"}}'
+
+
+def _slot_read(slot_read: Any) -> str:
+    return f'{{"slot":"{slot_read.slot}"}}'
+
+
+def _balance_change(change: Any) -> str:
+    return f'{{"tx_index":{change.tx_index},"post_balance":{change.post_balance}}}'
+
+
+def _nonce_change(change: Any) -> str:
+    return f'{{"tx_index":{change.tx_index},"new_nonce":{change.new_nonce}}}'
+
+
+def _code_change(change: Any) -> str:
+    return f'{{"tx_index":{change.tx_index},"new_code":"{change.new_code}"}}'
+
+
+def _account_pieces(account: AccountChanges) -> Iterator[str]:
+    """Yield the JSON of an account in pieces of at most ``_BATCH`` entries."""
+    yield f'{{"address":"{account.address}","storage_changes":['
+    separator = ""
+    for slot_changes in account.storage_changes:
+        yield f'{separator}{{"slot":"{slot_changes.slot}","changes":['
+        yield from _batches(slot_changes.changes, _storage_change)
+        yield "]}"
+        separator = ","
+    yield '],"storage_reads":['
+    yield from _batches(account.storage_reads, _slot_read)
+    yield '],"balance_changes":['
+    yield from _batches(account.balance_changes, _balance_change)
+    yield '],"nonce_changes":['
+    yield from _batches(account.nonce_changes, _nonce_change)
+    yield '],"code_changes":['
+    yield from _batches(account.code_changes, _code_change)
+    yield "]}"
+
+
+def iter_json(bal: BlockAccessList, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield the JSON of a BlockAccessList in chunks of about ``chunk_size`` bytes.
+
+    Chunks exceed ``chunk_size`` by at most one piece of ``_BATCH`` entries.
+    """
+    parts = ['{"account_changes":[']
+    size = len(parts[0])
+    separator = ""
+    for account in bal.account_changes:
+        if separator:
+            parts.append(separator)
+        separator = ","
+        for piece in _account_pieces(account):
+            parts.append(piece)
+            size += len(piece)
+            if size >= chunk_size:
+                yield "".join(parts).encode()
+                parts.clear()
+                size = 0
+    parts.append("]}")
+    yield "".join(parts).encode()
+
+
+def write_json(
+    bal: BlockAccessList, out: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> int:
+    """Write the JSON of a BlockAccessList to a binary file, returning its size."""
+    written = 0
+    for chunk in iter_json(bal, chunk_size):
+        out.write(chunk)
+        written += len(chunk)
+    return written
+
+
+################################
+#           DECODER            #
+################################
+
+_DECODER = json.JSONDecoder()
+
+
+def _chunks(source: Union[BinaryIO, Iterable[bytes]], chunk_size: int) -> Iterator[bytes]:
+    if hasattr(source, "read"):
+        return iter(lambda: source.read(chunk_size), b"")
+    return iter(source)
+
+
+class _Reader:
+    """Text of a JSON document read chunk by chunk, from ``position`` on."""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def fill(self, size: int = 1) -> bool:
+        """Read until ``size`` characters are unread, returning False at the end."""
+        if self.eof:
+            return False
+        texts = [self.buffer[self.position :]]
+        unread = len(texts[0])
+        while unread < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self.eof = True
+                texts.append(self._utf8.decode(b"", final=True))
+                break
+            text = self._utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+            texts.append(text)
+            unread += len(text)
+        self.buffer = "".join(texts)
+        self.position = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next character that is not whitespace, or "" at the end."""
+        while True:
+            buffer = self.buffer
+            while self.position < len(buffer) and buffer[self.position] in " \t\n\r":
+                self.position += 1
+            if self.position < len(buffer) or not self.fill():
+                return buffer[self.position : self.position + 1]
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at character {self.position} of the buffer")
+        self.position += 1
+
+    def value(self) -> Any:
+        """Decode the next value, reading more until it is complete."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError as exc:
+                # Read twice what is buffered, so a long value is re-parsed
+                # a logarithmic number of times
+                if not self.fill(2 * (len(self.buffer) - self.position) + 1):
+                    raise ValueError(f"Invalid JSON: {exc}") from None
+                continue
+            # A number may go on in the next chunk
+            unread = len(self.buffer) - self.position
+            if end == len(self.buffer) and isinstance(value, (int, float)):
+                if self.fill(unread + 1):
+                    continue
+            self.position = end
+            return value
+
+
+def _iter_array(reader: _Reader) -> Iterator[Any]:
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.position += 1
+        return
+    while True:
+        yield reader.value()
+        separator = reader.peek()
+        reader.position += 1
+        if separator == "]":
+            return
+        if separator != ",":
+            raise ValueError(f"Expected ',' or ']' in array, got {separator!r}")
+
+
+def _from_account_access(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert an ``AccountAccess`` of the web schema to the AccountChanges layout.
+
+    A slot whose accesses list no writes was only read.
+    """
+    storage_changes = []
+    storage_reads = []
+    for slot_access in item["accesses"]:
+        changes = [
+            {"tx_index": access["tx_index"], "new_value": access["value_after"]}
+            for access in slot_access["accesses"]
+        ]
+        if changes:
+            storage_changes.append({"slot": slot_access["slot"], "changes": changes})
+        else:
+            storage_reads.append({"slot": slot_access["slot"]})
+    return {
+        "address": item["address"],
+        "storage_changes": storage_changes,
+        "storage_reads": storage_reads,
+    }
+
+
+def _normalize(key: str, item: Dict[str, Any]) -> Dict[str, Any]:
+    """Bring an account of either layout to the AccountChanges layout.
+
+    Raises:
+        ValueError: If a field the conversion needs is missing or malformed
+    """
+    try:
+        if key == "account_accesses":
+            item = _from_account_access(item)
+        reads = item.get("storage_reads")
+        if reads and isinstance(reads[0], str):
+            item["storage_reads"] = [{"slot": slot} for slot in reads]
+    except (KeyError, TypeError, AttributeError) as exc:
+        raise ValueError(f"Malformed account in {key}: {exc!r}") from None
+    return item
+
+
+def _construct_account(item: Dict[str, Any]) -> AccountChanges:
+    """Create AccountChanges from decoded JSON without validating it."""
+    return AccountChanges.model_construct(
+        address=item["address"],
+        storage_changes=[
+            SlotChanges.model_construct(
+                slot=slot_changes["slot"],
+                changes=[
+                    StorageChange.model_construct(**change)
+                    for change in slot_changes.get("changes", [])
+                ],
+            )
+            for slot_changes in item.get("storage_changes", [])
+        ],
+        storage_reads=[SlotRead.model_construct(**read) for read in item.get("storage_reads", [])],
+        balance_changes=[
+            BalanceChange.model_construct(**change) for change in item.get("balance_changes", [])
+        ],
+        nonce_changes=[
+            NonceChange.model_construct(**change) for change in item.get("nonce_changes", [])
+        ],
+        code_changes=[
+            CodeChange.model_construct(**change) for change in item.get("code_changes", [])
+        ],
+    )
+
+
+def iter_account_changes(
+    source: Union[BinaryIO, Iterable[bytes]],
+    validate: bool = True,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[AccountChanges]:
+    """Yield the accounts of a BAL JSON document as it is read.
+
+    Accepts the ``account_changes`` layout of BlockAccessList and the
+    ``account_accesses`` layout of ``web/src/schema/block-access-list.json``,
+    whose slot accesses become storage changes. The other sections of that
+    schema hold balance deltas and pre-block nonces, which have no
+    AccountChanges equivalent, and are skipped. Slots without accesses
+    become storage reads. Storage reads may be slot objects or bare slot
+    strings.
+
+    Only one account is held at a time, so memory stays bounded by the
+    largest account and decoding can overlap with a download.
+
+    Args:
+        source: Binary file, or iterable of byte chunks such as
+            ``httpx.Response.iter_bytes()``
+        validate: Validate each account; otherwise accounts are created
+            from the decoded values as they are
+        chunk_size: Bytes read from a file at a time
+
+    Raises:
+        ValueError: If the document is not valid JSON of either layout, or
+            an account fails validation
+    """
+    reader = _Reader(_chunks(source, chunk_size))
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        if key in ("account_changes", "account_accesses"):
+            for item in _iter_array(reader):
+                if not isinstance(item, dict):
+                    raise ValueError(f"Expected an account object in {key}")
+                item = _normalize(key, item)
+                if validate:
+                    yield AccountChanges.model_validate(item)
+                    continue
+                try:
+                    account = _construct_account(item)
+                except (KeyError, TypeError) as exc:
+                    raise ValueError(f"Malformed account in {key}: {exc!r}") from None
+                yield account
+        else:
+            reader.value()
+        separator = reader.peek()
+        reader.position += 1
+        if separator == "}":
+            return
+        if separator != ",":
+            raise ValueError(f"Expected ',' or '}}' in object, got {separator!r}")
@@ -0,0 +1,309 @@
+"""SSZ hash tree root of Block Access Lists with cached subtree roots.
+
+``hash_tree_root`` merkleizes a BlockAccessList as ``BlockAccessListSedes``
+(sha256, as in the EIP) and keeps every list's Merkle tree on the list.
+Later calls re-hash only the paths of entries changed since: the add_*
+methods of BlockAccessList record which entries they returned, and
+accounts appended, removed or replaced in ``account_changes`` are detected.
+Other in-place edits must be reported with ``BlockAccessList.mark_changed``.
+
+Computing the root after every transaction of a streaming build therefore
+costs about as much as the changes of that transaction, and the block's
+root is ready right after its last one.
+"""
+
+import hashlib
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Set
+
+from .types import (
+    MAX_ACCOUNTS,
+    MAX_CODE_SIZE,
+    MAX_SLOTS,
+    MAX_TXS,
+    AccountChanges,
+    BlockAccessList,
+    SlotChanges,
+)
+
+CHUNK_SIZE = 32
+# Chunks of the largest code, the limit of CodeData's tree
+MAX_CODE_CHUNKS = (MAX_CODE_SIZE + CHUNK_SIZE - 1) // CHUNK_SIZE
+
+
+def hash_pair(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(left + right).digest()
+
+
+ZERO_HASHES = [b"\x00" * CHUNK_SIZE]
+for _ in range(64):
+    ZERO_HASHES.append(hash_pair(ZERO_HASHES[-1], ZERO_HASHES[-1]))
+
+
+def tree_depth(limit: int) -> int:
+    """Depth of the Merkle tree over at most ``limit`` chunks."""
+    return max(limit - 1, 0).bit_length()
+
+
+def mix_in_length(root: bytes, length: int) -> bytes:
+    return hash_pair(root, length.to_bytes(CHUNK_SIZE, "little"))
+
+
+def uint_chunk(value: int, size: int) -> bytes:
+    """Chunk of an SSZ unsigned integer of ``size`` bytes."""
+    return value.to_bytes(size, "little").ljust(CHUNK_SIZE, b"\x00")
+
+
+def merkleize(chunks: Sequence[bytes], limit: Optional[int] = None) -> bytes:
+    """Root of a Merkle tree over ``chunks``, padded with zero chunks to ``limit``."""
+    return ChunkTree(len(chunks) if limit is None else limit, chunks).root()
+
+
+class ChunkTree:
+    """Merkle tree over at most ``limit`` chunks that keeps all its layers.
+
+    Setting or appending a chunk re-hashes one path to the root, and the
+    branch of any chunk can be read off the layers. Positions past the last
+    chunk count as zero chunks.
+    """
+
+    def __init__(self, limit: int, chunks: Iterable[bytes] = ()):
+        self.depth = tree_depth(limit)
+        self.layers: List[List[bytes]] = [list(chunks)]
+        self._root: Optional[bytes] = None
+        while len(self.layers[-1]) > 1:
+            below = self.layers[-1]
+            level = len(self.layers) - 1
+            if len(below) % 2:
+                below = below + [ZERO_HASHES[level]]
+            self.layers.append(
+                [hash_pair(below[i], below[i + 1]) for i in range(0, len(below), 2)]
+            )
+
+    def __len__(self) -> int:
+        return len(self.layers[0])
+
+    def __setitem__(self, position: int, chunk: bytes) -> None:
+        """Replace a chunk, or append it when ``position`` is the length."""
+        self._root = None
+        leaves = self.layers[0]
+        if position == len(leaves):
+            leaves.append(chunk)
+        else:
+            leaves[position] = chunk
+
+        level = 0
+        while len(self.layers[level]) > 1:
+            layer = self.layers[level]
+            left = position & ~1
+            right = layer[left + 1] if left + 1 < len(layer) else ZERO_HASHES[level]
+            node = hash_pair(layer[left], right)
+            position //= 2
+            if level + 1 == len(self.layers):
+                self.layers.append([])
+            upper = self.layers[level + 1]
+            if position == len(upper):
+                upper.append(node)
+            else:
+                upper[position] = node
+            level += 1
+
+    def root(self) -> bytes:
+        if self._root is None:
+            if not self.layers[0]:
+                return ZERO_HASHES[self.depth]
+            node = self.layers[-1][0]
+            for level in range(len(self.layers) - 1, self.depth):
+                node = hash_pair(node, ZERO_HASHES[level])
+            self._root = node
+        return self._root
+
+    def branch(self, position: int) -> List[bytes]:
+        """Sibling hashes from the chunk at ``position`` up to the root."""
+        siblings = []
+        for level in range(self.depth):
+            sibling = position ^ 1
+            layer = self.layers[level] if level < len(self.layers) else []
+            siblings.append(layer[sibling] if sibling < len(layer) else ZERO_HASHES[level])
+            position //= 2
+        return siblings
+
+
+################################
+#        ELEMENT ROOTS         #
+################################
+
+
+def _chunk(value: str) -> bytes:
+    """Chunk of a hex byte vector of at most 32 bytes."""
+    return bytes.fromhex(value[2:]).ljust(CHUNK_SIZE, b"\x00")
+
+
+def storage_change_root(change: Any) -> bytes:
+    return hash_pair(uint_chunk(change.tx_index, 2), _chunk(change.new_value))
+
+
+def balance_change_root(change: Any) -> bytes:
+    return hash_pair(uint_chunk(change.tx_index, 2), uint_chunk(change.post_balance, 16))
+
+
+def nonce_change_root(change: Any) -> bytes:
+    return hash_pair(uint_chunk(change.tx_index, 2), uint_chunk(change.new_nonce, 8))
+
+
+def code_root(code: str) -> bytes:
+    data = bytes.fromhex(code[2:])
+    chunks = [
+        data[start : start + CHUNK_SIZE].ljust(CHUNK_SIZE, b"\x00")
+        for start in range(0, len(data), CHUNK_SIZE)
+    ]
+    return mix_in_length(merkleize(chunks, MAX_CODE_CHUNKS), len(data))
+
+
+def code_change_root(change: Any) -> bytes:
+    return hash_pair(uint_chunk(change.tx_index, 2), code_root(change.new_code))
+
+
+def slot_read_root(slot_read: Any) -> bytes:
+    return _chunk(slot_read.slot)
+
+
+def container_root(field_roots: Sequence[bytes]) -> bytes:
+    return merkleize(field_roots, 1 << tree_depth(len(field_roots)))
+
+
+################################
+#            CACHE             #
+################################
+
+# Fields of AccountChanges after the address, with their change tracking
+# name, tree limit and element root
+_ACCOUNT_LISTS = (
+    ("storage_changes", "slots", MAX_SLOTS),
+    ("storage_reads", "reads", MAX_SLOTS),
+    ("balance_changes", "balance", MAX_TXS),
+    ("nonce_changes", "nonce", MAX_TXS),
+    ("code_changes", "code", MAX_TXS),
+)
+
+
+class _ListTree:
+    """The tree of one list, with the list it was last synced with."""
+
+    def __init__(self, items: list, limit: int):
+        self.items = items
+        self.tree = ChunkTree(limit)
+        self._key: Optional[tuple] = None
+        self._root = b""
+
+    def root(self) -> bytes:
+        key = (self.tree.root(), len(self.tree))
+        if key != self._key:
+            self._key, self._root = key, mix_in_length(*key)
+        return self._root
+
+
+class MerkleCache:
+    """Trees of the lists of a BlockAccessList.
+
+    ``accounts`` is the tree of ``account_changes``. ``account_trees`` holds
+    the trees of each account's lists under their change tracking names,
+    ``(field, address)`` and ``("changes", address, slot)`` for the changes
+    of one slot.
+    """
+
+    def __init__(self):
+        self.accounts: Optional[_ListTree] = None
+        self.account_trees: Dict[str, Dict[Hashable, _ListTree]] = {}
+
+    @staticmethod
+    def sync(
+        entry: Optional[_ListTree],
+        items: list,
+        limit: int,
+        element_root: Callable[[Any], bytes],
+        positions: Iterable[int],
+    ) -> _ListTree:
+        """Bring the tree of a list up to date with its entries.
+
+        Re-hashes ``positions`` and any entries appended since the last sync,
+        or the whole list if it was replaced or shrank.
+        """
+        if entry is None or entry.items is not items or len(entry.tree) > len(items):
+            entry = _ListTree(items, limit)
+            positions = range(len(items))
+        else:
+            positions = sorted(set(positions) | set(range(len(entry.tree), len(items))))
+        for position in positions:
+            if position < len(items):
+                entry.tree[position] = element_root(items[position])
+        return entry
+
+    def account_root(self, account: AccountChanges, changed: Dict[Hashable, Set[int]]) -> bytes:
+        address = account.address
+        trees = self.account_trees.setdefault(address, {})
+
+        def sync(name: Hashable, items: list, limit: int, element_root: Callable) -> _ListTree:
+            tree = trees[name] = self.sync(
+                trees.get(name), items, limit, element_root, changed.pop(name, ())
+            )
+            return tree
+
+        def slot_root(slot_changes: SlotChanges) -> bytes:
+            name = ("changes", address, slot_changes.slot)
+            changes = sync(name, slot_changes.changes, MAX_TXS, storage_change_root)
+            return hash_pair(_chunk(slot_changes.slot), changes.root())
+
+        element_roots = {
+            "slots": slot_root,
+            "reads": slot_read_root,
+            "balance": balance_change_root,
+            "nonce": nonce_change_root,
+            "code": code_change_root,
+        }
+        field_roots = [_chunk(address)]
+        for field, name, limit in _ACCOUNT_LISTS:
+            tree = sync((name, address), getattr(account, field), limit, element_roots[name])
+            field_roots.append(tree.root())
+        return container_root(field_roots)
+
+    def update(self, bal: BlockAccessList) -> _ListTree:
+        """Re-hash what changed since the last update, returning the account tree."""
+        index = bal._index
+        changed, index.changed = index.changed, {}
+        for address in index.stale:
+            self.account_trees.pop(address, None)
+        index.stale = set()
+
+        accounts = bal.account_changes
+        if self.accounts is None or self.accounts.items is not accounts:
+            # A replaced list may hold other account objects at any position
+            self.account_trees.clear()
+        self.accounts = self.sync(
+            self.accounts,
+            accounts,
+            MAX_ACCOUNTS,
+            lambda account: self.account_root(account, changed),
+            changed.pop(None, ()),
+        )
+        return self.accounts
+
+
+def merkle_cache(bal: BlockAccessList) -> MerkleCache:
+    """Return the cache of ``bal``, brought up to date with its entries."""
+    index = bal._index
+    if index.merkle is None:
+        index.merkle = MerkleCache()
+        index.tracking = True
+        index.changed.clear()
+    index.merkle.update(bal)
+    return index.merkle
+
+
+def hash_tree_root(bal: BlockAccessList) -> bytes:
+    """Return the SSZ hash tree root of a BlockAccessList.
+
+    Equals ``ssz.get_hash_tree_root`` over ``to_ssz_value(bal)`` with
+    ``BlockAccessListSedes``. Subtree roots are cached on ``bal``, see the
+    module docstring for when they are invalidated.
+    """
+    return merkle_cache(bal).accounts.root()
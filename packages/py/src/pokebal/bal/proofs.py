@@ -0,0 +1,307 @@
+"""Merkle inclusion proofs for entries of a Block Access List.
+
+A proof shows that storage changes ``(address, slot, tx_index)`` or balance
+changes ``(address, tx_index)`` are part of the BlockAccessList with a given
+``hash_tree_root``. Every entry is proven together with the address of its
+account and the slot of its ``SlotChanges``, so a proof cannot move an
+entry to another account or slot.
+
+Nodes are identified by SSZ generalized indices: the root is 1 and the
+children of node ``i`` are ``2i`` and ``2i + 1``. Proofs of several entries
+are multiproofs, carrying each node needed by more than one entry once and
+leaving out the nodes the verifier computes itself.
+
+Proofs are read off the subtrees cached by ``pokebal.bal.merkle``, so once
+the list is hashed each entry costs a few tree branches, logarithmic in the
+size of the list.
+"""
+
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+from pydantic import BaseModel
+
+from pokebal.common.types import Address, Hash, StorageKey, TxIndex
+
+from .merkle import (
+    _ACCOUNT_LISTS,
+    ChunkTree,
+    _ListTree,
+    _chunk,
+    balance_change_root,
+    hash_pair,
+    merkle_cache,
+    storage_change_root,
+    tree_depth,
+    uint_chunk,
+)
+from .types import (
+    MAX_ACCOUNTS,
+    MAX_SLOTS,
+    MAX_TXS,
+    BalanceChange,
+    BlockAccessList,
+    StorageChange,
+    _address_of,
+    _slot_of,
+    _tx_index_of,
+)
+
+# Generalized index of the tree of ``account_changes``, below the length mix-in
+_ACCOUNTS_TREE = 2
+# Fields of AccountChanges and SlotChanges, padded to a power of two
+_ACCOUNT_FIELDS = 8
+_SLOT_FIELDS = 2
+_ADDRESS_FIELD = 0
+_STORAGE_CHANGES_FIELD = 1
+_BALANCE_CHANGES_FIELD = 3
+_SLOT_FIELD = 0
+_CHANGES_FIELD = 1
+
+
+class MultiProof(BaseModel):
+    """Inclusion proof of storage and balance changes of one BlockAccessList.
+
+    ``storage`` holds the positions of the account, the slot and the change
+    of each storage change, and ``balances`` those of the account and the
+    change of each balance change, in the order they were proven.
+    ``helpers`` are the node hashes the verifier cannot compute, ordered by
+    decreasing generalized index.
+    """
+
+    storage: List[Tuple[int, int, int]] = []
+    balances: List[Tuple[int, int]] = []
+    helpers: List[Hash] = []
+
+
+################################
+#      GENERALIZED INDICES     #
+################################
+
+
+def _child(parent: int, depth: int, position: int) -> int:
+    """Generalized index of a node ``depth`` levels below ``parent``."""
+    return (parent << depth) + position
+
+
+def _list_element(list_root: int, limit: int, position: int) -> int:
+    """Generalized index of an element of the list whose root is ``list_root``."""
+    return _child(2 * list_root, tree_depth(limit), position)
+
+
+def _account(position: int) -> int:
+    return _child(_ACCOUNTS_TREE, tree_depth(MAX_ACCOUNTS), position)
+
+
+def _account_field(account: int, field: int) -> int:
+    return _child(account, tree_depth(_ACCOUNT_FIELDS), field)
+
+
+def _storage_indices(positions: Tuple[int, int, int]) -> Tuple[int, int, int]:
+    """Generalized indices of the address, slot and change of a storage change."""
+    account_position, slot_position, change_position = positions
+    account = _account(account_position)
+    storage_changes = _account_field(account, _STORAGE_CHANGES_FIELD)
+    slot_changes = _list_element(storage_changes, MAX_SLOTS, slot_position)
+    changes = _child(slot_changes, tree_depth(_SLOT_FIELDS), _CHANGES_FIELD)
+    return (
+        _account_field(account, _ADDRESS_FIELD),
+        _child(slot_changes, tree_depth(_SLOT_FIELDS), _SLOT_FIELD),
+        _list_element(changes, MAX_TXS, change_position),
+    )
+
+
+def _balance_indices(positions: Tuple[int, int]) -> Tuple[int, int]:
+    """Generalized indices of the address and change of a balance change."""
+    account_position, change_position = positions
+    account = _account(account_position)
+    balance_changes = _account_field(account, _BALANCE_CHANGES_FIELD)
+    return (
+        _account_field(account, _ADDRESS_FIELD),
+        _list_element(balance_changes, MAX_TXS, change_position),
+    )
+
+
+def helper_indices(leaves: Iterable[int]) -> List[int]:
+    """Generalized indices of the nodes a multiproof of ``leaves`` carries.
+
+    These are the siblings of every node on the paths from the leaves to
+    the root, less the nodes on those paths, in decreasing order.
+    """
+    siblings: Set[int] = set()
+    paths: Set[int] = set()
+    for leaf in leaves:
+        while leaf > 1:
+            siblings.add(leaf ^ 1)
+            paths.add(leaf)
+            leaf //= 2
+    return sorted(siblings - paths, reverse=True)
+
+
+################################
+#            PROVER            #
+################################
+
+
+def _add_branch(nodes: Dict[int, bytes], tree: ChunkTree, root: int, position: int) -> None:
+    """Record the branch of a chunk of ``tree``, whose root is node ``root``."""
+    node = _child(root, tree.depth, position)
+    for sibling in tree.branch(position):
+        nodes[node ^ 1] = sibling
+        node //= 2
+
+
+def _add_list_branch(
+    nodes: Dict[int, bytes], list_root: int, entry: _ListTree, position: int
+) -> None:
+    """Record the branch of an element of a cached list, including its length."""
+    nodes[2 * list_root + 1] = uint_chunk(len(entry.tree), 32)
+    _add_branch(nodes, entry.tree, 2 * list_root, position)
+
+
+def prove(
+    bal: BlockAccessList,
+    storage: Sequence[Tuple[Address, StorageKey, TxIndex]] = (),
+    balances: Sequence[Tuple[Address, TxIndex]] = (),
+) -> MultiProof:
+    """Prove storage changes and balance changes of a BlockAccessList.
+
+    Args:
+        bal: The list, hashed incrementally as by ``hash_tree_root``
+        storage: ``(address, slot, tx_index)`` of each storage change
+        balances: ``(address, tx_index)`` of each balance change
+
+    Returns:
+        One proof of all the entries against ``hash_tree_root(bal)``
+
+    Raises:
+        KeyError: If an entry is not in the list
+    """
+    cache = merkle_cache(bal)
+    index = bal._index
+    nodes: Dict[int, bytes] = {}
+    leaves: List[int] = []
+
+    def find_account(address: Address) -> int:
+        position = index.find(None, bal.account_changes, _address_of, address)
+        if position is None:
+            raise KeyError(f"Account {address} is not in the access list")
+        account = _account(position)
+        trees = cache.account_trees[address]
+        _add_list_branch(nodes, 1, cache.accounts, position)
+        fields = ChunkTree(
+            _ACCOUNT_FIELDS,
+            [_chunk(address)] + [trees[(name, address)].root() for _, name, _ in _ACCOUNT_LISTS],
+        )
+        for field in range(len(fields)):
+            _add_branch(nodes, fields, account, field)
+        return position
+
+    proof = MultiProof()
+    for address, slot, tx_index in storage:
+        account_position = find_account(address)
+        account = bal.account_changes[account_position]
+        trees = cache.account_trees[address]
+        slot_position = index.find(("slots", address), account.storage_changes, _slot_of, slot)
+        if slot_position is None:
+            raise KeyError(f"Slot {slot} of {address} is not in the access list")
+        name = ("changes", address, slot)
+        changes = account.storage_changes[slot_position].changes
+        change_position = index.find(name, changes, _tx_index_of, tx_index)
+        if change_position is None:
+            raise KeyError(f"Slot {slot} of {address} has no change in tx {tx_index}")
+
+        positions = (account_position, slot_position, change_position)
+        address_leaf, slot_leaf, change_leaf = _storage_indices(positions)
+        storage_changes = _account_field(_account(account_position), _STORAGE_CHANGES_FIELD)
+        _add_list_branch(nodes, storage_changes, trees[("slots", address)], slot_position)
+        _add_list_branch(nodes, slot_leaf + 1, trees[name], change_position)
+        leaves.extend((address_leaf, slot_leaf, change_leaf))
+        proof.storage.append(positions)
+
+    for address, tx_index in balances:
+        account_position = find_account(address)
+        account = bal.account_changes[account_position]
+        entry = cache.account_trees[address][("balance", address)]
+        change_position = index.find(
+            ("balance", address), account.balance_changes, _tx_index_of, tx_index
+        )
+        if change_position is None:
+            raise KeyError(f"Account {address} has no balance change in tx {tx_index}")
+
+        positions = (account_position, change_position)
+        balance_changes = _account_field(_account(account_position), _BALANCE_CHANGES_FIELD)
+        _add_list_branch(nodes, balance_changes, entry, change_position)
+        leaves.extend(_balance_indices(positions))
+        proof.balances.append(positions)
+
+    proof.helpers = ["0x" + nodes[node].hex() for node in helper_indices(leaves)]
+    return proof
+
+
+################################
+#           VERIFIER           #
+################################
+
+
+def _root_of(nodes: Dict[int, bytes]) -> bytes:
+    """Hash a set of nodes up to the root, as in the SSZ multiproof spec."""
+    keys = sorted(nodes, reverse=True)
+    position = 0
+    while position < len(keys):
+        node = keys[position]
+        if node > 1 and node ^ 1 in nodes and node // 2 not in nodes:
+            left, right = nodes[node & ~1], nodes[node | 1]
+            nodes[node // 2] = hash_pair(left, right)
+            keys.append(node // 2)
+        position += 1
+    return nodes.get(1, b"")
+
+
+def verify(
+    root: bytes,
+    proof: MultiProof,
+    storage: Sequence[Tuple[Address, StorageKey, StorageChange]] = (),
+    balances: Sequence[Tuple[Address, BalanceChange]] = (),
+) -> bool:
+    """Check a proof of storage and balance changes against a root.
+
+    Args:
+        root: ``hash_tree_root`` of the BlockAccessList
+        proof: Proof from ``prove``
+        storage: ``(address, slot, change)`` of each proven storage change
+        balances: ``(address, change)`` of each proven balance change, both
+            in the order they were proven
+
+    Returns:
+        True if every entry is part of the list with that root
+    """
+    if len(storage) != len(proof.storage) or len(balances) != len(proof.balances):
+        return False
+
+    leaves: Dict[int, bytes] = {}
+
+    def add_leaf(node: int, value: bytes) -> bool:
+        return leaves.setdefault(node, value) == value
+
+    for (address, slot, change), positions in zip(storage, proof.storage):
+        address_leaf, slot_leaf, change_leaf = _storage_indices(positions)
+        if not (
+            add_leaf(address_leaf, _chunk(address))
+            and add_leaf(slot_leaf, _chunk(slot))
+            and add_leaf(change_leaf, storage_change_root(change))
+        ):
+            return False
+    for (address, change), positions in zip(balances, proof.balances):
+        address_leaf, change_leaf = _balance_indices(positions)
+        if not (
+            add_leaf(address_leaf, _chunk(address))
+            and add_leaf(change_leaf, balance_change_root(change))
+        ):
+            return False
+
+    helpers = helper_indices(leaves)
+    if len(helpers) != len(proof.helpers):
+        return False
+    nodes = dict(zip(helpers, (bytes.fromhex(helper[2:]) for helper in proof.helpers)))
+    nodes.update(leaves)
+    return _root_of(nodes) == root
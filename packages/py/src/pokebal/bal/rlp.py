@@ -0,0 +1,397 @@
+"""RLP encoding and header hash of Block Access Lists.
+
+Later revisions of EIP-7928 commit to the list in the block header as
+``keccak256(rlp(block_access_list))``, with the RLP layout::
+
+    AccountChanges = [address, storage_changes, storage_reads,
+                      balance_changes, nonce_changes, code_changes]
+    storage_changes = [[slot, [[tx_index, new_value], ...]], ...]
+    storage_reads = [slot, ...]
+    balance_changes = [[tx_index, post_balance], ...]
+    nonce_changes = [[tx_index, new_nonce], ...]
+    code_changes = [[tx_index, new_code], ...]
+
+Slots, storage values, balances, nonces and transaction indices are
+unsigned integers, encoded big-endian without leading zeros. Addresses and
+code are byte strings.
+
+``iter_encode`` sizes every list first, so it can write each length prefix
+ahead of its payload, then writes one account at a time into a reused
+buffer. ``block_access_list_hash`` feeds that buffer straight to keccak, so
+the hash never needs the whole encoding in memory. Lists are encoded in
+the order they have in the BlockAccessList.
+"""
+
+from typing import Iterator, List, Tuple
+
+from eth_hash.auto import keccak
+
+from .types import (
+    AccountChanges,
+    BalanceChange,
+    BlockAccessList,
+    CodeChange,
+    NonceChange,
+    SlotChanges,
+    SlotRead,
+    StorageChange,
+)
+
+# Address items are always 20 bytes long: 0x80 + 20
+_ADDRESS_PREFIX = b"\x94"
+
+# A decoded item: whether it is a list, and the bounds of its payload
+_Item = Tuple[bool, int, int]
+
+
+class EncodingError(ValueError):
+    """Raised when a value cannot be encoded as RLP."""
+
+
+class DecodingError(ValueError):
+    """Raised when bytes are not a canonical RLP encoding of a BlockAccessList."""
+
+
+################################
+#           ENCODER            #
+################################
+
+
+def _uint_size(value: int) -> int:
+    """Encoded size of an unsigned integer item."""
+    if value < 0x80:
+        if value < 0:
+            raise EncodingError(f"Negative value {value} cannot be encoded")
+        return 1
+    return 1 + (value.bit_length() + 7) // 8
+
+
+def _word(value: str) -> int:
+    return int(value, 16)
+
+
+def _prefix_size(length: int) -> int:
+    """Size of the length prefix of a string or list payload of ``length`` bytes."""
+    return 1 if length <= 55 else 1 + (length.bit_length() + 7) // 8
+
+
+def _code_size(code: str) -> int:
+    length = (len(code) - 2) // 2
+    if length == 1 and int(code[2:4], 16) < 0x80:
+        return 1
+    return _prefix_size(length) + length
+
+
+def _pair_size(first: int, second: int) -> int:
+    """Encoded size of the list ``[first, second]`` of two unsigned integers."""
+    payload = _uint_size(first) + _uint_size(second)
+    return _prefix_size(payload) + payload
+
+
+def _account_sizes(account: AccountChanges, sizes: List[int]) -> int:
+    """Append the payload sizes of an account's lists, returning its encoded size.
+
+    Sizes are appended in the order ``_write_account`` consumes them.
+    """
+    start = len(sizes)
+    sizes.append(0)
+
+    storage_start = len(sizes)
+    sizes.append(0)
+    storage = 0
+    for slot_changes in account.storage_changes:
+        slot_start = len(sizes)
+        sizes.extend((0, 0))
+        changes = sum(
+            _pair_size(change.tx_index, _word(change.new_value))
+            for change in slot_changes.changes
+        )
+        payload = _uint_size(_word(slot_changes.slot)) + _prefix_size(changes) + changes
+        sizes[slot_start : slot_start + 2] = (payload, changes)
+        storage += _prefix_size(payload) + payload
+    sizes[storage_start] = storage
+
+    reads = sum(_uint_size(_word(slot_read.slot)) for slot_read in account.storage_reads)
+    balances = sum(
+        _pair_size(change.tx_index, change.post_balance) for change in account.balance_changes
+    )
+    nonces = sum(_pair_size(change.tx_index, change.new_nonce) for change in account.nonce_changes)
+    codes = 0
+    for change in account.code_changes:
+        payload = _uint_size(change.tx_index) + _code_size(change.new_code)
+        codes += _prefix_size(payload) + payload
+    sizes.extend((reads, balances, nonces, codes))
+
+    lists = (storage, reads, balances, nonces, codes)
+    payload = len(_ADDRESS_PREFIX) + 20 + sum(_prefix_size(size) + size for size in lists)
+    sizes[start] = payload
+    return _prefix_size(payload) + payload
+
+
+def _write_prefix(out: bytearray, offset: int, length: int) -> None:
+    """Write the prefix of a string (``offset`` 0x80) or list (0xc0) payload."""
+    if length <= 55:
+        out.append(offset + length)
+    else:
+        length_bytes = length.to_bytes((length.bit_length() + 7) // 8, "big")
+        out.append(offset + 55 + len(length_bytes))
+        out += length_bytes
+
+
+def _write_uint(out: bytearray, value: int) -> None:
+    if value < 0x80:
+        out.append(0x80 if value == 0 else value)
+    else:
+        length = (value.bit_length() + 7) // 8
+        out.append(0x80 + length)
+        out += value.to_bytes(length, "big")
+
+
+def _write_pair(out: bytearray, first: int, second: int) -> None:
+    _write_prefix(out, 0xC0, _uint_size(first) + _uint_size(second))
+    _write_uint(out, first)
+    _write_uint(out, second)
+
+
+def _write_account(out: bytearray, account: AccountChanges, sizes: Iterator[int]) -> None:
+    fromhex = bytes.fromhex
+    _write_prefix(out, 0xC0, next(sizes))
+    out += _ADDRESS_PREFIX
+    out += fromhex(account.address[2:])
+
+    _write_prefix(out, 0xC0, next(sizes))
+    for slot_changes in account.storage_changes:
+        _write_prefix(out, 0xC0, next(sizes))
+        _write_uint(out, _word(slot_changes.slot))
+        _write_prefix(out, 0xC0, next(sizes))
+        for change in slot_changes.changes:
+            _write_pair(out, change.tx_index, _word(change.new_value))
+
+    _write_prefix(out, 0xC0, next(sizes))
+    for slot_read in account.storage_reads:
+        _write_uint(out, _word(slot_read.slot))
+
+    _write_prefix(out, 0xC0, next(sizes))
+    for change in account.balance_changes:
+        _write_pair(out, change.tx_index, change.post_balance)
+
+    _write_prefix(out, 0xC0, next(sizes))
+    for change in account.nonce_changes:
+        _write_pair(out, change.tx_index, change.new_nonce)
+
+    _write_prefix(out, 0xC0, next(sizes))
+    for change in account.code_changes:
+        code = fromhex(change.new_code[2:])
+        _write_prefix(out, 0xC0, _uint_size(change.tx_index) + _code_size(change.new_code))
+        _write_uint(out, change.tx_index)
+        if len(code) != 1 or code[0] >= 0x80:
+            _write_prefix(out, 0x80, len(code))
+        out += code
+
+
+def iter_encode(bal: BlockAccessList) -> Iterator[bytes]:
+    """Encode a BlockAccessList to RLP, one chunk per account.
+
+    Chunks are views of one reused buffer, valid until the next is taken.
+
+    Raises:
+        EncodingError: If a value is negative
+    """
+    sizes: List[int] = []
+    total = sum(_account_sizes(account, sizes) for account in bal.account_changes)
+
+    out = bytearray()
+    _write_prefix(out, 0xC0, total)
+    with memoryview(out) as chunk:
+        yield chunk
+
+    remaining = iter(sizes)
+    for account in bal.account_changes:
+        out.clear()
+        _write_account(out, account, remaining)
+        with memoryview(out) as chunk:
+            yield chunk
+
+
+def encode(bal: BlockAccessList) -> bytes:
+    """Encode a BlockAccessList to RLP.
+
+    Raises:
+        EncodingError: If a value is negative
+    """
+    return b"".join(bytes(chunk) for chunk in iter_encode(bal))
+
+
+def block_access_list_hash(bal: BlockAccessList) -> bytes:
+    """Return ``keccak256(rlp(bal))``, the hash committed to in the block header.
+
+    Hashes the encoding as it is written, without building it in full.
+
+    Raises:
+        EncodingError: If a value is negative
+    """
+    # ``keccak.new`` only takes bytes, but ``update`` takes the views as they are
+    hasher = keccak.new(b"")
+    for chunk in iter_encode(bal):
+        hasher.update(chunk)
+    return hasher.digest()
+
+
+################################
+#           DECODER            #
+################################
+
+
+def _item(data: memoryview, position: int, end: int) -> _Item:
+    """Read the item at ``position`` of a payload ending at ``end``."""
+    if position >= end:
+        raise DecodingError("Unexpected end of data")
+    first = data[position]
+    if first < 0x80:
+        return False, position, position + 1
+    if first < 0xB8:
+        start, length = position + 1, first - 0x80
+        if length == 1 and start < end and data[start] < 0x80:
+            raise DecodingError("Single byte below 0x80 must not have a prefix")
+        is_list = False
+    elif first < 0xC0:
+        start, length = _long_length(data, position, first - 0xB7, end)
+        is_list = False
+    elif first < 0xF8:
+        start, length = position + 1, first - 0xC0
+        is_list = True
+    else:
+        start, length = _long_length(data, position, first - 0xF7, end)
+        is_list = True
+    if start + length > end:
+        raise DecodingError("Item runs past the end of its list")
+    return is_list, start, start + length
+
+
+def _long_length(data: memoryview, position: int, length_size: int, end: int) -> Tuple[int, int]:
+    start = position + 1 + length_size
+    if start > end:
+        raise DecodingError("Unexpected end of data")
+    length_bytes = data[position + 1 : start]
+    if length_bytes[0] == 0:
+        raise DecodingError("Length has leading zeros")
+    length = int.from_bytes(length_bytes, "big")
+    if length <= 55:
+        raise DecodingError("Length below 56 must use the short form")
+    return start, length
+
+
+def _list(data: memoryview, start: int, end: int) -> List[_Item]:
+    """Read the items of the list payload ``data[start:end]``."""
+    items = []
+    while start < end:
+        item = _item(data, start, end)
+        items.append(item)
+        start = item[2]
+    return items
+
+
+def _expect_list(
+    item: _Item, data: memoryview, name: str, count: int = -1
+) -> List[_Item]:
+    is_list, start, end = item
+    if not is_list:
+        raise DecodingError(f"{name} must be a list")
+    items = _list(data, start, end)
+    if count >= 0 and len(items) != count:
+        raise DecodingError(f"{name} must have {count} items, not {len(items)}")
+    return items
+
+
+def _uint(item: _Item, data: memoryview, name: str, size: int) -> int:
+    is_list, start, end = item
+    if is_list:
+        raise DecodingError(f"{name} must be an integer")
+    if end - start > size:
+        raise DecodingError(f"{name} exceeds {size} bytes")
+    if end > start and data[start] == 0:
+        raise DecodingError(f"{name} has leading zeros")
+    return int.from_bytes(data[start:end], "big")
+
+
+def _string(item: _Item, data: memoryview, name: str) -> bytes:
+    is_list, start, end = item
+    if is_list:
+        raise DecodingError(f"{name} must be a byte string")
+    return bytes(data[start:end])
+
+
+def _hex_word(value: int) -> str:
+    return "0x" + value.to_bytes(32, "big").hex()
+
+
+def _pairs(item: _Item, data: memoryview, name: str, size: int) -> List[Tuple[int, int]]:
+    pairs = []
+    for pair in _expect_list(item, data, name):
+        tx_index, value = _expect_list(pair, data, name, 2)
+        pairs.append((_uint(tx_index, data, "tx_index", 8), _uint(value, data, name, size)))
+    return pairs
+
+
+def _decode_account(item: _Item, data: memoryview) -> AccountChanges:
+    fields = _expect_list(item, data, "AccountChanges", 6)
+    address = _string(fields[0], data, "address")
+    if len(address) != 20:
+        raise DecodingError(f"address must be 20 bytes, not {len(address)}")
+
+    storage_changes = []
+    for slot_item in _expect_list(fields[1], data, "storage_changes"):
+        slot, changes = _expect_list(slot_item, data, "SlotChanges", 2)
+        storage_changes.append(
+            SlotChanges(
+                slot=_hex_word(_uint(slot, data, "slot", 32)),
+                changes=[
+                    StorageChange(tx_index=tx_index, new_value=_hex_word(value))
+                    for tx_index, value in _pairs(changes, data, "new_value", 32)
+                ],
+            )
+        )
+
+    code_changes = []
+    for change in _expect_list(fields[5], data, "code_changes"):
+        tx_index, code = _expect_list(change, data, "CodeChange", 2)
+        code_changes.append(
+            CodeChange(
+                tx_index=_uint(tx_index, data, "tx_index", 8),
+                new_code="0x" + _string(code, data, "new_code").hex(),
+            )
+        )
+
+    return AccountChanges(
+        address="0x" + address.hex(),
+        storage_changes=storage_changes,
+        storage_reads=[
+            SlotRead(slot=_hex_word(_uint(slot, data, "slot", 32)))
+            for slot in _expect_list(fields[2], data, "storage_reads")
+        ],
+        balance_changes=[
+            BalanceChange(tx_index=tx_index, post_balance=post_balance)
+            for tx_index, post_balance in _pairs(fields[3], data, "post_balance", 32)
+        ],
+        nonce_changes=[
+            NonceChange(tx_index=tx_index, new_nonce=new_nonce)
+            for tx_index, new_nonce in _pairs(fields[4], data, "new_nonce", 8)
+        ],
+        code_changes=code_changes,
+    )
+
+
+def decode(data: bytes) -> BlockAccessList:
+    """Decode RLP bytes into a BlockAccessList.
+
+    Raises:
+        DecodingError: If the bytes are not a canonical encoding
+    """
+    view = memoryview(data)
+    item = _item(view, 0, len(view))
+    if item[2] != len(view):
+        raise DecodingError("Trailing bytes after the list")
+    accounts = _expect_list(item, view, "account_changes")
+    return BlockAccessList(
+        account_changes=[_decode_account(account, view) for account in accounts]
+    )
@@ -0,0 +1,275 @@
+"""SSZ encoding of Block Access Lists (EIP-7928).
+
+The sedes below mirror the EIP's SSZ containers and work with the generic
+``ssz`` package, through ``to_ssz_value`` and ``encode_generic``. ``encode``
+produces the same bytes without building the intermediate tuples: it sizes
+the whole list first, then packs every field straight from the pydantic
+models into one preallocated buffer.
+
+Lists are encoded in the order they have in the BlockAccessList.
+"""
+
+import struct
+from typing import Any, Tuple
+
+import ssz
+from ssz.sedes import ByteList, ByteVector, Container, List, bytes32, uint16, uint64, uint128
+
+from .types import (
+    MAX_ACCOUNTS,
+    MAX_CODE_SIZE,
+    MAX_SLOTS,
+    MAX_TXS,
+    AccountChanges,
+    BalanceChange,
+    BlockAccessList,
+    CodeChange,
+    NonceChange,
+    SlotChanges,
+    SlotRead,
+    StorageChange,
+)
+
+################################
+#            SEDES             #
+################################
+
+TxIndexSedes = uint16
+BalanceSedes = uint128
+NonceSedes = uint64
+AddressSedes = ByteVector(20)
+StorageKeySedes = bytes32
+StorageValueSedes = bytes32
+CodeDataSedes = ByteList(MAX_CODE_SIZE)
+
+StorageChangeSedes = Container((TxIndexSedes, StorageValueSedes))
+BalanceChangeSedes = Container((TxIndexSedes, BalanceSedes))
+NonceChangeSedes = Container((TxIndexSedes, NonceSedes))
+CodeChangeSedes = Container((TxIndexSedes, CodeDataSedes))
+SlotChangesSedes = Container((StorageKeySedes, List(StorageChangeSedes, MAX_TXS)))
+AccountChangesSedes = Container(
+    (
+        AddressSedes,
+        List(SlotChangesSedes, MAX_SLOTS),
+        List(StorageKeySedes, MAX_SLOTS),
+        List(BalanceChangeSedes, MAX_TXS),
+        List(NonceChangeSedes, MAX_TXS),
+        List(CodeChangeSedes, MAX_TXS),
+    )
+)
+BlockAccessListSedes = List(AccountChangesSedes, MAX_ACCOUNTS)
+
+
+def _bytes(value: str) -> bytes:
+    return bytes.fromhex(value[2:])
+
+
+def _hex(value: bytes) -> str:
+    return "0x" + bytes(value).hex()
+
+
+def to_ssz_value(bal: BlockAccessList) -> list:
+    """Convert a BlockAccessList to the nested values ``BlockAccessListSedes`` takes."""
+    return [
+        (
+            _bytes(account.address),
+            [
+                (
+                    _bytes(slot_changes.slot),
+                    [
+                        (change.tx_index, _bytes(change.new_value))
+                        for change in slot_changes.changes
+                    ],
+                )
+                for slot_changes in account.storage_changes
+            ],
+            [_bytes(slot_read.slot) for slot_read in account.storage_reads],
+            [(change.tx_index, change.post_balance) for change in account.balance_changes],
+            [(change.tx_index, change.new_nonce) for change in account.nonce_changes],
+            [(change.tx_index, _bytes(change.new_code)) for change in account.code_changes],
+        )
+        for account in bal.account_changes
+    ]
+
+
+def account_from_ssz_value(value: Tuple[Any, ...]) -> AccountChanges:
+    """Convert a decoded ``AccountChangesSedes`` value to AccountChanges."""
+    address, storage_changes, storage_reads, balances, nonces, codes = value
+    return AccountChanges(
+        address=_hex(address),
+        storage_changes=[
+            SlotChanges(
+                slot=_hex(slot),
+                changes=[
+                    StorageChange(tx_index=tx_index, new_value=_hex(new_value))
+                    for tx_index, new_value in changes
+                ],
+            )
+            for slot, changes in storage_changes
+        ],
+        storage_reads=[SlotRead(slot=_hex(slot)) for slot in storage_reads],
+        balance_changes=[
+            BalanceChange(tx_index=tx_index, post_balance=post_balance)
+            for tx_index, post_balance in balances
+        ],
+        nonce_changes=[
+            NonceChange(tx_index=tx_index, new_nonce=new_nonce) for tx_index, new_nonce in nonces
+        ],
+        code_changes=[
+            CodeChange(tx_index=tx_index, new_code=_hex(new_code)) for tx_index, new_code in codes
+        ],
+    )
+
+
+def encode_generic(bal: BlockAccessList) -> bytes:
+    """Encode with the generic ``ssz`` package, the reference for ``encode``."""
+    return ssz.encode(to_ssz_value(bal), BlockAccessListSedes)
+
+
+def decode_generic(data: bytes) -> BlockAccessList:
+    """Decode with the generic ``ssz`` package.
+
+    Raises:
+        ssz.DeserializationError: If the bytes are not a valid encoding
+    """
+    accounts = ssz.decode(data, BlockAccessListSedes)
+    return BlockAccessList(account_changes=[account_from_ssz_value(value) for value in accounts])
+
+
+################################
+#         FAST ENCODER         #
+################################
+
+_OFFSET = struct.Struct("<I")
+_STORAGE_CHANGE = struct.Struct("<H32s")
+_BALANCE_CHANGE = struct.Struct("<H16s")
+_NONCE_CHANGE = struct.Struct("<HQ")
+# tx_index and the offset of the code, which always follows at byte 6
+_CODE_CHANGE = struct.Struct("<HI")
+
+# Fixed part of AccountChanges: address and five list offsets
+_ACCOUNT_FIXED = 20 + 5 * _OFFSET.size
+# Fixed part of SlotChanges: slot and the offset of its changes
+_SLOT_FIXED = 32 + _OFFSET.size
+
+
+def _check_length(length: int, limit: int, name: str) -> None:
+    if length > limit:
+        raise ssz.SerializationError(f"{name} has {length} entries, more than {limit}")
+
+
+def _account_size(account: AccountChanges) -> int:
+    """Encoded size of an account, checking list limits on the way."""
+    storage_changes = account.storage_changes
+    _check_length(len(storage_changes), MAX_SLOTS, "storage_changes")
+    _check_length(len(account.storage_reads), MAX_SLOTS, "storage_reads")
+    _check_length(len(account.balance_changes), MAX_TXS, "balance_changes")
+    _check_length(len(account.nonce_changes), MAX_TXS, "nonce_changes")
+    _check_length(len(account.code_changes), MAX_TXS, "code_changes")
+
+    size = _ACCOUNT_FIXED
+    for slot_changes in storage_changes:
+        _check_length(len(slot_changes.changes), MAX_TXS, "changes")
+        size += _OFFSET.size + _SLOT_FIXED + _STORAGE_CHANGE.size * len(slot_changes.changes)
+    size += 32 * len(account.storage_reads)
+    size += _BALANCE_CHANGE.size * len(account.balance_changes)
+    size += _NONCE_CHANGE.size * len(account.nonce_changes)
+    for code_change in account.code_changes:
+        code_size = (len(code_change.new_code) - 2) // 2
+        if code_size > MAX_CODE_SIZE:
+            raise ssz.SerializationError(
+                f"Code size {code_size} exceeds maximum {MAX_CODE_SIZE} bytes"
+            )
+        size += _OFFSET.size + _CODE_CHANGE.size + code_size
+    return size
+
+
+def _fixed_bytes(value: str, size: int) -> bytes:
+    """Decode a hex value of exactly ``size`` bytes.
+
+    Slice assignment and ``pack_into`` would resize or pad a value of
+    another length, so it is checked before writing.
+    """
+    data = bytes.fromhex(value[2:])
+    if len(data) != size:
+        raise ssz.SerializationError(
+            f"Cannot serialize length {len(data)} byte-string as bytes{size}"
+        )
+    return data
+
+
+def _write_account(buffer: bytearray, start: int, account: AccountChanges) -> int:
+    """Write an account at ``start``, returning the position after it."""
+    fromhex = bytes.fromhex
+    buffer[start : start + 20] = _fixed_bytes(account.address, 20)
+    position = start + _ACCOUNT_FIXED
+
+    # storage_changes, a list of variable-size SlotChanges
+    _OFFSET.pack_into(buffer, start + 20, position - start)
+    table = position
+    position += _OFFSET.size * len(account.storage_changes)
+    for index, slot_changes in enumerate(account.storage_changes):
+        _OFFSET.pack_into(buffer, table + _OFFSET.size * index, position - table)
+        buffer[position : position + 32] = _fixed_bytes(slot_changes.slot, 32)
+        _OFFSET.pack_into(buffer, position + 32, _SLOT_FIXED)
+        position += _SLOT_FIXED
+        for change in slot_changes.changes:
+            _STORAGE_CHANGE.pack_into(
+                buffer, position, change.tx_index, _fixed_bytes(change.new_value, 32)
+            )
+            position += _STORAGE_CHANGE.size
+
+    _OFFSET.pack_into(buffer, start + 24, position - start)
+    for slot_read in account.storage_reads:
+        buffer[position : position + 32] = _fixed_bytes(slot_read.slot, 32)
+        position += 32
+
+    _OFFSET.pack_into(buffer, start + 28, position - start)
+    for change in account.balance_changes:
+        _BALANCE_CHANGE.pack_into(
+            buffer, position, change.tx_index, change.post_balance.to_bytes(16, "little")
+        )
+        position += _BALANCE_CHANGE.size
+
+    _OFFSET.pack_into(buffer, start + 32, position - start)
+    for change in account.nonce_changes:
+        _NONCE_CHANGE.pack_into(buffer, position, change.tx_index, change.new_nonce)
+        position += _NONCE_CHANGE.size
+
+    # code_changes, a list of variable-size CodeChange
+    _OFFSET.pack_into(buffer, start + 36, position - start)
+    table = position
+    position += _OFFSET.size * len(account.code_changes)
+    for index, change in enumerate(account.code_changes):
+        _OFFSET.pack_into(buffer, table + _OFFSET.size * index, position - table)
+        _CODE_CHANGE.pack_into(buffer, position, change.tx_index, _CODE_CHANGE.size)
+        code = fromhex(change.new_code[2:])
+        position += _CODE_CHANGE.size
+        buffer[position : position + len(code)] = code
+        position += len(code)
+    return position
+
+
+def encode(bal: BlockAccessList) -> bytes:
+    """Encode a BlockAccessList to SSZ.
+
+    Produces the same bytes as ``encode_generic``, several times faster.
+
+    Raises:
+        ssz.SerializationError: If a list exceeds its ``MAX_*`` limit or a
+            value does not fit its SSZ type
+    """
+    accounts = bal.account_changes
+    _check_length(len(accounts), MAX_ACCOUNTS, "account_changes")
+    sizes = [_account_size(account) for account in accounts]
+
+    position = _OFFSET.size * len(accounts)
+    total = position + sum(sizes)
+    buffer = bytearray(total)
+    try:
+        for index, account in enumerate(accounts):
+            _OFFSET.pack_into(buffer, _OFFSET.size * index, position)
+            position = _write_account(buffer, position, account)
+    except (struct.error, OverflowError, ValueError) as exc:
+        raise ssz.SerializationError(str(exc)) from exc
+    return bytes(buffer)
@@ -0,0 +1,312 @@
+"""Lazy, zero-copy views over SSZ-encoded Block Access Lists.
+
+``BlockAccessListView`` wraps the encoded bytes in a ``memoryview`` and only
+reads the offset table of the account list up front. Accounts, their slot
+changes and their change lists are decoded when accessed, so looking up a
+few accounts of a large BAL touches only their bytes. Every view can be
+materialized into the equivalent pydantic model.
+
+Offsets are checked as they are read. Malformed input raises
+``ssz.DeserializationError``. Entries are created without validating them
+again, since the fixed widths of their SSZ types already make every value
+valid.
+"""
+
+import struct
+from functools import cached_property
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+from ssz import DeserializationError
+
+from .construct import (
+    ACCOUNT_CHANGES_FIELDS,
+    BALANCE_CHANGE_FIELDS,
+    CODE_CHANGE_FIELDS,
+    NONCE_CHANGE_FIELDS,
+    SLOT_CHANGES_FIELDS,
+    SLOT_READ_FIELDS,
+    STORAGE_CHANGE_FIELDS,
+    construct,
+)
+from .ssz import (
+    _ACCOUNT_FIXED,
+    _BALANCE_CHANGE,
+    _CODE_CHANGE,
+    _NONCE_CHANGE,
+    _OFFSET,
+    _SLOT_FIXED,
+    _STORAGE_CHANGE,
+)
+from .types import (
+    MAX_ACCOUNTS,
+    MAX_CODE_SIZE,
+    MAX_SLOTS,
+    MAX_TXS,
+    AccountChanges,
+    BalanceChange,
+    BlockAccessList,
+    CodeChange,
+    NonceChange,
+    SlotChanges,
+    SlotRead,
+    StorageChange,
+)
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+def _hex(data: memoryview) -> str:
+    return "0x" + data.hex()
+
+
+def _offsets(data: memoryview, limit: int, name: str) -> List[int]:
+    """Read the offset table of a list of variable-size elements.
+
+    Returns the start of every element followed by the end of the list.
+    """
+    if len(data) == 0:
+        return [0]
+    if len(data) < _OFFSET.size:
+        raise DeserializationError(f"{name}: {len(data)} bytes is too short for an offset")
+    (first,) = _OFFSET.unpack_from(data, 0)
+    if first % _OFFSET.size or not 0 < first <= len(data):
+        raise DeserializationError(f"{name}: invalid first offset {first}")
+    count = first // _OFFSET.size
+    if count > limit:
+        raise DeserializationError(f"{name} has {count} entries, more than {limit}")
+    offsets = list(struct.unpack_from(f"<{count}I", data, 0))
+    offsets.append(len(data))
+    for start, end in zip(offsets, offsets[1:]):
+        if start > end:
+            raise DeserializationError(f"{name}: offsets are not increasing")
+    return offsets
+
+
+def _fixed_count(data: memoryview, size: int, limit: int, name: str) -> int:
+    """Number of elements of a list of fixed-size elements."""
+    count, remainder = divmod(len(data), size)
+    if remainder:
+        raise DeserializationError(f"{name}: {len(data)} bytes is not a multiple of {size}")
+    if count > limit:
+        raise DeserializationError(f"{name} has {count} entries, more than {limit}")
+    return count
+
+
+class SlotChangesView:
+    """Lazy view of one encoded ``SlotChanges``."""
+
+    def __init__(self, data: memoryview):
+        if len(data) < _SLOT_FIXED:
+            raise DeserializationError("SlotChanges: too short")
+        (offset,) = _OFFSET.unpack_from(data, 32)
+        if offset != _SLOT_FIXED:
+            raise DeserializationError(f"SlotChanges: invalid offset {offset}")
+        self._data = data
+
+    @cached_property
+    def slot(self) -> str:
+        return _hex(self._data[:32])
+
+    @cached_property
+    def changes(self) -> List[StorageChange]:
+        data = self._data[_SLOT_FIXED:]
+        _fixed_count(data, _STORAGE_CHANGE.size, MAX_TXS, "changes")
+        return [
+            construct(
+                StorageChange,
+                {"tx_index": tx_index, "new_value": "0x" + new_value.hex()},
+                STORAGE_CHANGE_FIELDS,
+            )
+            for tx_index, new_value in _STORAGE_CHANGE.iter_unpack(data)
+        ]
+
+    def materialize(self) -> SlotChanges:
+        return construct(
+            SlotChanges, {"slot": self.slot, "changes": self.changes}, SLOT_CHANGES_FIELDS
+        )
+
+
+class AccountChangesView:
+    """Lazy view of one encoded ``AccountChanges``.
+
+    Each field is decoded on first access and cached. Models returned by
+    ``materialize`` share the cached change entries.
+    """
+
+    def __init__(self, data: memoryview):
+        if len(data) < _ACCOUNT_FIXED:
+            raise DeserializationError("AccountChanges: too short")
+        offsets = list(struct.unpack_from("<5I", data, 20))
+        if offsets[0] != _ACCOUNT_FIXED:
+            raise DeserializationError(f"AccountChanges: invalid first offset {offsets[0]}")
+        offsets.append(len(data))
+        for start, end in zip(offsets, offsets[1:]):
+            if start > end:
+                raise DeserializationError("AccountChanges: offsets are not increasing")
+        self._data = data
+        self._offsets = offsets
+
+    def _field(self, index: int) -> memoryview:
+        return self._data[self._offsets[index] : self._offsets[index + 1]]
+
+    @cached_property
+    def address(self) -> str:
+        return _hex(self._data[:20])
+
+    @cached_property
+    def storage_changes(self) -> List[SlotChangesView]:
+        data = self._field(0)
+        offsets = _offsets(data, MAX_SLOTS, "storage_changes")
+        return [SlotChangesView(data[start:end]) for start, end in zip(offsets, offsets[1:])]
+
+    @cached_property
+    def storage_reads(self) -> List[SlotRead]:
+        data = self._field(1)
+        count = _fixed_count(data, 32, MAX_SLOTS, "storage_reads")
+        return [
+            construct(SlotRead, {"slot": _hex(data[32 * i : 32 * i + 32])}, SLOT_READ_FIELDS)
+            for i in range(count)
+        ]
+
+    @cached_property
+    def balance_changes(self) -> List[BalanceChange]:
+        data = self._field(2)
+        _fixed_count(data, _BALANCE_CHANGE.size, MAX_TXS, "balance_changes")
+        return [
+            construct(
+                BalanceChange,
+                {"tx_index": tx_index, "post_balance": int.from_bytes(balance, "little")},
+                BALANCE_CHANGE_FIELDS,
+            )
+            for tx_index, balance in _BALANCE_CHANGE.iter_unpack(data)
+        ]
+
+    @cached_property
+    def nonce_changes(self) -> List[NonceChange]:
+        data = self._field(3)
+        _fixed_count(data, _NONCE_CHANGE.size, MAX_TXS, "nonce_changes")
+        return [
+            construct(
+                NonceChange, {"tx_index": tx_index, "new_nonce": new_nonce}, NONCE_CHANGE_FIELDS
+            )
+            for tx_index, new_nonce in _NONCE_CHANGE.iter_unpack(data)
+        ]
+
+    @cached_property
+    def code_changes(self) -> List[CodeChange]:
+        data = self._field(4)
+        offsets = _offsets(data, MAX_TXS, "code_changes")
+        changes = []
+        for start, end in zip(offsets, offsets[1:]):
+            if end - start < _CODE_CHANGE.size:
+                raise DeserializationError("CodeChange: too short")
+            tx_index, code_offset = _CODE_CHANGE.unpack_from(data, start)
+            if code_offset != _CODE_CHANGE.size:
+                raise DeserializationError(f"CodeChange: invalid offset {code_offset}")
+            if end - start - _CODE_CHANGE.size > MAX_CODE_SIZE:
+                raise DeserializationError(f"CodeChange: code exceeds {MAX_CODE_SIZE} bytes")
+            code = data[start + _CODE_CHANGE.size : end]
+            changes.append(
+                construct(
+                    CodeChange, {"tx_index": tx_index, "new_code": _hex(code)}, CODE_CHANGE_FIELDS
+                )
+            )
+        return changes
+
+    def slot(self, slot: str) -> Optional[SlotChangesView]:
+        """Return the changes of one storage slot, or None if it was not written."""
+        key = bytes.fromhex(slot[2:])
+        for slot_changes in self.storage_changes:
+            if slot_changes._data[:32] == key:
+                return slot_changes
+        return None
+
+    def materialize(self) -> AccountChanges:
+        values = {
+            "address": self.address,
+            "storage_changes": [
+                slot_changes.materialize() for slot_changes in self.storage_changes
+            ],
+            "storage_reads": self.storage_reads,
+            "balance_changes": self.balance_changes,
+            "nonce_changes": self.nonce_changes,
+            "code_changes": self.code_changes,
+        }
+        return construct(AccountChanges, values, ACCOUNT_CHANGES_FIELDS)
+
+
+class BlockAccessListView(Sequence[AccountChangesView]):
+    """Lazy view of an SSZ-encoded BlockAccessList.
+
+    Indexing and iteration yield ``AccountChangesView`` objects in encoded
+    order. ``get`` looks an account up by address, reading only the 20
+    address bytes of each account the first time.
+
+    The view references the encoded bytes, which must not change while it
+    is in use.
+
+    Raises:
+        DeserializationError: If the account offset table is malformed
+    """
+
+    def __init__(self, data: Buffer):
+        self._data = memoryview(data).cast("B")
+        self._offsets = _offsets(self._data, MAX_ACCOUNTS, "account_changes")
+        self._accounts: Dict[int, AccountChangesView] = {}
+        self._addresses: Optional[Dict[bytes, int]] = None
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def _account(self, index: int) -> AccountChangesView:
+        account = self._accounts.get(index)
+        if account is None:
+            start, end = self._offsets[index], self._offsets[index + 1]
+            account = self._accounts[index] = AccountChangesView(self._data[start:end])
+        return account
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return [self._account(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("account index out of range")
+        return self._account(index)
+
+    def __iter__(self) -> Iterator[AccountChangesView]:
+        return (self._account(index) for index in range(len(self)))
+
+    def _address_index(self) -> Dict[bytes, int]:
+        if self._addresses is None:
+            data = self._data
+            addresses: Dict[bytes, int] = {}
+            for index, start in enumerate(self._offsets[:-1]):
+                if self._offsets[index + 1] - start < 20:
+                    raise DeserializationError("AccountChanges: too short")
+                addresses.setdefault(bytes(data[start : start + 20]), index)
+            self._addresses = addresses
+        return self._addresses
+
+    def get(self, address: str) -> Optional[AccountChangesView]:
+        """Return the account with ``address``, or None if it is not listed."""
+        index = self._address_index().get(bytes.fromhex(address[2:]))
+        return None if index is None else self._account(index)
+
+    def __contains__(self, address: object) -> bool:
+        if not isinstance(address, str):
+            return False
+        return bytes.fromhex(address[2:]) in self._address_index()
+
+    def materialize(self) -> BlockAccessList:
+        """Decode the whole list into a BlockAccessList."""
+        return BlockAccessList(account_changes=[account.materialize() for account in self])
+
+
+def decode(data: Buffer) -> BlockAccessList:
+    """Decode SSZ bytes into a BlockAccessList.
+
+    Raises:
+        DeserializationError: If the bytes are not a valid encoding
+    """
+    return BlockAccessListView(data).materialize()
@@ -0,0 +1,231 @@
+"""Opcode-level storage access extraction from streamed struct logs.
+
+The default struct logger of ``debug_traceBlockByNumber`` emits one entry per
+executed opcode, often gigabytes per block. ``from_struct_log_stream``
+consumes the raw response body chunk by chunk and replays the entries
+through a ``StructLogAccessTracker``. The tracker keeps a call-context stack,
+so only the current call frames are held in memory, never the log itself.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .builder import BlockAccessListBuilder
+from .types import BlockAccessList
+from pokebal.common.jsonstream import iter_json_items
+from pokebal.common.types import Address, StorageKey, StorageValue
+from pokebal.rpc.client import RPCError
+
+ADDRESS_MASK = (1 << 160) - 1
+
+CALL_OPS = {"CALL", "CALLCODE", "DELEGATECALL", "STATICCALL"}
+CREATE_OPS = {"CREATE", "CREATE2"}
+ACCOUNT_OPS = {"BALANCE", "EXTCODESIZE", "EXTCODECOPY", "EXTCODEHASH", "SELFDESTRUCT"}
+
+# Paths of the values consumed from a debug_traceBlockByNumber response
+STRUCT_LOG_PATTERNS = [
+    ("result", "*", "result", "structLogs", "*"),
+    ("result", "*", "result", "failed"),
+    ("error",),
+]
+
+SlotKey = Tuple[Any, StorageKey]
+
+
+def _to_address(word: str) -> Address:
+    """Convert a stack word to a 20-byte address."""
+    return f"0x{int(word, 16) & ADDRESS_MASK:040x}"
+
+
+def _to_word(word: str) -> str:
+    """Convert a minimal hex stack word to a 32-byte hex word."""
+    return f"0x{int(word, 16):064x}"
+
+
+class _PendingCreate:
+    """Placeholder context of a contract whose address is not yet known."""
+
+
+class _CallFrame:
+    """Storage accesses of one call frame, merged into its parent on return."""
+
+    __slots__ = ("context", "writes", "reads", "touched")
+
+    def __init__(self, context: Any):
+        self.context = context
+        self.writes: Dict[SlotKey, StorageValue] = {}
+        self.reads: Set[SlotKey] = set()
+        self.touched: Set[Any] = set()
+
+
+class StructLogAccessTracker:
+    """Replays struct log entries into a BlockAccessList.
+
+    SLOAD slots become reads, SSTORE slots writes holding the last stored
+    value. Writes of a reverted frame (or failed transaction) are demoted to
+    reads. BALANCE, EXTCODE*, SELFDESTRUCT and call targets are recorded as
+    touched accounts. Contexts of CREATE/CREATE2 frames are resolved from the
+    address pushed on the creator's stack when the frame returns.
+
+    Note:
+        Struct logs do not show original slot values, so an SSTORE that
+        rewrites the current value is still reported as a write.
+    """
+
+    def __init__(self):
+        self.builder = BlockAccessListBuilder()
+        self._tx_index: Optional[int] = None
+        self._frames: List[_CallFrame] = []
+        self._pending_call: Optional[Tuple[int, str, Any]] = None
+
+    def begin_transaction(self, tx_index: int, target: Address) -> None:
+        """Start a transaction whose top-level frame runs at ``target``."""
+        self._tx_index = tx_index
+        self._frames = [_CallFrame(target)]
+        self._frames[0].touched.add(target)
+        self._pending_call = None
+
+    def step(self, log: Dict[str, Any]) -> None:
+        """Process one struct log entry of the current transaction."""
+        depth = log["depth"]
+        stack = log.get("stack") or []
+
+        # Entering a frame: the previous step was a call one level up
+        if self._pending_call is not None:
+            call_depth, op, context = self._pending_call
+            self._pending_call = None
+            if depth == call_depth + 1:
+                self._frames.append(_CallFrame(context))
+
+        # Returning from frames: the call result is on top of the stack
+        while depth < len(self._frames):
+            self._return(stack[-1] if stack else "0x0")
+
+        frame = self._frames[-1]
+        op = log["op"]
+
+        if op == "SLOAD" and stack:
+            frame.reads.add((frame.context, _to_word(stack[-1])))
+        elif op == "SSTORE" and len(stack) >= 2:
+            frame.writes[(frame.context, _to_word(stack[-1]))] = _to_word(stack[-2])
+        elif op in ACCOUNT_OPS and stack:
+            frame.touched.add(_to_address(stack[-1]))
+        elif op in CALL_OPS and len(stack) >= 2:
+            target = _to_address(stack[-2])
+            frame.touched.add(target)
+            # Delegated code runs against the caller's storage
+            context = frame.context if op in ("DELEGATECALL", "CALLCODE") else target
+            self._pending_call = (depth, op, context)
+        elif op in CREATE_OPS:
+            self._pending_call = (depth, op, _PendingCreate())
+
+    def _return(self, result: str) -> None:
+        child = self._frames.pop()
+        parent = self._frames[-1]
+        succeeded = int(result, 16) != 0
+
+        if isinstance(child.context, _PendingCreate):
+            if succeeded:
+                self._resolve_create(child, child.context, _to_address(result))
+            else:
+                # The contract was never deployed, its storage has no address
+                self._drop_context(child, child.context)
+
+        parent.touched |= child.touched
+        parent.reads |= child.reads
+        if succeeded:
+            parent.writes.update(child.writes)
+        else:
+            parent.reads |= child.writes.keys()
+
+    def _resolve_create(
+        self, frame: _CallFrame, placeholder: _PendingCreate, address: Address
+    ) -> None:
+        def rekey(key: SlotKey) -> SlotKey:
+            context, slot = key
+            return (address if context is placeholder else context, slot)
+
+        frame.context = address
+        frame.touched = {address if item is placeholder else item for item in frame.touched}
+        frame.touched.add(address)
+        frame.reads = {rekey(key) for key in frame.reads}
+        frame.writes = {rekey(key): value for key, value in frame.writes.items()}
+
+    def _drop_context(self, frame: _CallFrame, placeholder: _PendingCreate) -> None:
+        frame.touched.discard(placeholder)
+        frame.reads = {key for key in frame.reads if key[0] is not placeholder}
+        frame.writes = {
+            key: value for key, value in frame.writes.items() if key[0] is not placeholder
+        }
+
+    def end_transaction(self, failed: bool = False) -> None:
+        """Finish the current transaction and record its accesses."""
+        while len(self._frames) > 1:
+            # Entries ended inside a nested frame (truncated log), keep its
+            # accesses but do not trust its writes
+            self._return("0x0")
+        root = self._frames[0]
+        bal = self.builder.bal
+
+        for address in sorted(root.touched):
+            bal.add_touched_account(address)
+
+        reads = set(root.reads)
+        if failed:
+            reads |= root.writes.keys()
+        else:
+            for (address, slot), value in root.writes.items():
+                bal.add_storage_write(address, slot, self._tx_index, value)
+
+        for address, slot in sorted(reads):
+            bal.add_storage_read(address, slot)
+
+        self._frames = []
+        self._tx_index = None
+
+    def build(self) -> BlockAccessList:
+        """Return the BlockAccessList with reads of written slots pruned."""
+        self.builder.prune_written_reads()
+        return self.builder.build()
+
+
+def from_struct_log_stream(
+    chunks: Iterable[bytes], tx_targets: Sequence[Address]
+) -> BlockAccessList:
+    """Build a BlockAccessList of storage accesses from a struct log response.
+
+    Args:
+        chunks: Raw JSON-RPC response body of ``debug_traceBlockByNumber``
+            with the default struct logger, e.g. from ``RPCClient.stream``
+        tx_targets: Address whose code the top-level frame of each
+            transaction runs, i.e. ``to`` or the created contract address
+
+    Returns:
+        BlockAccessList with storage reads, writes and touched accounts
+
+    Raises:
+        RPCError: If the node answered with an error
+    """
+    tracker = StructLogAccessTracker()
+    current: Optional[int] = None
+    failed = False
+
+    for path, value in iter_json_items(chunks, STRUCT_LOG_PATTERNS):
+        if path == ("error",):
+            raise RPCError(value)
+
+        tx_index = path[1]
+        if tx_index != current:
+            if current is not None:
+                tracker.end_transaction(failed)
+            tracker.begin_transaction(tx_index, tx_targets[tx_index])
+            current = tx_index
+            failed = False
+
+        if path[3] == "failed":
+            failed = value
+        else:
+            tracker.step(value)
+
+    if current is not None:
+        tracker.end_transaction(failed)
+    return tracker.build()
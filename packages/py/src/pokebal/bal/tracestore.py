@@ -0,0 +1,506 @@
+"""Normalized binary store of diff-mode prestate traces.
+
+Re-parsing JSON dominates rebuilding BALs from saved traces. A ``TraceStore``
+keeps every block in a compact binary record instead:
+
+* an address table (20 bytes each) and a slot table (32 bytes each), so each
+  address and slot key is stored once per block and referenced by index
+* fixed-width 32-byte balances, code hashes and storage values
+* contract code stored once per store, by content hash, in a separate file
+* an offset index per transaction, so a single transaction can be decoded
+
+A store is a directory with ``blocks.bin``, ``code.bin`` and ``index.json``.
+Decoding uses ``struct`` over a memory map and creates models without
+validating them again, which was done when writing. ``build_block`` skips
+the trace models altogether and builds the BlockAccessList straight from
+the binary record.
+
+Values are normalized: addresses and hex are lowercase, balances minimal hex
+and storage keys and values zero-padded to 32 bytes.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .builder import ZERO_WORD
+from .construct import construct, gc_paused
+from .types import BlockAccessList, MAX_CODE_SIZE
+from pokebal.rpc.types import (
+    AccountState,
+    BlockDebugTraceResult,
+    PrePostStates,
+    TransactionTrace,
+)
+
+INDEX_VERSION = 1
+
+BLOCKS_FILE = "blocks.bin"
+CODE_FILE = "code.bin"
+INDEX_FILE = "index.json"
+
+# tx_count, address count, slot count, code count
+_BLOCK_HEADER = struct.Struct("<IIII")
+# pre and post account counts, after the 32-byte tx hash
+_TX_HEADER = struct.Struct("<II")
+# address index, field flags
+_ACCOUNT_HEADER = struct.Struct("<IB")
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_SLOT_ENTRY = struct.Struct("<I32s")
+
+_HAS_BALANCE = 1
+_HAS_NONCE = 2
+_HAS_CODE = 4
+_HAS_CODE_HASH = 8
+_HAS_STORAGE = 16
+
+# A decoded account: address index, balance, nonce, code index, code hash
+# and storage as {slot index: 32-byte value}, each None when absent
+_RawAccount = Tuple[int, Any, Any, Any, Any, Any]
+_BALANCE, _NONCE, _CODE, _CODE_HASH, _STORAGE = range(1, 6)
+
+
+def _word(value: str) -> bytes:
+    return int(value, 16).to_bytes(32, "big")
+
+
+class _Interner:
+    """Assigns consecutive indices to distinct keys, in first-seen order."""
+
+    def __init__(self):
+        self.indices: Dict[Any, int] = {}
+
+    def __call__(self, key: Any) -> int:
+        index = self.indices.get(key)
+        if index is None:
+            index = self.indices[key] = len(self.indices)
+        return index
+
+
+class TraceStoreWriter:
+    """Writes blocks of traces to a TraceStore directory.
+
+    Writing to an existing store appends to it, and a block written again
+    replaces the earlier record. The index is written on ``close``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._blocks, self._codes = _read_index(path)
+        self._blocks_file = open(os.path.join(path, BLOCKS_FILE), "ab")
+        self._code_file = open(os.path.join(path, CODE_FILE), "ab")
+
+    def write_block(self, block_number: int, traces: BlockDebugTraceResult) -> None:
+        addresses = _Interner()
+        slots = _Interner()
+        codes = _Interner()
+        tx_records: List[bytes] = []
+
+        for trace in traces:
+            parts = [_word(trace.txHash)]
+            parts.append(_TX_HEADER.pack(len(trace.result.pre), len(trace.result.post)))
+            for states in (trace.result.pre, trace.result.post):
+                for address, state in states.items():
+                    parts.append(self._encode_account(address, state, addresses, slots, codes))
+            tx_records.append(b"".join(parts))
+
+        offsets = [0]
+        for record in tx_records:
+            offsets.append(offsets[-1] + len(record))
+
+        record = b"".join(
+            [
+                _BLOCK_HEADER.pack(
+                    len(tx_records), len(addresses.indices), len(slots.indices), len(codes.indices)
+                ),
+                b"".join(bytes.fromhex(address[2:]) for address in addresses.indices),
+                b"".join(slots.indices),
+                b"".join(codes.indices),
+                struct.pack(f"<{len(offsets)}I", *offsets),
+                *tx_records,
+            ]
+        )
+        offset = self._blocks_file.tell()
+        self._blocks_file.write(record)
+        self._blocks[block_number] = (offset, len(record))
+
+    def _encode_account(
+        self,
+        address: str,
+        state: AccountState,
+        addresses: _Interner,
+        slots: _Interner,
+        codes: _Interner,
+    ) -> bytes:
+        flags = 0
+        fields = []
+        if state.balance is not None:
+            flags |= _HAS_BALANCE
+            fields.append(_word(state.balance))
+        if state.nonce is not None:
+            flags |= _HAS_NONCE
+            fields.append(_U64.pack(state.nonce))
+        if state.code is not None:
+            flags |= _HAS_CODE
+            fields.append(_U32.pack(codes(self._put_code(state.code))))
+        if state.codeHash is not None:
+            flags |= _HAS_CODE_HASH
+            fields.append(_word(state.codeHash))
+        if state.storage is not None:
+            flags |= _HAS_STORAGE
+            fields.append(_U32.pack(len(state.storage)))
+            fields.extend(
+                _SLOT_ENTRY.pack(slots(_word(slot)), _word(value))
+                for slot, value in state.storage.items()
+            )
+        header = _ACCOUNT_HEADER.pack(addresses(address.lower()), flags)
+        return header + b"".join(fields)
+
+    def _put_code(self, code: str) -> bytes:
+        """Store code once per store, returning its content hash."""
+        data = bytes.fromhex(code[2:])
+        digest = hashlib.sha256(data).digest()
+        key = digest.hex()
+        if key not in self._codes:
+            self._codes[key] = (self._code_file.tell(), len(data))
+            self._code_file.write(data)
+        return digest
+
+    def close(self) -> None:
+        if self._blocks_file.closed:
+            return
+        self._blocks_file.close()
+        self._code_file.close()
+        index_path = os.path.join(self.path, INDEX_FILE)
+        index = {
+            "version": INDEX_VERSION,
+            "blocks": {str(number): entry for number, entry in self._blocks.items()},
+            "code": self._codes,
+        }
+        with open(index_path + ".tmp", "w") as file:
+            json.dump(index, file)
+        os.replace(index_path + ".tmp", index_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _read_index(
+    path: str,
+) -> Tuple[Dict[int, Tuple[int, int]], Dict[str, Tuple[int, int]]]:
+    index_path = os.path.join(path, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return {}, {}
+    with open(index_path) as file:
+        index = json.load(file)
+    if index.get("version") != INDEX_VERSION:
+        raise ValueError(f"Unsupported trace store version {index.get('version')}")
+    blocks = {int(number): tuple(entry) for number, entry in index["blocks"].items()}
+    codes = {key: tuple(entry) for key, entry in index["code"].items()}
+    return blocks, codes
+
+
+def _map(path: str) -> Any:
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class _BlockView:
+    """Decoding state of one block record."""
+
+    def __init__(self, store: "TraceStore", data: Any, offset: int):
+        self.data = data
+        tx_count, address_count, slot_count, code_count = _BLOCK_HEADER.unpack_from(
+            data, offset
+        )
+        position = offset + _BLOCK_HEADER.size
+        raw = data[position : position + 20 * address_count]
+        self.addresses = ["0x" + raw[i : i + 20].hex() for i in range(0, len(raw), 20)]
+        position += 20 * address_count
+        raw = data[position : position + 32 * slot_count]
+        self.slots = ["0x" + raw[i : i + 32].hex() for i in range(0, len(raw), 32)]
+        position += 32 * slot_count
+        raw = data[position : position + 32 * code_count]
+        self.codes = [store._code(raw[i : i + 32].hex()) for i in range(0, len(raw), 32)]
+        position += 32 * code_count
+        self.offsets = struct.unpack_from(f"<{tx_count + 1}I", data, position)
+        self.base = position + 4 * (tx_count + 1)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def _raw_transaction(self, index: int) -> Tuple[str, List[_RawAccount], List[_RawAccount]]:
+        data = self.data
+        position = self.base + self.offsets[index]
+        tx_hash = "0x" + data[position : position + 32].hex()
+        pre_count, post_count = _TX_HEADER.unpack_from(data, position + 32)
+        position += 32 + _TX_HEADER.size
+
+        states = []
+        for count in (pre_count, post_count):
+            accounts = []
+            for _ in range(count):
+                account, position = self._raw_account(position)
+                accounts.append(account)
+            states.append(accounts)
+        return tx_hash, states[0], states[1]
+
+    def _raw_account(self, position: int) -> Tuple[_RawAccount, int]:
+        data = self.data
+        address_index, flags = _ACCOUNT_HEADER.unpack_from(data, position)
+        position += _ACCOUNT_HEADER.size
+        balance = nonce = code = code_hash = storage = None
+        if flags & _HAS_BALANCE:
+            balance = int.from_bytes(data[position : position + 32], "big")
+            position += 32
+        if flags & _HAS_NONCE:
+            (nonce,) = _U64.unpack_from(data, position)
+            position += 8
+        if flags & _HAS_CODE:
+            (code,) = _U32.unpack_from(data, position)
+            position += 4
+        if flags & _HAS_CODE_HASH:
+            code_hash = data[position : position + 32]
+            position += 32
+        if flags & _HAS_STORAGE:
+            (count,) = _U32.unpack_from(data, position)
+            position += 4
+            end = position + count * _SLOT_ENTRY.size
+            storage = dict(_SLOT_ENTRY.iter_unpack(data[position:end]))
+            position = end
+        return (address_index, balance, nonce, code, code_hash, storage), position
+
+    def transaction(self, index: int) -> TransactionTrace:
+        tx_hash, pre, post = self._raw_transaction(index)
+        result = construct(
+            PrePostStates,
+            {"pre": self._states(pre), "post": self._states(post)},
+            {"pre", "post"},
+        )
+        return construct(
+            TransactionTrace, {"result": result, "txHash": tx_hash}, {"result", "txHash"}
+        )
+
+    def _states(self, accounts: List[_RawAccount]) -> Dict[str, AccountState]:
+        states = {}
+        slots = self.slots
+        for address_index, balance, nonce, code, code_hash, storage in accounts:
+            values = {
+                "balance": None if balance is None else hex(balance),
+                "code": None if code is None else self.codes[code],
+                "codeHash": None if code_hash is None else "0x" + code_hash.hex(),
+                "nonce": nonce,
+                "storage": None,
+            }
+            if storage is not None:
+                values["storage"] = {
+                    slots[slot_index]: "0x" + value.hex() for slot_index, value in storage.items()
+                }
+            fields_set = {field for field, value in values.items() if value is not None}
+            states[self.addresses[address_index]] = construct(AccountState, values, fields_set)
+        return states
+
+    def access_list(self) -> BlockAccessList:
+        """Build the block's BlockAccessList straight from the record.
+
+        Follows ``from_execution_trace`` step by step, including the order in
+        which accounts and slots are first recorded, but compares the interned
+        indices and integers of the record rather than hex strings, and
+        creates all models in one validation at the end.
+        """
+        accounts: Dict[int, Dict[str, Any]] = {}
+
+        def changes(address_index: int) -> Dict[str, Any]:
+            entry = accounts.get(address_index)
+            if entry is None:
+                entry = accounts[address_index] = {
+                    "storage": {},
+                    "balance": [],
+                    "code": [],
+                    "nonce": [],
+                }
+            return entry
+
+        for tx_index in range(len(self)):
+            _, pre_accounts, post_accounts = self._raw_transaction(tx_index)
+            pre = {account[0]: account for account in pre_accounts}
+            post = {account[0]: account for account in post_accounts}
+            touched = list(pre) + [address for address in post if address not in pre]
+
+            for address in touched:
+                pre_state, post_state = pre.get(address), post.get(address)
+                pre_balance = _field(pre_state, _BALANCE) or 0
+                post_balance = _post_field(pre_state, post_state, _BALANCE) or 0
+                if pre_balance != post_balance:
+                    changes(address)["balance"].append(
+                        {"tx_index": tx_index, "post_balance": post_balance}
+                    )
+
+            for address in touched:
+                pre_storage = _field(pre.get(address), _STORAGE) or {}
+                post_storage = _field(post.get(address), _STORAGE) or {}
+                touched_slots = list(pre_storage) + [
+                    slot for slot in post_storage if slot not in pre_storage
+                ]
+                for slot in touched_slots:
+                    pre_value = pre_storage.get(slot)
+                    post_value = post_storage.get(slot)
+                    if pre_value is not None and pre_value == post_value:
+                        continue
+                    new_value = ZERO_WORD if post_value is None else "0x" + post_value.hex()
+                    changes(address)["storage"].setdefault(slot, []).append(
+                        {"tx_index": tx_index, "new_value": new_value}
+                    )
+
+            for address in touched:
+                pre_code = _field(pre.get(address), _CODE)
+                post_code = _field(post.get(address), _CODE)
+                if post_code is not None and pre_code != post_code:
+                    code = self.codes[post_code]
+                    code_size = (len(code) - 2) // 2
+                    if code_size > MAX_CODE_SIZE:
+                        raise ValueError(
+                            f"Code size {code_size} exceeds maximum {MAX_CODE_SIZE} bytes"
+                        )
+                    changes(address)["code"].append({"tx_index": tx_index, "new_code": code})
+
+            for address in touched:
+                pre_state, post_state = pre.get(address), post.get(address)
+                pre_nonce = _field(pre_state, _NONCE) or 0
+                post_nonce = _post_field(pre_state, post_state, _NONCE) or 0
+                if pre_nonce != post_nonce:
+                    changes(address)["nonce"].append(
+                        {"tx_index": tx_index, "new_nonce": post_nonce}
+                    )
+
+        slots = self.slots
+        return BlockAccessList.model_validate(
+            {
+                "account_changes": [
+                    {
+                        "address": self.addresses[address_index],
+                        "storage_changes": [
+                            {"slot": slots[slot_index], "changes": slot_changes}
+                            for slot_index, slot_changes in entry["storage"].items()
+                        ],
+                        "balance_changes": entry["balance"],
+                        "nonce_changes": entry["nonce"],
+                        "code_changes": entry["code"],
+                    }
+                    for address_index, entry in accounts.items()
+                ]
+            }
+        )
+
+
+def _field(account: Optional[_RawAccount], field: int) -> Any:
+    return None if account is None else account[field]
+
+
+def _post_field(pre: Optional[_RawAccount], post: Optional[_RawAccount], field: int) -> Any:
+    """``BlockAccessListBuilder._post_field`` for raw accounts."""
+    if post is None:
+        return None
+    value = post[field]
+    if value is None and pre is not None:
+        return pre[field]
+    return value
+
+
+class TraceStore:
+    """Reads blocks of traces from a TraceStore directory."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._blocks, self._codes = _read_index(path)
+        self._data = _map(os.path.join(path, BLOCKS_FILE))
+        self._code_data = _map(os.path.join(path, CODE_FILE))
+        self._code_cache: Dict[str, str] = {}
+
+    def __contains__(self, block_number: int) -> bool:
+        return block_number in self._blocks
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def block_numbers(self) -> List[int]:
+        return sorted(self._blocks)
+
+    def _code(self, key: str) -> str:
+        code = self._code_cache.get(key)
+        if code is None:
+            offset, length = self._codes[key]
+            code = self._code_cache[key] = "0x" + self._code_data[offset : offset + length].hex()
+        return code
+
+    def _view(self, block_number: int) -> _BlockView:
+        entry = self._blocks.get(block_number)
+        if entry is None:
+            raise KeyError(f"Block {block_number} is not in the trace store")
+        return _BlockView(self, self._data, entry[0])
+
+    def load_block(self, block_number: int) -> BlockDebugTraceResult:
+        """Decode all transaction traces of a block.
+
+        Raises:
+            KeyError: If the block is not in the store
+        """
+        view = self._view(block_number)
+        with gc_paused():
+            return [view.transaction(index) for index in range(len(view))]
+
+    def load_transaction(self, block_number: int, tx_index: int) -> TransactionTrace:
+        """Decode a single transaction trace without decoding the rest of its block."""
+        view = self._view(block_number)
+        if not 0 <= tx_index < len(view):
+            raise IndexError(f"Block {block_number} has no transaction {tx_index}")
+        return view.transaction(tx_index)
+
+    def iter_blocks(self) -> Iterator[Tuple[int, BlockDebugTraceResult]]:
+        for block_number in self.block_numbers():
+            yield block_number, self.load_block(block_number)
+
+    def build_block(self, block_number: int) -> BlockAccessList:
+        """Build the BlockAccessList of a stored block, without a node.
+
+        The result equals ``from_execution_trace(self.load_block(block_number))``.
+
+        Raises:
+            KeyError: If the block is not in the store
+            ValueError: If a code change exceeds MAX_CODE_SIZE
+        """
+        view = self._view(block_number)
+        with gc_paused():
+            return view.access_list()
+
+    def close(self) -> None:
+        for data in (self._data, self._code_data):
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_blocks(path: str, blocks: Iterable[Tuple[int, BlockDebugTraceResult]]) -> int:
+    """Write ``(block_number, traces)`` pairs to a store, returning the count."""
+    count = 0
+    with TraceStoreWriter(path) as writer:
+        for block_number, traces in blocks:
+            writer.write_block(block_number, traces)
+            count += 1
+    return count
+
@@ -1,7 +1,7 @@
 """Types for Block Level Access Lists (EIP-7928)."""
 
-from typing import List
-from pydantic import BaseModel, Field
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set
+from pydantic import BaseModel, Field, PrivateAttr
 
 from pokebal.common.types import (
     Address,
@@ -82,94 +82,189 @@ class AccountChanges(BaseModel):
     code_changes: List[CodeChange] = Field(default=[], max_length=MAX_TXS)
 
 
+class _LookupIndex:
+    """Key lookups over the lists of a BlockAccessList, and change tracking.
+
+    Each lookup table remembers the list it was built from and that list's
+    length, and is rebuilt when the list was replaced or resized other than
+    through ``append``. Changing the key of an entry in place is not
+    detected. Tables never affect model equality.
+
+    Once ``tracking`` is set, the positions of entries returned to the add_*
+    methods are recorded in ``changed``, per list, and the addresses passed
+    to ``BlockAccessList.mark_changed`` in ``stale``. ``pokebal.bal.merkle``
+    consumes both to re-hash only what changed.
+    """
+
+    def __init__(self):
+        self.tables: Dict[Hashable, list] = {}
+        self.tracking = False
+        self.changed: Dict[Hashable, Set[int]] = {}
+        self.stale: Set[Address] = set()
+        self.merkle: Any = None
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _LookupIndex)
+
+    def find(
+        self, name: Hashable, items: list, key_of: Callable[[Any], Any], key: Any
+    ) -> Optional[int]:
+        """Return the position of the first entry with ``key``, if any."""
+        table = self.tables.get(name)
+        if table is None or table[0] is not items or table[1] != len(items):
+            lookup: Dict[Any, int] = {}
+            for position, item in enumerate(items):
+                lookup.setdefault(key_of(item), position)
+            table = self.tables[name] = [items, len(items), lookup]
+        return table[2].get(key)
+
+    def append(self, name: Hashable, items: list, key: Any, item: Any) -> int:
+        """Append to a list whose table was just consulted by ``find``."""
+        items.append(item)
+        table = self.tables[name]
+        table[1] += 1
+        table[2][key] = table[1] - 1
+        return table[1] - 1
+
+    def touch(self, name: Hashable, position: int) -> None:
+        if self.tracking:
+            self.changed.setdefault(name, set()).add(position)
+
+
+def _address_of(account: AccountChanges) -> Address:
+    return account.address
+
+
+def _slot_of(entry: Any) -> StorageKey:
+    return entry.slot
+
+
+def _tx_index_of(change: Any) -> TxIndex:
+    return change.tx_index
+
+
 class BlockAccessList(BaseModel):
     """Complete block access list as per EIP-7928."""
 
     account_changes: List[AccountChanges] = Field(default=[], max_length=MAX_ACCOUNTS)
 
+    # Keeps the add_* methods linear in the number of entries
+    _index: _LookupIndex = PrivateAttr(default_factory=_LookupIndex)
+
+    def _find_or_append(
+        self,
+        name: Hashable,
+        items: list,
+        key_of: Callable[[Any], Any],
+        key: Any,
+        create: Callable[[], Any],
+    ) -> Any:
+        """Return the entry of ``items`` with ``key``, appending a new one if missing."""
+        index = self._index
+        position = index.find(name, items, key_of, key)
+        if position is None:
+            position = index.append(name, items, key, create())
+        index.touch(name, position)
+        return items[position]
+
     def _get_account(self, address: Address) -> AccountChanges:
         """Find existing account or create new one."""
-        for account in self.account_changes:
-            if account.address == address:
-                return account
-
-        new_account = AccountChanges(address=address)
-        self.account_changes.append(new_account)
-        return new_account
+        return self._find_or_append(
+            None,
+            self.account_changes,
+            _address_of,
+            address,
+            lambda: AccountChanges(address=address),
+        )
 
     def _get_slot_change_for_tx(
         self, account: AccountChanges, slot: StorageKey, tx_index: TxIndex
     ) -> StorageChange:
         """Find existing storage change for specific transaction or create new one."""
         # First find or create the SlotChanges for this slot
-        slot_changes = None
-        for sc in account.storage_changes:
-            if sc.slot == slot:
-                slot_changes = sc
-                break
-
-        if slot_changes is None:
-            slot_changes = SlotChanges(slot=slot)
-            account.storage_changes.append(slot_changes)
+        slot_changes = self._find_or_append(
+            ("slots", account.address),
+            account.storage_changes,
+            _slot_of,
+            slot,
+            lambda: SlotChanges(slot=slot),
+        )
 
         # Then find or create the StorageChange for this transaction
-        for change in slot_changes.changes:
-            if change.tx_index == tx_index:
-                return change
+        changes = slot_changes.changes
+        name = ("changes", account.address, slot)
+        for position in range(len(changes) - 1, -1, -1):
+            if changes[position].tx_index == tx_index:
+                self._index.touch(name, position)
+                return changes[position]
 
         # No existing change for this tx, create and add new one
         new_change = StorageChange(tx_index=tx_index)
-        slot_changes.changes.append(new_change)
+        changes.append(new_change)
+        self._index.touch(name, len(changes) - 1)
         return new_change
 
     def _slot_already_read(self, account: AccountChanges, slot: StorageKey) -> bool:
         """Ensure slot read entry exists for given slot."""
-        for slot_read in account.storage_reads:
-            if slot_read.slot == slot:
-                return True
-        return False
+        return (
+            self._index.find(("reads", account.address), account.storage_reads, _slot_of, slot)
+            is not None
+        )
 
     def _get_balance_change_for_tx(
         self, account: AccountChanges, tx_index: TxIndex
     ) -> BalanceChange:
         """Find existing balance change for specific transaction or create new one."""
-        # Find existing balance change for this transaction
-        for balance_change in account.balance_changes:
-            if balance_change.tx_index == tx_index:
-                return balance_change
-
-        # No existing change for this tx, create and add new one
-        new_balance_change = BalanceChange(tx_index=tx_index, post_balance=0)
-        account.balance_changes.append(new_balance_change)
-        return new_balance_change
+        return self._find_or_append(
+            ("balance", account.address),
+            account.balance_changes,
+            _tx_index_of,
+            tx_index,
+            lambda: BalanceChange(tx_index=tx_index, post_balance=0),
+        )
 
     def _get_nonce_change_for_tx(
         self, account: AccountChanges, tx_index: TxIndex
     ) -> NonceChange:
         """Find existing nonce change for specific transaction or create new one."""
-        # Find existing nonce change for this transaction
-        for nonce_change in account.nonce_changes:
-            if nonce_change.tx_index == tx_index:
-                return nonce_change
-
-        # No existing change for this tx, create and add new one
-        new_nonce_change = NonceChange(tx_index=tx_index)
-        account.nonce_changes.append(new_nonce_change)
-        return new_nonce_change
+        return self._find_or_append(
+            ("nonce", account.address),
+            account.nonce_changes,
+            _tx_index_of,
+            tx_index,
+            lambda: NonceChange(tx_index=tx_index),
+        )
 
     def _get_code_change_for_tx(
         self, account: AccountChanges, tx_index: TxIndex
     ) -> CodeChange:
         """Find existing code change for specific transaction or create new one."""
-        # Find existing code change for this transaction
-        for code_change in account.code_changes:
-            if code_change.tx_index == tx_index:
-                return code_change
-
-        # No existing change for this tx, create and add new one
-        new_code_change = CodeChange(tx_index=tx_index, new_code=CodeData("0x"))
-        account.code_changes.append(new_code_change)
-        return new_code_change
+        return self._find_or_append(
+            ("code", account.address),
+            account.code_changes,
+            _tx_index_of,
+            tx_index,
+            lambda: CodeChange(tx_index=tx_index, new_code=CodeData("0x")),
+        )
+
+    def mark_changed(self, address: Address) -> None:
+        """Report an account changed other than through the add_* methods.
+
+        Cached hash tree roots of the account are discarded. Entries added,
+        removed or replaced directly in ``account_changes`` itself are
+        detected without this.
+        """
+        index = self._index
+        if not index.tracking:
+            return
+        position = index.find(None, self.account_changes, _address_of, address)
+        if position is not None:
+            index.stale.add(address)
+            index.touch(None, position)
+
+    def add_touched_account(self, address: Address):
+        """Add an account that was accessed without being changed."""
+        self._get_account(address)
 
     def add_storage_write(
         self,
@@ -193,7 +288,9 @@ class BlockAccessList(BaseModel):
         """Add a storage read by a block."""
         account = self._get_account(address)
         if not self._slot_already_read(account, slot):
-            account.storage_reads.append(SlotRead(slot=slot))
+            name = ("reads", account.address)
+            position = self._index.append(name, account.storage_reads, slot, SlotRead(slot=slot))
+            self._index.touch(name, position)
 
     def add_balance_change(
         self,
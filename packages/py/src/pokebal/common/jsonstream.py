@@ -0,0 +1,279 @@
+"""Incremental extraction of values from a JSON document.
+
+Large RPC responses (struct logs, giant traces, client BALs) do not fit in
+memory comfortably. ``JsonItemStream`` consumes a document chunk by chunk and
+emits only the values at the paths asked for, decoding each one on its own.
+Everything else is skipped by scanning for structural characters, without
+being decoded.
+
+Paths are tuples of object keys and array indices. In patterns, ``"*"``
+matches any key or index. For example ``("result", "*", "txHash")`` matches
+the ``txHash`` of every element of a JSON-RPC ``result`` array.
+"""
+
+import json
+import re
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+JsonPath = Tuple[Any, ...]
+
+WILDCARD = "*"
+
+# Skips everything up to the next bracket, including whole strings, in C
+_SKIP_TO_BRACKET = re.compile(rb'(?:[^"\[\]{}]+|"[^"\\]*(?:\\.[^"\\]*)*")*', re.DOTALL)
+_STRING_TAIL = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_SCALAR_END = re.compile(rb"[\s,\]}]")
+_WHITESPACE = re.compile(rb"\s*")
+
+# Buffer bytes already consumed are dropped once they exceed this size
+_COMPACT_THRESHOLD = 1 << 16
+
+_OPEN_OBJECT = ord("{")
+_CLOSE_OBJECT = ord("}")
+_OPEN_ARRAY = ord("[")
+_CLOSE_ARRAY = ord("]")
+_QUOTE = ord('"')
+_COLON = ord(":")
+_COMMA = ord(",")
+
+# What a container frame expects next
+_KEY, _COLON_NEXT, _VALUE, _COMMA_NEXT = range(4)
+
+
+class _Frame:
+    """An open object or array on the navigation path."""
+
+    __slots__ = ("is_object", "path", "key", "expect")
+
+    def __init__(self, is_object: bool, path: JsonPath):
+        self.is_object = is_object
+        self.path = path
+        self.key: Any = None if is_object else 0
+        self.expect = _KEY if is_object else _VALUE
+
+
+class _PendingValue:
+    """A value being skipped or captured, possibly across chunks."""
+
+    __slots__ = ("path", "start", "scan", "depth", "capture")
+
+    def __init__(self, path: JsonPath, start: int, capture: bool):
+        self.path = path
+        self.start = start
+        self.scan = start
+        self.depth = 0
+        self.capture = capture
+
+
+def path_matches(pattern: JsonPath, path: JsonPath) -> bool:
+    """Check if a concrete path matches a pattern of the same length."""
+    return len(pattern) == len(path) and all(
+        expected == WILDCARD or expected == actual
+        for expected, actual in zip(pattern, path)
+    )
+
+
+def _is_prefix(pattern: JsonPath, path: JsonPath) -> bool:
+    return len(path) < len(pattern) and all(
+        expected == WILDCARD or expected == actual
+        for expected, actual in zip(pattern, path)
+    )
+
+
+class JsonItemStream:
+    """Push parser emitting ``(path, value)`` for values matching patterns.
+
+    Feed bytes with ``feed`` and finish with ``close``. Memory use is bounded
+    by the largest single matched value plus one chunk, not by the document.
+
+    Args:
+        patterns: Paths of the values to emit
+        decode: Decoder applied to the raw bytes of each matched value. With
+            None, values are emitted as ``(start, end)`` byte offsets into
+            the document instead of being decoded
+    """
+
+    def __init__(
+        self,
+        patterns: Sequence[JsonPath],
+        decode: Optional[Callable[[bytes], Any]] = json.loads,
+    ):
+        self.patterns = [tuple(pattern) for pattern in patterns]
+        self.decode = decode
+        self._buffer = bytearray()
+        self._pos = 0
+        # Absolute document offset of the first buffered byte
+        self._offset = 0
+        self._stack: List[_Frame] = []
+        self._pending: Optional[_PendingValue] = None
+        self._done = False
+
+    def feed(self, chunk: bytes) -> List[Tuple[JsonPath, Any]]:
+        """Consume a chunk and return the values completed by it."""
+        self._buffer += chunk
+        events: List[Tuple[JsonPath, Any]] = []
+        self._scan(events, final=False)
+        self._compact()
+        return events
+
+    def close(self) -> List[Tuple[JsonPath, Any]]:
+        """Finish the document and return any values completed by its end.
+
+        Raises:
+            ValueError: If the document is truncated
+        """
+        events: List[Tuple[JsonPath, Any]] = []
+        self._scan(events, final=True)
+        if not self._done:
+            raise ValueError("JSON document ended before its root value was complete")
+        return events
+
+    def _scan(self, events: List[Tuple[JsonPath, Any]], final: bool) -> None:
+        buffer = self._buffer
+        while True:
+            if self._pending is not None:
+                if not self._finish_value(events, final):
+                    return
+                continue
+            if self._done:
+                return
+
+            self._pos = _WHITESPACE.match(buffer, self._pos).end()
+            if self._pos >= len(buffer):
+                return
+            char = buffer[self._pos]
+
+            if not self._stack:
+                self._begin_value((), char)
+                continue
+
+            frame = self._stack[-1]
+            if frame.expect == _VALUE:
+                if not frame.is_object and char == _CLOSE_ARRAY:
+                    self._close_frame()
+                    continue
+                self._begin_value(frame.path + (frame.key,), char)
+            elif frame.expect == _COMMA_NEXT:
+                if char == _COMMA:
+                    self._pos += 1
+                    if frame.is_object:
+                        frame.expect = _KEY
+                    else:
+                        frame.key += 1
+                        frame.expect = _VALUE
+                elif char == (_CLOSE_OBJECT if frame.is_object else _CLOSE_ARRAY):
+                    self._close_frame()
+                else:
+                    raise ValueError(f"Unexpected {chr(char)!r} after JSON value")
+            elif frame.expect == _KEY:
+                if char == _CLOSE_OBJECT:
+                    self._close_frame()
+                    continue
+                if char != _QUOTE:
+                    raise ValueError(f"Expected object key, got {chr(char)!r}")
+                match = _STRING_TAIL.match(buffer, self._pos + 1)
+                if match is None:
+                    return
+                frame.key = json.loads(buffer[self._pos : match.end()])
+                frame.expect = _COLON_NEXT
+                self._pos = match.end()
+            else:
+                if char != _COLON:
+                    raise ValueError(f"Expected ':' after object key, got {chr(char)!r}")
+                frame.expect = _VALUE
+                self._pos += 1
+
+    def _begin_value(self, path: JsonPath, char: int) -> None:
+        capture = any(path_matches(pattern, path) for pattern in self.patterns)
+        is_container = char in (_OPEN_OBJECT, _OPEN_ARRAY)
+        if (
+            not capture
+            and is_container
+            and any(_is_prefix(pattern, path) for pattern in self.patterns)
+        ):
+            # A wanted value may be nested inside, walk into the container
+            self._stack.append(_Frame(char == _OPEN_OBJECT, path))
+            self._pos += 1
+            return
+        self._pending = _PendingValue(path, self._pos, capture)
+
+    def _finish_value(self, events: List[Tuple[JsonPath, Any]], final: bool) -> bool:
+        buffer = self._buffer
+        pending = self._pending
+        char = buffer[pending.start]
+
+        if char in (_OPEN_OBJECT, _OPEN_ARRAY):
+            while True:
+                index = _SKIP_TO_BRACKET.match(buffer, pending.scan).end()
+                if index >= len(buffer) or buffer[index] == _QUOTE:
+                    # Out of bytes, possibly inside a string
+                    pending.scan = index
+                    return False
+                token = buffer[index]
+                pending.depth += 1 if token in (_OPEN_OBJECT, _OPEN_ARRAY) else -1
+                pending.scan = index + 1
+                if pending.depth == 0:
+                    end = index + 1
+                    break
+        elif char == _QUOTE:
+            string = _STRING_TAIL.match(buffer, pending.start + 1)
+            if string is None:
+                return False
+            end = string.end()
+        else:
+            match = _SCALAR_END.search(buffer, pending.start)
+            if match is not None:
+                end = match.start()
+            elif final:
+                end = len(buffer)
+            else:
+                return False
+
+        if pending.capture:
+            if self.decode is None:
+                value: Any = (self._offset + pending.start, self._offset + end)
+            else:
+                value = self.decode(buffer[pending.start : end])
+            events.append((pending.path, value))
+        self._pos = end
+        self._pending = None
+        self._value_done()
+        return True
+
+    def _close_frame(self) -> None:
+        self._stack.pop()
+        self._pos += 1
+        self._value_done()
+
+    def _value_done(self) -> None:
+        if self._stack:
+            self._stack[-1].expect = _COMMA_NEXT
+        else:
+            self._done = True
+
+    def _compact(self) -> None:
+        keep = self._pending.start if self._pending is not None else self._pos
+        if keep < _COMPACT_THRESHOLD:
+            return
+        del self._buffer[:keep]
+        self._offset += keep
+        self._pos -= keep
+        if self._pending is not None:
+            self._pending.start -= keep
+            self._pending.scan -= keep
+
+
+def iter_json_items(
+    chunks: Iterable[bytes],
+    patterns: Sequence[JsonPath],
+    decode: Optional[Callable[[bytes], Any]] = json.loads,
+) -> Iterator[Tuple[JsonPath, Any]]:
+    """Yield ``(path, value)`` for every value matching ``patterns``.
+
+    Values are yielded in document order as soon as the chunk completing
+    them has been read.
+    """
+    stream = JsonItemStream(patterns, decode)
+    for chunk in chunks:
+        yield from stream.feed(chunk)
+    yield from stream.close()
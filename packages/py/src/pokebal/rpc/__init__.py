@@ -1,7 +1,13 @@
 """Wrapper for Ethereum JSON-RPC client using HTTP."""
 
 from .client import RPCClient
+from .batching import BatchingRPCClient
 from .transport import HTTPTransport
 from .methods import EthereumMethods
 
-__all__ = ["RPCClient", "HTTPTransport", "EthereumMethods"]
+__all__ = [
+    "RPCClient",
+    "BatchingRPCClient",
+    "HTTPTransport",
+    "EthereumMethods",
+]
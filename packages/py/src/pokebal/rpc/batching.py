@@ -0,0 +1,113 @@
+"""Automatic micro-batching of JSON-RPC point calls."""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, List, Optional, Tuple
+
+from .client import RPCClient, RPCError
+from .transport import HTTPTransport
+
+PendingCall = Tuple[str, Optional[list], Future]
+
+
+class BatchingRPCClient(RPCClient):
+    """RPC client that coalesces point calls into JSON-RPC batches.
+
+    Calls issued within ``max_wait`` seconds of each other (or until
+    ``max_batch_size`` calls are queued) are sent as one batch request.
+    ``call`` keeps the blocking ``RPCClient`` interface, so ``EthereumMethods``
+    used from many threads gets batch throughput unchanged. ``submit`` returns
+    a ``Future`` for callers that want to issue many calls from one thread.
+    """
+
+    def __init__(
+        self,
+        transport: HTTPTransport,
+        max_wait: float = 0.002,
+        max_batch_size: int = 100,
+        max_in_flight: int = 4,
+    ):
+        super().__init__(transport)
+        self.max_wait = max_wait
+        self.max_batch_size = max_batch_size
+        self._pending: List[PendingCall] = []
+        self._condition = threading.Condition()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_in_flight, thread_name_prefix="pokebal-batch"
+        )
+        self._flusher = threading.Thread(
+            target=self._flush_loop, name="pokebal-batch-flusher", daemon=True
+        )
+        self._flusher.start()
+
+    def submit(self, method: str, params: Optional[list] = None) -> "Future[Any]":
+        """Queue a call for the next batch and return a future for its result."""
+        future: Future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("BatchingRPCClient is closed")
+            self._pending.append((method, params, future))
+            self._condition.notify()
+        return future
+
+    def call(self, method: str, params: Optional[list] = None) -> Any:
+        return self.submit(method, params).result()
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+
+                # The first queued call opens a window, later ones ride along
+                deadline = time.monotonic() + self.max_wait
+                while len(self._pending) < self.max_batch_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+                batch = self._pending[: self.max_batch_size]
+                del self._pending[: self.max_batch_size]
+
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch: List[PendingCall]) -> None:
+        try:
+            if len(batch) == 1:
+                # A lone call gains nothing from the batch envelope
+                method, params, _ = batch[0]
+                try:
+                    results = [RPCClient.call(self, method, params)]
+                except RPCError as error:
+                    results = [error]
+            else:
+                results = self.call_batch([(method, params) for method, params, _ in batch])
+        except Exception as error:
+            for _, _, future in batch:
+                future.set_exception(error)
+            return
+
+        for (_, _, future), result in zip(batch, results):
+            if isinstance(result, RPCError):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def close(self) -> None:
+        """Send any queued calls and stop the background flusher."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._flusher.join()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,27 +1,27 @@
-from typing import Any, Dict, Optional
+import itertools
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from .transport import HTTPTransport
 
 
 class RPCClient:
     def __init__(self, transport: HTTPTransport):
         self.transport = transport
-        self._request_id = 0
+        self._request_ids = itertools.count(1)
 
     def _next_request_id(self) -> int:
-        self._request_id += 1
-        return self._request_id
+        return next(self._request_ids)
 
-    def call(self, method: str, params: Optional[list] = None) -> Any:
-        if params is None:
-            params = []
-
-        request = {
+    def _build_request(self, method: str, params: Optional[list]) -> Dict[str, Any]:
+        return {
             "jsonrpc": "2.0",
             "id": self._next_request_id(),
             "method": method,
-            "params": params,
+            "params": params if params is not None else [],
         }
 
+    def call(self, method: str, params: Optional[list] = None) -> Any:
+        request = self._build_request(method, params)
+
         response = self.transport.send(request)
 
         if "error" in response:
@@ -29,6 +29,52 @@ class RPCClient:
 
         return response.get("result")
 
+    def stream(self, method: str, params: Optional[list] = None) -> Iterator[bytes]:
+        """Send a call and yield the raw JSON-RPC response body in chunks.
+
+        The body is not decoded, so errors must be detected by the consumer.
+        """
+        return self.transport.stream(self._build_request(method, params))
+
+    def call_batch(
+        self, calls: List[Tuple[str, Optional[list]]]
+    ) -> List[Any]:
+        """Send several calls as one JSON-RPC batch.
+
+        Results are returned in the order of ``calls``. A call that failed is
+        returned as an ``RPCError`` instance instead of raising, so one bad
+        entry does not discard the rest of the batch.
+
+        Raises:
+            RPCError: If the node rejected the whole batch, answering with a
+                single error object instead of a list
+        """
+        if not calls:
+            return []
+
+        requests = [self._build_request(method, params) for method, params in calls]
+        responses = self.transport.send(requests)
+        if isinstance(responses, dict):
+            raise RPCError(
+                responses.get("error") or {"code": None, "message": "invalid batch response"}
+            )
+
+        # Nodes may answer batch entries in any order, match them back by id
+        by_id = {response.get("id"): response for response in responses}
+
+        results = []
+        for request in requests:
+            response = by_id.get(request["id"])
+            if response is None:
+                results.append(
+                    RPCError({"code": None, "message": "missing batch response"})
+                )
+            elif "error" in response:
+                results.append(RPCError(response["error"]))
+            else:
+                results.append(response.get("result"))
+        return results
+
 
 class RPCError(Exception):
     def __init__(self, error_data: Dict[str, Any]):
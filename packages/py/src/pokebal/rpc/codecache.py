@@ -0,0 +1,48 @@
+"""Content-addressed cache of contract bytecode."""
+
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from pokebal.common.types import CodeData, Hash
+
+
+class BytecodeCache:
+    """Maps code hashes to bytecode, evicting least recently used entries.
+
+    Contract code is immutable per hash, so entries never go stale and can be
+    shared across blocks and threads.
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CodeData]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, code_hash: Hash) -> Optional[CodeData]:
+        key = code_hash.lower()
+        with self._lock:
+            code = self._entries.get(key)
+            if code is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return code
+
+    def put(self, code_hash: Hash, code: CodeData) -> None:
+        key = code_hash.lower()
+        with self._lock:
+            self._entries[key] = code
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, code_hash: Hash) -> bool:
+        with self._lock:
+            return code_hash.lower() in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
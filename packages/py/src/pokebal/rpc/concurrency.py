@@ -0,0 +1,215 @@
+"""Adaptive concurrency limiting for expensive RPC calls."""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set, Union
+
+import httpx
+from pydantic import BaseModel
+
+from .transport import HTTPTransport
+
+# Status codes a node uses to say it is overloaded
+OVERLOAD_STATUS_CODES = {429, 502, 503, 504}
+
+
+class LimiterMetrics(BaseModel):
+    """Point-in-time view of an AdaptiveConcurrencyLimiter."""
+
+    limit: int
+    in_flight: int
+    latency_seconds: Optional[float]
+    baseline_latency_seconds: Optional[float]
+    successes: int
+    backoffs: int
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limit steered by errors and a latency gradient.
+
+    Every successful request whose latency stays within ``latency_tolerance``
+    times the baseline grows the limit additively (about +1 per limit's worth
+    of completions). Overload errors, or latency above the tolerance, shrink
+    it multiplicatively by ``backoff``. Backoffs are spaced by at least one
+    baseline latency so a burst of failures from one overload counts once.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        latency_tolerance: float = 2.0,
+        backoff: float = 0.5,
+        smoothing: float = 0.2,
+    ):
+        if not min_limit <= initial_limit <= max_limit:
+            raise ValueError(
+                f"initial_limit {initial_limit} must lie in [{min_limit}, {max_limit}]"
+            )
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.smoothing = smoothing
+
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._latency: Optional[float] = None
+        self._baseline: Optional[float] = None
+        self._successes = 0
+        self._backoffs = 0
+        self._last_backoff = 0.0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """Current number of requests allowed in flight."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def metrics(self) -> LimiterMetrics:
+        with self._condition:
+            return LimiterMetrics(
+                limit=self.limit,
+                in_flight=self._in_flight,
+                latency_seconds=self._latency,
+                baseline_latency_seconds=self._baseline,
+                successes=self._successes,
+                backoffs=self._backoffs,
+            )
+
+    def acquire(self) -> None:
+        """Block until a slot under the current limit is free."""
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False) -> None:
+        """Return a slot and feed the request outcome into the limit.
+
+        Args:
+            latency: Seconds the request took, None if it failed for an
+                unrelated reason and should not steer the limit
+            overloaded: True if the node signalled overload (timeout, 429, ...)
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if overloaded:
+                self._decrease()
+            elif latency is not None:
+                self._observe(latency)
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold a slot for the duration of one request.
+
+        Exceptions classified by ``is_overload`` shrink the limit, successful
+        requests feed their latency into it. The slot is returned whatever
+        ends the request, including a stream that is closed before its end.
+        """
+        self.acquire()
+        started = time.perf_counter()
+        latency: Optional[float] = None
+        overloaded = False
+        try:
+            yield
+            latency = time.perf_counter() - started
+        except Exception as error:
+            overloaded = is_overload(error)
+            raise
+        finally:
+            self.release(latency=latency, overloaded=overloaded)
+
+    def _observe(self, latency: float) -> None:
+        self._successes += 1
+        if self._latency is None:
+            self._latency = latency
+        else:
+            self._latency += self.smoothing * (latency - self._latency)
+
+        # Baseline follows new minimums at once and drifts up slowly so a
+        # node that got permanently slower is eventually accepted as normal
+        if self._baseline is None or latency < self._baseline:
+            self._baseline = latency
+        else:
+            self._baseline += 0.01 * (latency - self._baseline)
+
+        if self._latency > self._baseline * self.latency_tolerance:
+            self._decrease()
+        else:
+            self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if now - self._last_backoff < (self._baseline or 0.0):
+            return
+        self._last_backoff = now
+        self._backoffs += 1
+        self._limit = max(self.min_limit, self._limit * self.backoff)
+        # Start the next probe from the current latency, not the spike
+        self._latency = self._baseline
+
+
+def is_overload(error: BaseException) -> bool:
+    """Check if an exception means the node is overloaded."""
+    if isinstance(error, httpx.TimeoutException):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in OVERLOAD_STATUS_CODES
+    return False
+
+
+class AdaptiveConcurrencyTransport:
+    """Transport wrapper that gates requests through an adaptive limiter.
+
+    Only requests for ``methods`` are limited (all requests if None), so
+    cheap point calls can share the transport without waiting behind traces.
+    Pair it with a ``BlockPipeline`` whose ``read_ahead`` is at least
+    ``max_limit`` and the pipeline settles at the node's sustainable rate.
+    """
+
+    def __init__(
+        self,
+        transport: HTTPTransport,
+        limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        methods: Optional[Set[str]] = None,
+    ):
+        self.transport = transport
+        self.limiter = limiter or AdaptiveConcurrencyLimiter()
+        self.methods = methods
+
+    @property
+    def last_response_size(self) -> Optional[int]:
+        return getattr(self.transport, "last_response_size", None)
+
+    def _is_limited(self, request: Union[Dict[str, Any], List[Dict[str, Any]]]) -> bool:
+        if self.methods is None:
+            return True
+        requests = request if isinstance(request, list) else [request]
+        return any(item.get("method") in self.methods for item in requests)
+
+    def send(
+        self, request: Union[Dict[str, Any], List[Dict[str, Any]]]
+    ) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        if not self._is_limited(request):
+            return self.transport.send(request)
+        with self.limiter.slot():
+            return self.transport.send(request)
+
+    def stream(self, request: Dict[str, Any], chunk_size: int = 1 << 16) -> Iterator[bytes]:
+        """Stream a response, holding a limiter slot until it is fully read."""
+        if not self._is_limited(request):
+            yield from self.transport.stream(request, chunk_size)
+            return
+        with self.limiter.slot():
+            yield from self.transport.stream(request, chunk_size)
+
+    def close(self):
+        self.transport.close()
@@ -0,0 +1,301 @@
+"""Record-and-replay of JSON-RPC responses.
+
+``RecordingTransport`` wraps a live transport and writes every response to a
+fixture store. ``ReplayTransport`` later serves them by (method, params)
+without a node, so builds over a recorded block range measure only pokebal.
+
+A store is two files. ``<path>`` holds zlib-compressed responses back to
+back: the result or error of calls made with ``send``, and the raw body of
+calls made with ``stream``, compressed as it arrives so a multi-gigabyte
+struct log is never held in memory. ``<path>.idx`` is a JSON lines log,
+a version header then one entry per recorded call mapping the sha256 of
+its canonical key to its blob. Entries are appended as soon as their blob
+is written, so an interrupted recording keeps every call it completed; a
+later entry for the same key replaces an earlier one. Replay memory-maps
+the data file and only decompresses the blobs that are asked for.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from .mocknode import params_key
+
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 2
+
+Request = Union[Dict[str, Any], List[Dict[str, Any]]]
+
+_COPY_SIZE = 1 << 20
+
+
+class MissingFixtureError(LookupError):
+    """A replayed call was never recorded."""
+
+
+class _Entry(NamedTuple):
+    offset: int
+    length: int
+    # Whether the blob is a raw response body rather than a result or error
+    raw: bool
+
+
+def fixture_key(method: str, params: Optional[list]) -> str:
+    """Hash identifying a call in a fixture store."""
+    return hashlib.sha256(params_key(method, params).encode()).hexdigest()
+
+
+def _read_index(path: str) -> Dict[str, _Entry]:
+    """Read the index log of a store, ignoring entries past the data file.
+
+    A torn last line, or an entry whose blob is not fully written, is what
+    an interrupted recording leaves behind; both are dropped.
+    """
+    index_path = path + INDEX_SUFFIX
+    if not os.path.exists(index_path):
+        return {}
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    entries: Dict[str, _Entry] = {}
+    with open(index_path) as file:
+        header = json.loads(file.readline() or "{}")
+        if header.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported fixture index version {header.get('version')}")
+        for line in file:
+            try:
+                key, offset, length, raw = json.loads(line)
+            except ValueError:
+                break
+            if offset + length <= size:
+                entries[key] = _Entry(offset, length, raw)
+    return entries
+
+
+class FixtureWriter:
+    """Appends compressed responses to a fixture store.
+
+    Recording into an existing store adds to it, and a call recorded again
+    replaces the earlier entry. Each entry is added to the index once its
+    blob is written; ``close`` rewrites the index without replaced entries.
+    """
+
+    def __init__(self, path: str, level: int = 6):
+        self.path = path
+        self.level = level
+        self._index = _read_index(path)
+        self._file = open(path, "ab")
+        self._offset = self._file.tell()
+        self._index_file = open(path + INDEX_SUFFIX, "a")
+        if self._index_file.tell() == 0:
+            self._index_file.write(json.dumps({"version": INDEX_VERSION}) + "\n")
+            self._index_file.flush()
+        self._lock = threading.Lock()
+
+    def _append(self, key: str, blob: Any, length: int, raw: bool) -> None:
+        """Append a blob, a bytes object or a file read from its start."""
+        with self._lock:
+            if isinstance(blob, bytes):
+                self._file.write(blob)
+            else:
+                shutil.copyfileobj(blob, self._file, _COPY_SIZE)
+            self._file.flush()
+            entry = _Entry(self._offset, length, raw)
+            self._index[key] = entry
+            self._offset += length
+            self._index_file.write(json.dumps([key, *entry]) + "\n")
+            self._index_file.flush()
+
+    def write(self, method: str, params: Optional[list], response: Dict[str, Any]) -> None:
+        """Store the result or error of one call, without its request id."""
+        body = {key: response[key] for key in ("result", "error") if key in response}
+        data = zlib.compress(json.dumps(body, separators=(",", ":")).encode(), self.level)
+        self._append(fixture_key(method, params), data, len(data), raw=False)
+
+    def write_stream(
+        self, method: str, params: Optional[list], chunks: Iterable[bytes]
+    ) -> Iterator[bytes]:
+        """Pass the chunks of a raw response body through, storing them.
+
+        The body is compressed into a temporary file as it goes by and
+        appended to the store once the last chunk was read, so concurrent
+        streams do not interleave. A stream closed early is not stored.
+        """
+        compressor = zlib.compressobj(self.level)
+        with tempfile.TemporaryFile(
+            dir=os.path.dirname(os.path.abspath(self.path)), prefix="pokebal-fixture-"
+        ) as spool:
+            for chunk in chunks:
+                spool.write(compressor.compress(chunk))
+                yield chunk
+            spool.write(compressor.flush())
+            length = spool.tell()
+            spool.seek(0)
+            self._append(fixture_key(method, params), spool, length, raw=True)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.close()
+            self._index_file.close()
+            index_path = self.path + INDEX_SUFFIX
+            with open(index_path + ".tmp", "w") as file:
+                file.write(json.dumps({"version": INDEX_VERSION}) + "\n")
+                for key, entry in self._index.items():
+                    file.write(json.dumps([key, *entry]) + "\n")
+            os.replace(index_path + ".tmp", index_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class RecordingTransport:
+    """Forwards requests to a live transport and records the responses."""
+
+    def __init__(self, transport: Any, path: str, level: int = 6):
+        self.transport = transport
+        self.writer = FixtureWriter(path, level)
+
+    @property
+    def last_response_size(self) -> Optional[int]:
+        return getattr(self.transport, "last_response_size", None)
+
+    def send(self, request: Request) -> Any:
+        response = self.transport.send(request)
+        if isinstance(request, list):
+            if not isinstance(response, list):
+                # A node rejecting a whole batch answers with one error object,
+                # which belongs to no single call and is passed on unrecorded
+                return response
+            by_id = {item.get("id"): item for item in response}
+            for item in request:
+                if item["id"] in by_id:
+                    self.writer.write(item["method"], item.get("params"), by_id[item["id"]])
+        else:
+            self.writer.write(request["method"], request.get("params"), response)
+        return response
+
+    def stream(self, request: Dict[str, Any], chunk_size: int = 1 << 16) -> Iterator[bytes]:
+        """Stream a response through, recording it once it is complete."""
+        return self.writer.write_stream(
+            request["method"],
+            request.get("params"),
+            self.transport.stream(request, chunk_size),
+        )
+
+    def close(self) -> None:
+        self.writer.close()
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ReplayTransport:
+    """Serves recorded responses from a memory-mapped fixture store.
+
+    Raises:
+        MissingFixtureError: From ``send`` when a call was not recorded
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._index = _read_index(path)
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._local = threading.local()
+
+    @property
+    def last_response_size(self) -> Optional[int]:
+        """Decompressed size of the last response replayed on this thread."""
+        return getattr(self._local, "last_response_size", None)
+
+    def __contains__(self, call: Tuple[str, Optional[list]]) -> bool:
+        return fixture_key(*call) in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _entry(self, method: str, params: Optional[list]) -> _Entry:
+        entry = self._index.get(fixture_key(method, params))
+        if entry is None:
+            raise MissingFixtureError(f"No recorded response for {params_key(method, params)}")
+        return entry
+
+    def _decompress(self, entry: _Entry, chunk_size: int) -> Iterator[bytes]:
+        """Yield the decompressed blob of an entry in chunks of at most ``chunk_size``."""
+        decompressor = zlib.decompressobj()
+        end = entry.offset + entry.length
+        for start in range(entry.offset, end, _COPY_SIZE):
+            data = self._data[start : min(start + _COPY_SIZE, end)]
+            while data:
+                chunk = decompressor.decompress(data, chunk_size)
+                if chunk:
+                    yield chunk
+                data = decompressor.unconsumed_tail
+        tail = decompressor.flush()
+        for start in range(0, len(tail), chunk_size):
+            yield tail[start : start + chunk_size]
+
+    def _response(self, request: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        entry = self._entry(request["method"], request.get("params"))
+        body = b"".join(self._decompress(entry, _COPY_SIZE))
+        response = {"jsonrpc": "2.0", "id": request.get("id")}
+        decoded = json.loads(body)
+        if entry.raw:
+            decoded = {key: decoded[key] for key in ("result", "error") if key in decoded}
+        response.update(decoded)
+        return response, len(body)
+
+    def send(self, request: Request) -> Any:
+        if isinstance(request, list):
+            responses = [self._response(item) for item in request]
+            self._local.last_response_size = sum(size for _, size in responses)
+            return [response for response, _ in responses]
+        response, size = self._response(request)
+        self._local.last_response_size = size
+        return response
+
+    def stream(self, request: Dict[str, Any], chunk_size: int = 1 << 16) -> Iterator[bytes]:
+        """Yield a recorded response body in chunks, decompressing as it goes.
+
+        Bodies recorded from a stream are replayed byte for byte, including
+        the request id of the recording.
+        """
+        entry = self._entry(request["method"], request.get("params"))
+        chunks = self._decompress(entry, chunk_size)
+        if entry.raw:
+            yield from chunks
+            return
+        # A stored result or error, an object whose "{" the envelope opens
+        envelope = {"jsonrpc": "2.0", "id": request.get("id")}
+        yield json.dumps(envelope, separators=(",", ":")).encode()[:-1] + b","
+        first = next(chunks, b"{}")
+        yield first[1:]
+        yield from chunks
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,11 +1,101 @@
-from pydantic import TypeAdapter
-from .client import RPCClient
-from .types import BlockDebugTraceResult
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from pydantic import BaseModel, TypeAdapter
+from pokebal.common.jsonstream import WILDCARD, iter_json_items
+from .client import RPCClient, RPCError
+from .codecache import BytecodeCache
+from .tracers import (
+    COMPACT_BAL_TRACER,
+    compact_tracer_config,
+    drop_unchanged,
+    forced_accounts,
+)
+from .types import (
+    BlockDebugTraceResult,
+    CompactBlockTraceResult,
+    PrestateTransactionTrace,
+    TransactionTrace,
+)
+
+
+class FanOutPolicy(BaseModel):
+    """When and how to trace a block transaction by transaction.
+
+    Blocks with more than ``max_block_txs`` transactions, or whose estimated
+    whole-block response exceeds ``max_block_bytes``, are traced with one
+    ``debug_traceTransaction`` per transaction. The estimate uses the bytes per
+    transaction observed on earlier whole-block responses.
+
+    A failed transaction is retried up to ``retries`` times, waiting
+    ``backoff`` seconds before the first retry and twice as long before each
+    next one.
+    """
+
+    max_block_txs: int = 300
+    max_block_bytes: int = 64 * 1024 * 1024
+    max_workers: int = 16
+    retries: int = 2
+    backoff: float = 0.5
+
+
+class BulkPolicy(BaseModel):
+    """How bulk state lookups are split into JSON-RPC batches."""
+
+    batch_size: int = 100
+    max_workers: int = 8
+
+
+# Paths of a JSON-RPC response decoded by _ResultStream
+_RESULT_PATTERNS = [("error",), ("result", WILDCARD)]
+
+
+class _ResultStream:
+    """Elements of a JSON-RPC ``result`` array, decoded as the body arrives.
+
+    ``size`` counts the body bytes read so far, so it is the size of this
+    response alone whatever other calls share the transport.
+
+    Raises:
+        RPCError: If the response is an error
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = chunks
+        self.size = 0
+
+    def _counted(self) -> Iterator[bytes]:
+        for chunk in self._chunks:
+            self.size += len(chunk)
+            yield chunk
+
+    def __iter__(self) -> Iterator[Any]:
+        try:
+            for path, value in iter_json_items(self._counted(), _RESULT_PATTERNS):
+                if path == ("error",):
+                    raise RPCError(value)
+                yield value
+        finally:
+            # Ends the transport stream at once, returning any slot it holds
+            close = getattr(self._chunks, "close", None)
+            if close is not None:
+                close()
 
 
 class EthereumMethods:
-    def __init__(self, client: RPCClient):
+    def __init__(
+        self,
+        client: RPCClient,
+        fan_out: Optional[FanOutPolicy] = None,
+        bulk: Optional[BulkPolicy] = None,
+        code_cache: Optional[BytecodeCache] = None,
+    ):
         self.client = client
+        self.fan_out = fan_out or FanOutPolicy()
+        self.bulk = bulk or BulkPolicy()
+        self.code_cache = code_cache if code_cache is not None else BytecodeCache()
+        self._trace_bytes_per_tx: Optional[float] = None
 
     def get_block_number(self) -> int:
         result = self.client.call("eth_blockNumber")
@@ -15,15 +105,380 @@ class EthereumMethods:
         result = self.client.call("eth_getBalance", [address, block])
         return int(result, 16)
 
-    def debug_traceBlockByNumber(
-        self, block_number: int, diff_mode: bool = True
-    ) -> BlockDebugTraceResult:
-        result = self.client.call(
+    def get_balances(
+        self, addresses: Iterable[str], block: Union[int, str] = "latest"
+    ) -> Dict[str, int]:
+        block_param = _block_param(block)
+        keys = list(dict.fromkeys(addresses))
+        results = self._bulk_call(
+            "eth_getBalance", [[address, block_param] for address in keys]
+        )
+        return {address: int(result, 16) for address, result in zip(keys, results)}
+
+    def get_nonces(
+        self, addresses: Iterable[str], block: Union[int, str] = "latest"
+    ) -> Dict[str, int]:
+        block_param = _block_param(block)
+        keys = list(dict.fromkeys(addresses))
+        results = self._bulk_call(
+            "eth_getTransactionCount", [[address, block_param] for address in keys]
+        )
+        return {address: int(result, 16) for address, result in zip(keys, results)}
+
+    def get_codes(
+        self, addresses: Iterable[str], block: Union[int, str] = "latest"
+    ) -> Dict[str, str]:
+        block_param = _block_param(block)
+        keys = list(dict.fromkeys(addresses))
+        results = self._bulk_call(
+            "eth_getCode", [[address, block_param] for address in keys]
+        )
+        return dict(zip(keys, results))
+
+    def get_storage_at(
+        self, slots: Iterable[Tuple[str, str]], block: Union[int, str] = "latest"
+    ) -> Dict[Tuple[str, str], str]:
+        """Read many storage slots, keyed by ``(address, slot)``."""
+        block_param = _block_param(block)
+        keys = list(dict.fromkeys(slots))
+        results = self._bulk_call(
+            "eth_getStorageAt", [[address, slot, block_param] for address, slot in keys]
+        )
+        return dict(zip(keys, results))
+
+    def _bulk_call(self, method: str, param_lists: List[list]) -> List[Any]:
+        """Run one method over many params as concurrent JSON-RPC batches.
+
+        Raises:
+            RPCError: The first error returned for any of the calls
+        """
+        size = self.bulk.batch_size
+        batches = [
+            [(method, params) for params in param_lists[start : start + size]]
+            for start in range(0, len(param_lists), size)
+        ]
+        if not batches:
+            return []
+
+        workers = min(self.bulk.max_workers, len(batches))
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="pokebal-bulk"
+        ) as pool:
+            results = [
+                result
+                for batch_results in pool.map(self.client.call_batch, batches)
+                for result in batch_results
+            ]
+
+        for result in results:
+            if isinstance(result, RPCError):
+                raise result
+        return results
+
+    def get_block_transaction_hashes(self, block_number: int) -> List[str]:
+        result = self.client.call("eth_getBlockByNumber", [hex(block_number), False])
+        return result["transactions"]
+
+    def get_block_transaction_targets(self, block_number: int) -> List[str]:
+        """Return the address each transaction's top-level frame runs at.
+
+        That is ``to`` for calls and the deployed address for contract
+        creations, which is read from the transaction receipts.
+        """
+        result = self.client.call("eth_getBlockByNumber", [hex(block_number), True])
+        transactions = result["transactions"]
+        creations = [tx["hash"] for tx in transactions if tx.get("to") is None]
+        receipts = self._bulk_call(
+            "eth_getTransactionReceipt", [[tx_hash] for tx_hash in creations]
+        )
+        created = {
+            tx_hash: receipt["contractAddress"]
+            for tx_hash, receipt in zip(creations, receipts)
+        }
+        return [tx.get("to") or created[tx["hash"]] for tx in transactions]
+
+    def stream_struct_logs(self, block_number: int) -> Iterator[bytes]:
+        """Stream the raw struct logger trace of a block.
+
+        Memory, storage snapshots and return data are disabled, since
+        ``pokebal.bal.structlog`` only needs opcodes, depths and stacks.
+        """
+        return self.client.stream(
             "debug_traceBlockByNumber",
             [
                 hex(block_number),
-                {"tracer": "prestateTracer", "tracerConfig": {"diffMode": diff_mode}},
+                {"disableStorage": True, "enableMemory": False, "enableReturnData": False},
             ],
         )
-        adapter = TypeAdapter(BlockDebugTraceResult)
-        return adapter.validate_python(result)
+
+    def debug_traceBlockByNumber(
+        self,
+        block_number: int,
+        diff_mode: bool = True,
+        disable_code: bool = False,
+        disable_storage: bool = False,
+    ) -> BlockDebugTraceResult:
+        results = _ResultStream(
+            self.client.stream(
+                "debug_traceBlockByNumber",
+                [
+                    hex(block_number),
+                    _prestate_tracer(diff_mode, disable_code, disable_storage),
+                ],
+            )
+        )
+        traces = [TransactionTrace.model_validate(result) for result in results]
+        self._observe_trace_size(results.size, len(traces))
+        return traces
+
+    def trace_block_raw(
+        self,
+        block_number: int,
+        diff_mode: bool = True,
+        disable_code: bool = False,
+        disable_storage: bool = False,
+    ) -> bytes:
+        """Fetch the raw, undecoded ``debug_traceBlockByNumber`` response body.
+
+        For ``pokebal.rpc.parallel`` and ``pokebal.bal.builder.from_trace_body``,
+        which decode huge bodies on several cores.
+        """
+        return b"".join(
+            self.client.stream(
+                "debug_traceBlockByNumber",
+                [
+                    hex(block_number),
+                    _prestate_tracer(diff_mode, disable_code, disable_storage),
+                ],
+            )
+        )
+
+    def debug_traceTransaction(
+        self,
+        tx_hash: str,
+        diff_mode: bool = True,
+        disable_code: bool = False,
+        disable_storage: bool = False,
+    ) -> TransactionTrace:
+        result = self.client.call(
+            "debug_traceTransaction",
+            [tx_hash, _prestate_tracer(diff_mode, disable_code, disable_storage)],
+        )
+        return TransactionTrace.model_validate({"result": result, "txHash": tx_hash})
+
+    def trace_block_with_reads(
+        self, block_number: int
+    ) -> Iterator[Tuple[TransactionTrace, PrestateTransactionTrace]]:
+        """Trace a block in diff mode and full prestate mode side by side.
+
+        Both traces are streamed concurrently and decoded one transaction
+        at a time, so memory holds a transaction of each response rather
+        than the whole block. Feed the pairs to
+        ``pokebal.bal.builder.from_merged_traces`` to get storage reads.
+
+        Raises:
+            ValueError: If the two traces have different lengths
+        """
+        block = hex(block_number)
+        diff_results = iter(
+            _ResultStream(
+                self.client.stream(
+                    "debug_traceBlockByNumber", [block, _prestate_tracer(diff_mode=True)]
+                )
+            )
+        )
+        full_results = iter(
+            _ResultStream(
+                self.client.stream(
+                    "debug_traceBlockByNumber",
+                    [block, _prestate_tracer(diff_mode=False, disable_code=True)],
+                )
+            )
+        )
+        try:
+            with ThreadPoolExecutor(
+                max_workers=2, thread_name_prefix="pokebal-trace"
+            ) as pool:
+                position = 0
+                while True:
+                    # Each response is read on its own thread, so both
+                    # downloads progress while a pair is being validated
+                    diff_future = pool.submit(next, diff_results, None)
+                    full_future = pool.submit(next, full_results, None)
+                    diff_result, full_result = diff_future.result(), full_future.result()
+                    if diff_result is None and full_result is None:
+                        return
+                    if diff_result is None or full_result is None:
+                        shorter = "diff" if diff_result is None else "full"
+                        raise ValueError(
+                            f"Trace length mismatch for block {block_number}: "
+                            f"{shorter} trace ended after {position} transactions"
+                        )
+                    yield (
+                        TransactionTrace.model_validate(diff_result),
+                        PrestateTransactionTrace.model_validate(full_result),
+                    )
+                    position += 1
+        finally:
+            diff_results.close()
+            full_results.close()
+
+    def trace_block_compact(self, block_number: int) -> CompactBlockTraceResult:
+        """Trace a block with the bundled compact BAL tracer.
+
+        Returns only touched accounts, changed fields and slot reads/writes.
+        Build a BAL from it with ``pokebal.bal.builder.from_compact_trace``.
+
+        The tracer is told the coinbase and the EIP-7702 authorities of the
+        block, whose changes happen outside the steps it sees. Their emitted
+        values are compared with the state of the parent block to drop the
+        ones that did not change.
+        """
+        block = self.client.call("eth_getBlockByNumber", [hex(block_number), True])
+        config = compact_tracer_config(block)
+        result = self.client.call(
+            "debug_traceBlockByNumber",
+            [hex(block_number), {"tracer": COMPACT_BAL_TRACER, "tracerConfig": config}],
+        )
+        adapter = TypeAdapter(CompactBlockTraceResult)
+        traces = adapter.validate_python(result)
+
+        if block_number > 0:
+            accounts = forced_accounts(config)
+            parent = block_number - 1
+            drop_unchanged(
+                traces,
+                self.get_balances(accounts, parent),
+                self.get_nonces(accounts, parent),
+                self.get_codes(accounts, parent),
+            )
+        return traces
+
+    def trace_block_code_aware(self, block_number: int) -> BlockDebugTraceResult:
+        """Trace a block without bytecode and fill in only code that changed.
+
+        The block is traced with ``disableCode``. Accounts whose ``codeHash``
+        changed get their code from ``code_cache``, or else from
+        ``eth_getCode`` at the block (the last change of an address in the
+        block). Earlier changes of an address re-trace their transaction
+        with code but without storage. Unchanged code never crosses the wire.
+        """
+        traces = self.debug_traceBlockByNumber(block_number, disable_code=True)
+
+        # (trace position, address, new code hash) for every code change
+        changes = []
+        for position, trace in enumerate(traces):
+            for address, post_state in trace.result.post.items():
+                if post_state.codeHash is None:
+                    continue
+                pre_state = trace.result.pre.get(address)
+                if pre_state is not None and pre_state.codeHash == post_state.codeHash:
+                    continue
+                changes.append((position, address, post_state.codeHash))
+
+        last_change = {address: position for position, address, _ in changes}
+        resolved = {}
+        for _, _, code_hash in changes:
+            code = self.code_cache.get(code_hash)
+            if code is not None:
+                resolved[code_hash] = code
+
+        # Final code per address is the code at the end of the block
+        final_missing = {
+            address: code_hash
+            for position, address, code_hash in changes
+            if last_change[address] == position and code_hash not in resolved
+        }
+        codes = self.get_codes(final_missing.keys(), block_number)
+        for address, code_hash in final_missing.items():
+            resolved[code_hash] = codes[address]
+
+        # Code overwritten later in the block is only visible in its own tx
+        for position, address, code_hash in changes:
+            if code_hash in resolved:
+                continue
+            trace = self.debug_traceTransaction(
+                traces[position].txHash, disable_storage=True
+            )
+            resolved[code_hash] = trace.result.post[address].code or "0x"
+
+        for position, address, code_hash in changes:
+            self.code_cache.put(code_hash, resolved[code_hash])
+            traces[position].result.post[address].code = resolved[code_hash]
+
+        return traces
+
+    def trace_block(
+        self, block_number: int, diff_mode: bool = True
+    ) -> BlockDebugTraceResult:
+        """Trace a block whole or per transaction, whichever suits its size.
+
+        Per-transaction tracing runs concurrently, retries failed transactions
+        individually and reassembles the traces in block order.
+        """
+        tx_hashes = self.get_block_transaction_hashes(block_number)
+        if not self._should_fan_out(len(tx_hashes)):
+            return self.debug_traceBlockByNumber(block_number, diff_mode)
+        return self._trace_transactions(tx_hashes, diff_mode)
+
+    def _should_fan_out(self, tx_count: int) -> bool:
+        if tx_count > self.fan_out.max_block_txs:
+            return True
+        if self._trace_bytes_per_tx is None:
+            return False
+        return tx_count * self._trace_bytes_per_tx > self.fan_out.max_block_bytes
+
+    def _observe_trace_size(self, size: int, tx_count: int) -> None:
+        if tx_count == 0:
+            return
+        per_tx = size / tx_count
+        if self._trace_bytes_per_tx is None:
+            self._trace_bytes_per_tx = per_tx
+        else:
+            self._trace_bytes_per_tx += 0.2 * (per_tx - self._trace_bytes_per_tx)
+
+    def _trace_transaction_with_retries(
+        self, tx_hash: str, diff_mode: bool
+    ) -> TransactionTrace:
+        for attempt in range(self.fan_out.retries + 1):
+            try:
+                return self.debug_traceTransaction(tx_hash, diff_mode)
+            except Exception:
+                if attempt == self.fan_out.retries:
+                    raise
+            time.sleep(self.fan_out.backoff * 2**attempt)
+
+    def _trace_transactions(
+        self, tx_hashes: List[str], diff_mode: bool
+    ) -> BlockDebugTraceResult:
+        if not tx_hashes:
+            return []
+        workers = min(self.fan_out.max_workers, len(tx_hashes))
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="pokebal-trace"
+        ) as pool:
+            return list(
+                pool.map(
+                    lambda tx_hash: self._trace_transaction_with_retries(
+                        tx_hash, diff_mode
+                    ),
+                    tx_hashes,
+                )
+            )
+
+
+def _block_param(block: Union[int, str]) -> str:
+    """Encode a block number or tag as a JSON-RPC block parameter."""
+    return hex(block) if isinstance(block, int) else block
+
+
+def _prestate_tracer(
+    diff_mode: bool, disable_code: bool = False, disable_storage: bool = False
+) -> dict:
+    """Build the tracer options for a prestateTracer call."""
+    config = {"diffMode": diff_mode}
+    if disable_code:
+        config["disableCode"] = True
+    if disable_storage:
+        config["disableStorage"] = True
+    return {"tracer": "prestateTracer", "tracerConfig": config}
@@ -0,0 +1,563 @@
+"""Local mock JSON-RPC node for load and latency testing.
+
+``MockNode`` answers JSON-RPC requests from per-method handlers over HTTP,
+IPC (unix socket) and WebSocket, so the client stack can be benchmarked
+reproducibly without a network. Latency, error injection and bandwidth are
+configured with ``MockNodeConfig`` and drawn from a seeded random generator.
+
+Handlers take the request params and return the result, like the handlers of
+the in-memory test transport. ``SyntheticChain`` generates deterministic
+blocks, traces and state, and ``RecordedResponses`` serves captured results.
+"""
+
+import base64
+import codecs
+import hashlib
+import json
+import math
+import os
+import random
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, BinaryIO, Callable, Dict, List, Literal, Optional, Tuple
+
+from pydantic import BaseModel
+
+from .client import RPCError
+
+Handler = Callable[[list], Any]
+
+_WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_WRITE_CHUNK = 1 << 14
+
+
+class LatencyProfile(BaseModel):
+    """Distribution of the delay added before answering each request.
+
+    ``constant`` always waits ``mean`` seconds. ``uniform`` draws from
+    ``mean ± spread``. ``lognormal`` draws with median ``mean`` and shape
+    ``spread``, which gives the long tail seen on busy nodes.
+    """
+
+    distribution: Literal["constant", "uniform", "lognormal"] = "constant"
+    mean: float = 0.0
+    spread: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        if self.distribution == "uniform":
+            return max(0.0, rng.uniform(self.mean - self.spread, self.mean + self.spread))
+        if self.distribution == "lognormal" and self.mean > 0:
+            return rng.lognormvariate(math.log(self.mean), self.spread)
+        return self.mean
+
+
+class FaultProfile(BaseModel):
+    """Errors injected into responses.
+
+    ``error_rate`` is the probability that a single call (or batch entry) is
+    answered with a JSON-RPC error. ``http_error_rate`` is the probability that
+    a whole HTTP request fails with ``http_status``. It only applies to HTTP.
+    """
+
+    error_rate: float = 0.0
+    error_code: int = -32000
+    http_error_rate: float = 0.0
+    http_status: int = 503
+
+
+class MockNodeConfig(BaseModel):
+    """Behaviour of a MockNode. ``bandwidth`` is in bytes per second."""
+
+    latency: LatencyProfile = LatencyProfile()
+    faults: FaultProfile = FaultProfile()
+    bandwidth: Optional[float] = None
+    seed: int = 0
+
+
+class MockNodeStats(BaseModel):
+    """Counters of what a MockNode has served."""
+
+    requests: int
+    calls: int
+    injected_errors: int
+    bytes_sent: int
+
+
+class MockNode:
+    """JSON-RPC node serving handler results over HTTP, IPC and WebSocket.
+
+    Start endpoints with ``serve_http``, ``serve_ipc`` and
+    ``serve_websocket``. They run on daemon threads until ``close``.
+    """
+
+    def __init__(
+        self,
+        handlers: Dict[str, Handler],
+        config: Optional[MockNodeConfig] = None,
+    ):
+        self.handlers = dict(handlers)
+        self.config = config or MockNodeConfig()
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._servers: List[socketserver.BaseServer] = []
+        self._ipc_paths: List[str] = []
+        self._requests = 0
+        self._calls = 0
+        self._injected_errors = 0
+        self._bytes_sent = 0
+
+    def stats(self) -> MockNodeStats:
+        with self._lock:
+            return MockNodeStats(
+                requests=self._requests,
+                calls=self._calls,
+                injected_errors=self._injected_errors,
+                bytes_sent=self._bytes_sent,
+            )
+
+    def _roll(self, probability: float) -> bool:
+        if probability <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < probability
+
+    def _delay(self) -> None:
+        with self._lock:
+            delay = self.config.latency.sample(self._rng)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _answer(self, request: Any) -> Dict[str, Any]:
+        request_id = request.get("id") if isinstance(request, dict) else None
+        with self._lock:
+            self._calls += 1
+
+        if not isinstance(request, dict) or "method" not in request:
+            error = {"code": -32600, "message": "invalid request"}
+        elif self._roll(self.config.faults.error_rate):
+            with self._lock:
+                self._injected_errors += 1
+            error = {"code": self.config.faults.error_code, "message": "injected error"}
+        elif request["method"] not in self.handlers:
+            error = {"code": -32601, "message": "method not found"}
+        else:
+            try:
+                result = self.handlers[request["method"]](request.get("params") or [])
+                return {"jsonrpc": "2.0", "id": request_id, "result": result}
+            except RPCError as exc:
+                error = {"code": exc.code, "message": exc.message}
+                if exc.data is not None:
+                    error["data"] = exc.data
+            except Exception as exc:
+                error = {"code": -32603, "message": str(exc)}
+
+        return {"jsonrpc": "2.0", "id": request_id, "error": error}
+
+    def dispatch(self, payload: Any) -> Any:
+        """Answer a decoded single or batch request, after the latency delay."""
+        with self._lock:
+            self._requests += 1
+        self._delay()
+        if isinstance(payload, list):
+            return [self._answer(request) for request in payload]
+        return self._answer(payload)
+
+    def handle_body(self, body: bytes) -> bytes:
+        """Answer a raw request body with a raw response body."""
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            response: Any = {
+                "jsonrpc": "2.0",
+                "id": None,
+                "error": {"code": -32700, "message": "parse error"},
+            }
+        else:
+            response = self.dispatch(payload)
+        return json.dumps(response, separators=(",", ":")).encode()
+
+    def _write(self, write: Callable[[bytes], Any], data: bytes) -> None:
+        """Write ``data``, paced to the configured bandwidth."""
+        with self._lock:
+            self._bytes_sent += len(data)
+        bandwidth = self.config.bandwidth
+        if not bandwidth:
+            write(data)
+        else:
+            start = time.monotonic()
+            view = memoryview(data)
+            for offset in range(0, len(data), _WRITE_CHUNK):
+                chunk = view[offset : offset + _WRITE_CHUNK]
+                write(chunk)
+                ahead = start + (offset + len(chunk)) / bandwidth - time.monotonic()
+                if ahead > 0:
+                    time.sleep(ahead)
+
+    def _start(self, server: socketserver.BaseServer) -> None:
+        server.node = self
+        server.daemon_threads = True
+        thread = threading.Thread(
+            target=server.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            name="pokebal-mocknode",
+            daemon=True,
+        )
+        thread.start()
+        self._servers.append(server)
+
+    def serve_http(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start an HTTP endpoint and return its URL."""
+        server = ThreadingHTTPServer((host, port), _HTTPHandler)
+        self._start(server)
+        return f"http://{host}:{server.server_address[1]}"
+
+    def serve_ipc(self, path: str) -> str:
+        """Start a unix socket endpoint at ``path`` and return the path."""
+        if os.path.exists(path):
+            os.unlink(path)
+        server = socketserver.ThreadingUnixStreamServer(path, _IPCHandler)
+        self._ipc_paths.append(path)
+        self._start(server)
+        return path
+
+    def serve_websocket(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start a WebSocket endpoint and return its URL."""
+        server = _TCPServer((host, port), _WebSocketHandler)
+        self._start(server)
+        return f"ws://{host}:{server.server_address[1]}"
+
+    def close(self) -> None:
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        self._servers = []
+        for path in self._ipc_paths:
+            if os.path.exists(path):
+                os.unlink(path)
+        self._ipc_paths = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+
+
+class _HTTPHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        node: MockNode = self.server.node
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        faults = node.config.faults
+        if node._roll(faults.http_error_rate):
+            with node._lock:
+                node._requests += 1
+                node._injected_errors += 1
+            node._delay()
+            self.send_response(faults.http_status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        response = node.handle_body(body)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        node._write(self.wfile.write, response)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class _IPCHandler(socketserver.StreamRequestHandler):
+    """Answers concatenated JSON requests, one newline-terminated response each."""
+
+    def handle(self) -> None:
+        node: MockNode = self.server.node
+        decoder = json.JSONDecoder()
+        text = codecs.getincrementaldecoder("utf-8")()
+        buffer = ""
+        while True:
+            data = self.request.recv(1 << 16)
+            if not data:
+                return
+            buffer += text.decode(data)
+            while True:
+                buffer = buffer.lstrip()
+                if not buffer:
+                    break
+                try:
+                    payload, end = decoder.raw_decode(buffer)
+                except ValueError:
+                    # Incomplete value, wait for more bytes
+                    break
+                buffer = buffer[end:]
+                response = json.dumps(node.dispatch(payload), separators=(",", ":"))
+                node._write(self.wfile.write, response.encode() + b"\n")
+
+
+class _WebSocketHandler(socketserver.StreamRequestHandler):
+    """Minimal RFC 6455 server: text/binary messages, ping and close."""
+
+    def handle(self) -> None:
+        node: MockNode = self.server.node
+        if not self._handshake():
+            return
+
+        message = bytearray()
+        while True:
+            frame = _read_frame(self.rfile)
+            if frame is None:
+                return
+            fin, opcode, payload = frame
+            if opcode == 0x8:
+                self.wfile.write(_frame(0x8, payload[:2]))
+                return
+            if opcode == 0x9:
+                self.wfile.write(_frame(0xA, payload))
+                continue
+            if opcode == 0xA:
+                continue
+            message += payload
+            if not fin:
+                continue
+            response = node.handle_body(bytes(message))
+            message.clear()
+            node._write(self.wfile.write, _frame(0x1, response))
+
+    def _handshake(self) -> bool:
+        headers: Dict[str, str] = {}
+        self.rfile.readline()
+        while True:
+            line = self.rfile.readline().decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        key = headers.get("sec-websocket-key")
+        if key is None:
+            self.wfile.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+            return False
+        accept = base64.b64encode(hashlib.sha1(key.encode() + _WEBSOCKET_GUID).digest())
+        self.wfile.write(
+            b"HTTP/1.1 101 Switching Protocols\r\n"
+            b"Upgrade: websocket\r\n"
+            b"Connection: Upgrade\r\n"
+            b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n"
+        )
+        return True
+
+
+def _read_exact(stream: BinaryIO, size: int) -> Optional[bytes]:
+    data = stream.read(size)
+    return data if len(data) == size else None
+
+
+def _read_frame(stream: BinaryIO) -> Optional[Tuple[bool, int, bytes]]:
+    """Read one WebSocket frame as ``(fin, opcode, unmasked payload)``."""
+    header = _read_exact(stream, 2)
+    if header is None:
+        return None
+    fin = bool(header[0] & 0x80)
+    opcode = header[0] & 0x0F
+    masked = header[1] & 0x80
+    length = header[1] & 0x7F
+    if length == 126:
+        extended = _read_exact(stream, 2)
+        if extended is None:
+            return None
+        length = int.from_bytes(extended, "big")
+    elif length == 127:
+        extended = _read_exact(stream, 8)
+        if extended is None:
+            return None
+        length = int.from_bytes(extended, "big")
+
+    mask = _read_exact(stream, 4) if masked else None
+    payload = _read_exact(stream, length) if length else b""
+    if payload is None or (masked and mask is None):
+        return None
+    if mask is not None and payload:
+        # XOR the whole payload at once instead of byte by byte
+        key = (mask * (length // 4 + 1))[:length]
+        payload = (
+            int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")
+        ).to_bytes(length, "big")
+    return fin, opcode, payload
+
+
+def _frame(opcode: int, payload: bytes) -> bytes:
+    """Build an unmasked, unfragmented server frame."""
+    length = len(payload)
+    if length < 126:
+        header = bytes([0x80 | opcode, length])
+    elif length < 1 << 16:
+        header = bytes([0x80 | opcode, 126]) + length.to_bytes(2, "big")
+    else:
+        header = bytes([0x80 | opcode, 127]) + length.to_bytes(8, "big")
+    return header + payload
+
+
+def params_key(method: str, params: Optional[list]) -> str:
+    """Canonical string key of a call, independent of params formatting."""
+    return json.dumps([method, params or []], sort_keys=True, separators=(",", ":"))
+
+
+class RecordedResponses:
+    """Serves results captured from a real node, keyed by method and params.
+
+    Calls that were not recorded are answered with a JSON-RPC error.
+    """
+
+    def __init__(self, responses: Optional[Dict[str, Any]] = None):
+        self.responses: Dict[str, Any] = dict(responses or {})
+
+    def record(self, method: str, params: Optional[list], result: Any) -> None:
+        self.responses[params_key(method, params)] = result
+
+    @classmethod
+    def from_jsonl(cls, path: str) -> "RecordedResponses":
+        """Load ``{"method", "params", "result"}`` lines."""
+        recorded = cls()
+        with open(path) as file:
+            for line in file:
+                if line.strip():
+                    entry = json.loads(line)
+                    recorded.record(entry["method"], entry.get("params"), entry["result"])
+        return recorded
+
+    def _handler(self, method: str) -> Handler:
+        def handle(params: list) -> Any:
+            key = params_key(method, params)
+            if key not in self.responses:
+                raise RPCError({"code": -32000, "message": f"no recorded response for {key}"})
+            return self.responses[key]
+
+        return handle
+
+    def handlers(self) -> Dict[str, Handler]:
+        methods = {json.loads(key)[0] for key in self.responses}
+        return {method: self._handler(method) for method in methods}
+
+
+class SyntheticChain:
+    """Deterministic blocks, prestate traces and account state.
+
+    Every transaction of block ``b`` sends value between ``accounts_per_tx``
+    accounts drawn from a pool of ``account_pool`` addresses and writes
+    ``slots_per_tx`` storage slots of one of them. Transaction hashes encode
+    ``(block, index)`` so ``debug_traceTransaction`` can be answered without
+    an index. State lookups return values derived from the address, so the
+    same chain and seed always produce byte-identical responses.
+    """
+
+    def __init__(
+        self,
+        head: int = 1_000,
+        txs_per_block: int = 100,
+        accounts_per_tx: int = 3,
+        slots_per_tx: int = 2,
+        account_pool: int = 10_000,
+        seed: int = 0,
+    ):
+        self.head = head
+        self.txs_per_block = txs_per_block
+        self.accounts_per_tx = accounts_per_tx
+        self.slots_per_tx = slots_per_tx
+        self.account_pool = account_pool
+        self.seed = seed
+
+    def address(self, index: int) -> str:
+        return "0x" + hashlib.sha256(f"{self.seed}:account:{index}".encode()).hexdigest()[:40]
+
+    @staticmethod
+    def tx_hash(block_number: int, index: int) -> str:
+        return f"0x{block_number:032x}{index:032x}"
+
+    def _word(self, *parts: Any) -> int:
+        digest = hashlib.sha256(":".join(map(str, (self.seed,) + parts)).encode()).digest()
+        return int.from_bytes(digest[:8], "big")
+
+    def transaction_trace(self, block_number: int, index: int) -> Dict[str, Any]:
+        """Diff-mode prestate result of one transaction."""
+        rng = random.Random(self._word("tx", block_number, index))
+        accounts = [
+            self.address(rng.randrange(self.account_pool))
+            for _ in range(self.accounts_per_tx)
+        ]
+        pre: Dict[str, Any] = {}
+        post: Dict[str, Any] = {}
+        for position, address in enumerate(dict.fromkeys(accounts)):
+            balance = self._word("balance", address) + block_number * 1_000 + index
+            pre[address] = {"balance": hex(balance), "nonce": block_number}
+            post[address] = {"balance": hex(balance + rng.randrange(1, 1 << 32))}
+            if position == 0:
+                post[address]["nonce"] = block_number + 1
+
+        contract = accounts[-1]
+        slots = [f"0x{rng.randrange(1 << 256):064x}" for _ in range(self.slots_per_tx)]
+        pre[contract]["storage"] = {slot: f"0x{0:064x}" for slot in slots}
+        post[contract]["storage"] = {slot: f"0x{rng.randrange(1 << 256):064x}" for slot in slots}
+        return {"pre": pre, "post": post}
+
+    def block(self, block_number: int, full: bool = False) -> Dict[str, Any]:
+        hashes = [self.tx_hash(block_number, index) for index in range(self.txs_per_block)]
+        transactions: List[Any] = hashes
+        if full:
+            transactions = [
+                {
+                    "hash": tx_hash,
+                    "from": self.address(self._word("from", tx_hash) % self.account_pool),
+                    "to": self.address(self._word("to", tx_hash) % self.account_pool),
+                }
+                for tx_hash in hashes
+            ]
+        return {
+            "number": hex(block_number),
+            "hash": f"0x{self._word('block', block_number):064x}",
+            "transactions": transactions,
+        }
+
+    def handlers(self) -> Dict[str, Handler]:
+        def block_number(params: list) -> int:
+            tag = params[0] if params else "latest"
+            return self.head if tag in ("latest", "pending", "safe", "finalized") else int(tag, 16)
+
+        def trace_block(params: list) -> List[Dict[str, Any]]:
+            number = block_number(params)
+            return [
+                {"txHash": self.tx_hash(number, index), "result": self.transaction_trace(number, index)}
+                for index in range(self.txs_per_block)
+            ]
+
+        def trace_transaction(params: list) -> Dict[str, Any]:
+            value = int(params[0], 16)
+            return self.transaction_trace(value >> 128, value & ((1 << 128) - 1))
+
+        def state(kind: str) -> Handler:
+            return lambda params: hex(self._word(kind, *params[:-1]))
+
+        return {
+            "eth_blockNumber": lambda params: hex(self.head),
+            "eth_chainId": lambda params: "0x1",
+            "eth_getBlockByNumber": lambda params: self.block(
+                block_number(params), bool(params[1]) if len(params) > 1 else False
+            ),
+            "debug_traceBlockByNumber": trace_block,
+            "debug_traceTransaction": trace_transaction,
+            "eth_getBalance": state("balance"),
+            "eth_getTransactionCount": lambda params: hex(self._word("nonce", params[0]) % 1_000),
+            "eth_getCode": lambda params: "0x",
+            "eth_getStorageAt": lambda params: f"0x{self._word('storage', *params[:2]):064x}",
+        }
+
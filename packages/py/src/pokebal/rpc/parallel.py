@@ -0,0 +1,200 @@
+"""Multi-core decoding of a single large trace response.
+
+Decoding and validating one ``debug_traceBlockByNumber`` body of hundreds of
+megabytes is single-threaded. ``map_trace_slices`` cuts the ``result`` array
+into byte ranges of whole transaction traces, copies the body once into
+shared memory and lets a process pool validate each range straight from its
+JSON bytes. Each worker then applies a function to its traces, so only the
+function's result is sent back.
+
+Cut points are found by searching for ``},{`` near evenly spaced offsets,
+which is fast but may land inside a trace for tracers that nest arrays of
+objects. A wrong cut always leaves a range that fails to parse, in which
+case the ranges are recomputed with an exact structural scan and retried.
+"""
+
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from pydantic import TypeAdapter
+
+from .client import RPCError
+from .types import BlockDebugTraceResult
+from pokebal.common.jsonstream import iter_json_items
+
+ByteRange = Tuple[int, int]
+SliceFunc = Callable[[BlockDebugTraceResult], Any]
+
+# Bodies below this size are decoded in the calling process
+MIN_PARALLEL_BYTES = 4 * 1024 * 1024
+
+_RESULT_ARRAY = re.compile(rb'"result"\s*:\s*\[')
+_ELEMENT_GAP = re.compile(rb"\}\s*,\s*\{")
+
+_block_adapter = TypeAdapter(BlockDebugTraceResult)
+
+
+def _result_bounds(body: bytes) -> Optional[ByteRange]:
+    """Return the byte range inside the brackets of the ``result`` array."""
+    match = _RESULT_ARRAY.search(body)
+    if match is None:
+        return None
+    # Only short scalars (id, jsonrpc) can follow the array
+    return match.end(), body.rfind(b"]")
+
+
+def guess_trace_ranges(body: bytes, parts: int) -> List[ByteRange]:
+    """Cut the ``result`` array into about ``parts`` ranges of whole elements.
+
+    Returns an empty list if the body has no ``result`` array.
+    """
+    bounds = _result_bounds(body)
+    if bounds is None:
+        return []
+    start, end = bounds
+    if not body[start:end].strip():
+        return []
+
+    ranges = []
+    for part in range(1, parts):
+        target = start + (end - start) * part // parts
+        gap = _ELEMENT_GAP.search(body, max(target, start), end)
+        if gap is None:
+            break
+        ranges.append((start, gap.start() + 1))
+        start = gap.end() - 1
+    ranges.append((start, end))
+    return ranges
+
+
+def exact_trace_ranges(body: bytes, parts: int) -> List[ByteRange]:
+    """Like ``guess_trace_ranges``, cutting only at verified element boundaries.
+
+    Raises:
+        RPCError: If the body is an error response
+    """
+    spans = []
+    for path, span in iter_json_items([body], [("result", "*"), ("error",)], decode=None):
+        if path == ("error",):
+            raise RPCError(_block_error(body))
+        spans.append(span)
+    if not spans:
+        return []
+
+    target = max(1, (spans[-1][1] - spans[0][0]) // parts)
+    ranges = []
+    first = spans[0][0]
+    for index, (span_start, span_end) in enumerate(spans):
+        last = index == len(spans) - 1
+        if last or spans[index + 1][0] - first >= target:
+            ranges.append((first, span_end))
+            if not last:
+                first = spans[index + 1][0]
+    return ranges
+
+
+def _block_error(body: bytes) -> dict:
+    return json.loads(body).get("error") or {"code": None, "message": "no result"}
+
+
+def _decode_range(data: Any, start: int, end: int) -> BlockDebugTraceResult:
+    return _block_adapter.validate_json(b"[" + bytes(data[start:end]) + b"]")
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to the parent's shared memory without taking ownership of it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 attachments are always tracked. Pool workers
+        # share the parent's resource tracker, so the parent's unlink still
+        # releases the segment exactly once
+        return shared_memory.SharedMemory(name=name)
+
+
+def _apply_to_range(name: str, start: int, end: int, func: SliceFunc) -> Any:
+    memory = _attach(name)
+    try:
+        return func(_decode_range(memory.buf, start, end))
+    except ValueError as exc:
+        # Validation errors do not survive pickling back to the parent
+        raise ValueError(str(exc)) from None
+    finally:
+        memory.close()
+
+
+def _identity(traces: BlockDebugTraceResult) -> BlockDebugTraceResult:
+    return traces
+
+
+def _run(
+    body: bytes, ranges: Sequence[ByteRange], func: SliceFunc, workers: int
+) -> List[Any]:
+    if workers == 1 or len(ranges) == 1:
+        return [func(_decode_range(body, start, end)) for start, end in ranges]
+
+    memory = shared_memory.SharedMemory(create=True, size=len(body))
+    try:
+        memory.buf[: len(body)] = body
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+            futures = [
+                pool.submit(_apply_to_range, memory.name, start, end, func)
+                for start, end in ranges
+            ]
+            return [future.result() for future in futures]
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+def map_trace_slices(
+    body: bytes, func: SliceFunc = _identity, workers: Optional[int] = None
+) -> List[Any]:
+    """Apply ``func`` to consecutive slices of a block trace response.
+
+    Args:
+        body: Raw ``debug_traceBlockByNumber`` JSON-RPC response body
+        func: Picklable function taking a list of ``TransactionTrace``. It runs
+            in the worker processes
+        workers: Worker processes. Defaults to the number of CPUs. Bodies
+            smaller than ``MIN_PARALLEL_BYTES`` are handled in this process
+
+    Returns:
+        Results of ``func`` for each slice, in transaction order
+
+    Raises:
+        RPCError: If the body is an error response
+        ValueError: If the body is not a valid block trace
+    """
+    workers = workers or os.cpu_count() or 1
+    if len(body) < MIN_PARALLEL_BYTES:
+        workers = 1
+    # A few ranges per worker keeps workers busy when ranges differ in cost
+    parts = 1 if workers == 1 else workers * 4
+
+    ranges = guess_trace_ranges(body, parts)
+    if not ranges:
+        exact_trace_ranges(body, parts)
+        return []
+    try:
+        return _run(body, ranges, func, workers)
+    except ValueError:
+        if len(ranges) == 1:
+            raise
+    return _run(body, exact_trace_ranges(body, parts), func, workers)
+
+
+def decode_block_trace(body: bytes, workers: Optional[int] = None) -> BlockDebugTraceResult:
+    """Decode and validate a ``debug_traceBlockByNumber`` response body.
+
+    Traces are validated directly from JSON bytes, which is faster than
+    decoding to Python objects first even in a single process. Note that
+    traces decoded by workers are pickled back to this process, which costs
+    about as much as validating them, so prefer ``map_trace_slices`` with a
+    function that reduces each slice when the traces are not needed as such.
+    """
+    return [trace for traces in map_trace_slices(body, workers=workers) for trace in traces]
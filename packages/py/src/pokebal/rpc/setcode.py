@@ -0,0 +1,102 @@
+"""Authorities of EIP-7702 set-code transactions.
+
+An authorization tuple names the delegate ``address`` but not the account
+it delegates, which is recovered from the tuple's signature over
+``keccak256(0x05 || rlp([chain_id, address, nonce]))``. Nodes apply
+authorizations before the transaction executes, so tracers need the
+authorities up front to report their nonce and code changes.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from coincurve import PublicKey
+from eth_hash.auto import keccak
+
+SET_CODE_TX_TYPE = 4
+
+_MAGIC = b"\x05"
+
+# secp256k1 group order
+_N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+
+
+def _rlp_uint(value: int) -> bytes:
+    payload = value.to_bytes((value.bit_length() + 7) // 8, "big")
+    if len(payload) == 1 and payload[0] < 0x80:
+        return payload
+    return bytes([0x80 + len(payload)]) + payload
+
+
+def _rlp_list(items: List[bytes]) -> bytes:
+    payload = b"".join(items)
+    if len(payload) <= 55:
+        return bytes([0xC0 + len(payload)]) + payload
+    length = len(payload).to_bytes((len(payload).bit_length() + 7) // 8, "big")
+    return bytes([0xF7 + len(length)]) + length + payload
+
+
+def authorization_hash(chain_id: int, address: str, nonce: int) -> bytes:
+    """Return the hash an authority signs to delegate to ``address``."""
+    delegate = bytes.fromhex(address[2:])
+    encoded = _rlp_list([_rlp_uint(chain_id), bytes([0x94]) + delegate, _rlp_uint(nonce)])
+    return keccak(_MAGIC + encoded)
+
+
+def recover_address(message_hash: bytes, y_parity: int, r: int, s: int) -> Optional[str]:
+    """Recover the address that signed ``message_hash``.
+
+    Returns None for signatures EIP-7702 rejects: out of range values, a
+    high ``s`` or a point not on the curve.
+    """
+    if not (0 < r < _N and 0 < s <= _N // 2 and y_parity in (0, 1)):
+        return None
+    signature = r.to_bytes(32, "big") + s.to_bytes(32, "big") + bytes([y_parity])
+    try:
+        public = PublicKey.from_signature_and_message(signature, message_hash, hasher=None)
+    except ValueError:
+        return None
+    return "0x" + keccak(public.format(compressed=False)[1:])[12:].hex()
+
+
+def recover_authority(authorization: Dict[str, Any]) -> Optional[str]:
+    """Recover the authority of an authorization tuple as returned over RPC.
+
+    Returns None when the signature is invalid, in which case nodes skip
+    the authorization.
+    """
+    message_hash = authorization_hash(
+        int(authorization["chainId"], 16),
+        authorization["address"],
+        int(authorization["nonce"], 16),
+    )
+    return recover_address(
+        message_hash,
+        int(authorization["yParity"], 16),
+        int(authorization["r"], 16),
+        int(authorization["s"], 16),
+    )
+
+
+def block_authorities(transactions: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """Map the index of each set-code transaction to its authorities.
+
+    Args:
+        transactions: Full transaction objects of a block, as returned by
+            ``eth_getBlockByNumber`` with ``True``
+
+    Returns:
+        Authorities by transaction index, as a string so the mapping can be
+        sent as JSON
+    """
+    authorities = {}
+    for index, transaction in enumerate(transactions):
+        if int(transaction.get("type", "0x0"), 16) != SET_CODE_TX_TYPE:
+            continue
+        recovered = [
+            recover_authority(authorization)
+            for authorization in transaction.get("authorizationList", [])
+        ]
+        recovered = [authority for authority in recovered if authority is not None]
+        if recovered:
+            authorities[str(index)] = list(dict.fromkeys(recovered))
+    return authorities
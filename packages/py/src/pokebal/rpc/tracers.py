@@ -0,0 +1,247 @@
+"""Custom JavaScript tracers shipped with pokebal.
+
+Tracers are passed verbatim as the ``tracer`` option of ``debug_trace*``
+calls and run inside the node's JavaScript tracing engine.
+"""
+
+from typing import Any, Dict, List
+
+from .setcode import block_authorities
+from .types import CompactBlockTraceResult
+
+# Emits one record per touched account, in first-touch order:
+#
+#   [address, post_balance, post_nonce, post_code, writes, reads]
+#
+# post_balance (hex), post_nonce (int) and post_code (hex) are null when the
+# field did not change. writes is a flat [slot, post_value, slot, post_value,
+# ...] list of slots whose value changed, reads lists slots that were loaded
+# or stored without changing. The tracer has no keccak, so changed code is
+# detected by length, or by content for designator-sized code (<= 23 bytes,
+# which covers EIP-7702 delegations), and emitted in full.
+#
+# An account's fields are recorded when the first step touches it, which is
+# after the sender paid for gas and authorizations were applied, and before
+# the coinbase is paid its fee. Changes made outside that window cannot be
+# compared, so post values are always emitted for the sender's balance and
+# nonce, the nonce and code of the transaction's EIP-7702 authorities, and
+# the coinbase balance unless execution touched the coinbase. The tracer
+# config names them, see ``compact_tracer_config``:
+#
+#   {"coinbase": address, "authorities": {tx_index: [address, ...]}}
+COMPACT_BAL_TRACER = """{
+    accounts: null,
+    order: null,
+    config: {},
+
+    setup: function(config) {
+        this.config = config || {};
+    },
+
+    reset: function() {
+        if (this.accounts === null) {
+            this.accounts = {};
+            this.order = [];
+        }
+    },
+
+    touch: function(addr, db) {
+        var key = toHex(addr);
+        var account = this.accounts[key];
+        if (account === undefined) {
+            var code = db.getCode(addr);
+            account = {
+                addr: addr,
+                balance: db.getBalance(addr),
+                nonce: db.getNonce(addr),
+                codeLength: code.length,
+                code: code.length <= 23 ? toHex(code) : null,
+                slots: {}
+            };
+            this.accounts[key] = account;
+            this.order.push(key);
+        }
+        return account;
+    },
+
+    touchSlot: function(addr, slot, db) {
+        var account = this.touch(addr, db);
+        var key = toHex(slot);
+        if (account.slots[key] === undefined) {
+            account.slots[key] = toHex(db.getState(addr, slot));
+        }
+    },
+
+    step: function(log, db) {
+        if (this.accounts === null) {
+            this.reset();
+            this.touch(log.contract.getAddress(), db);
+        }
+        switch (log.op.toString()) {
+            case "SLOAD": case "SSTORE":
+                var slot = toWord(log.stack.peek(0).toString(16));
+                this.touchSlot(log.contract.getAddress(), slot, db);
+                break;
+            case "BALANCE": case "EXTCODESIZE": case "EXTCODECOPY":
+            case "EXTCODEHASH": case "SELFDESTRUCT":
+                this.touch(toAddress(log.stack.peek(0).toString(16)), db);
+                break;
+            case "CALL": case "CALLCODE": case "DELEGATECALL": case "STATICCALL":
+                this.touch(toAddress(log.stack.peek(1).toString(16)), db);
+                break;
+            case "CREATE":
+                var creator = log.contract.getAddress();
+                this.touch(toContract(creator, db.getNonce(creator)), db);
+                break;
+            case "CREATE2":
+                var factory = log.contract.getAddress();
+                var offset = log.stack.peek(1).valueOf();
+                var size = log.stack.peek(2).valueOf();
+                var initCode = log.memory.slice(offset, offset + size);
+                this.touch(toContract2(factory, log.stack.peek(3).toString(16), initCode), db);
+                break;
+        }
+    },
+
+    fault: function(log, db) {},
+
+    result: function(ctx, db) {
+        this.reset();
+        var from = toHex(ctx.from);
+        var to = toHex(ctx.to);
+        var coinbase = this.config.coinbase !== undefined ? toAddress(this.config.coinbase) : null;
+        var coinbaseTouched = coinbase !== null && this.accounts[toHex(coinbase)] !== undefined;
+        this.touch(ctx.to, db);
+        this.touch(ctx.from, db);
+
+        // Fields whose post value is emitted even if it equals the recorded one
+        var forced = {};
+        forced[from] = {balance: true, nonce: true};
+        if (coinbase !== null) {
+            this.touch(coinbase, db);
+            if (!coinbaseTouched) {
+                forced[toHex(coinbase)] = {balance: true};
+            }
+        }
+        var authorities = (this.config.authorities || {})[ctx.txIndex] || [];
+        for (var i = 0; i < authorities.length; i++) {
+            var authority = toAddress(authorities[i]);
+            this.touch(authority, db);
+            var force = forced[toHex(authority)] || {};
+            force.nonce = true;
+            force.code = true;
+            forced[toHex(authority)] = force;
+        }
+
+        // The value transfer happened before the first touch of the recipient
+        var recipient = this.accounts[to];
+        if (ctx.type == "CREATE") {
+            recipient.balance = bigInt.zero;
+            recipient.nonce = 0;
+            recipient.codeLength = 0;
+            recipient.code = "0x";
+        } else if (to != from) {
+            recipient.balance = recipient.balance.subtract(ctx.value);
+        }
+
+        var records = [];
+        for (var i = 0; i < this.order.length; i++) {
+            var key = this.order[i];
+            var account = this.accounts[key];
+            var addr = account.addr;
+            var force = forced[key] || {};
+
+            var postBalance = db.getBalance(addr);
+            var balance = null;
+            if (force.balance || !postBalance.equals(account.balance)) {
+                balance = "0x" + postBalance.toString(16);
+            }
+            var postNonce = db.getNonce(addr);
+            var nonce = force.nonce || postNonce != account.nonce ? postNonce : null;
+
+            var code = null;
+            var postCode = db.getCode(addr);
+            var codeChanged = postCode.length != account.codeLength ||
+                (account.code !== null && toHex(postCode) != account.code);
+            if (force.code || codeChanged) {
+                code = toHex(postCode);
+            }
+
+            var writes = [];
+            var reads = [];
+            for (var slot in account.slots) {
+                var value = toHex(db.getState(addr, toWord(slot)));
+                if (value != account.slots[slot]) {
+                    writes.push(slot, value);
+                } else {
+                    reads.push(slot);
+                }
+            }
+            records.push([key, balance, nonce, code, writes, reads]);
+        }
+        return records;
+    }
+}"""
+
+
+def compact_tracer_config(block: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the ``tracerConfig`` of ``COMPACT_BAL_TRACER`` for a block.
+
+    Args:
+        block: Block as returned by ``eth_getBlockByNumber`` with full
+            transactions
+    """
+    return {
+        "coinbase": block["miner"].lower(),
+        "authorities": block_authorities(block["transactions"]),
+    }
+
+
+def forced_accounts(config: Dict[str, Any]) -> List[str]:
+    """Return the accounts whose post values the tracer emits unconditionally."""
+    accounts = [config["coinbase"]]
+    for authorities in config["authorities"].values():
+        accounts.extend(authorities)
+    return list(dict.fromkeys(accounts))
+
+
+def drop_unchanged(
+    traces: CompactBlockTraceResult,
+    balances: Dict[str, int],
+    nonces: Dict[str, int],
+    codes: Dict[str, str],
+) -> None:
+    """Clear fields of ``forced_accounts`` that did not change, in place.
+
+    Walks the block in order from the pre-block values of the accounts,
+    so a forced value equal to the account's last value is dropped. That is
+    the coinbase of a transaction paying no priority fee, or the authority
+    of an authorization the node skipped.
+
+    Args:
+        traces: Compact traces of the whole block
+        balances: Pre-block balance of each forced account
+        nonces: Pre-block nonce of each forced account
+        codes: Pre-block code of each forced account
+    """
+    balances, nonces, codes = dict(balances), dict(nonces), dict(codes)
+    for trace in traces:
+        for record in trace.result:
+            address = record.address.lower()
+            if address not in balances:
+                continue
+            if record.balance is not None:
+                if int(record.balance, 16) == balances[address]:
+                    record.balance = None
+                else:
+                    balances[address] = int(record.balance, 16)
+            if record.nonce is not None:
+                if record.nonce == nonces[address]:
+                    record.nonce = None
+                else:
+                    nonces[address] = record.nonce
+            if record.code is not None:
+                if record.code == codes[address]:
+                    record.code = None
+                else:
+                    codes[address] = record.code
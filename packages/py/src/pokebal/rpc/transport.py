@@ -1,30 +1,257 @@
+import io
+import json
+import mmap
+import tempfile
+import threading
+
 import httpx
-from typing import Any, Dict, Optional
+from pydantic import BaseModel
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Union
+
+from pokebal.common.jsonstream import WILDCARD, iter_json_items
+
+# Top-level paths decoded from a spilled response, see _decode_spilled
+_RESPONSE_PATTERNS = [("jsonrpc",), ("id",), ("error",), ("result", WILDCARD)]
+_SPILL_READ_SIZE = 1 << 20
+
+
+class ResponseTooLargeError(Exception):
+    """A response body exceeded ``DownloadPolicy.max_response_bytes``."""
+
+    def __init__(self, size: int, limit: int):
+        self.size = size
+        self.limit = limit
+        super().__init__(f"Response of at least {size} bytes exceeds the {limit} byte cap")
+
+
+class DownloadPolicy(BaseModel):
+    """How ``HTTPTransport`` receives response bodies.
+
+    Bodies larger than ``spill_threshold`` are written to a temporary file in
+    ``spill_dir`` and decoded from a memory map, one ``result`` element at a
+    time, instead of being held in memory twice (raw and decoded). Bodies
+    over ``max_response_bytes`` are rejected. ``max_in_flight_bytes`` caps
+    the body bytes being received and decoded by all concurrent requests.
+    """
+
+    spill_threshold: int = 8 * 1024 * 1024
+    max_response_bytes: int = 2 * 1024 * 1024 * 1024
+    max_in_flight_bytes: Optional[int] = None
+    spill_dir: Optional[str] = None
+
+
+class ByteBudget:
+    """Shared budget of response bytes in flight across concurrent requests.
+
+    A request reserves its body size up front when the server announces it,
+    waiting until the bytes fit. A request alone may always proceed, so a
+    single body larger than the budget cannot deadlock. Bodies of unknown
+    size reserve as they arrive without waiting, which can overshoot the
+    limit, but every new request then waits until usage drops again.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._used = 0
+        self._condition = threading.Condition()
+
+    @property
+    def used(self) -> int:
+        return self._used
+
+    def reserve(self, size: int, wait: bool = True) -> None:
+        with self._condition:
+            if wait:
+                self._condition.wait_for(
+                    lambda: self._used == 0 or self._used + size <= self.limit
+                )
+            self._used += size
+
+    def release(self, size: int) -> None:
+        with self._condition:
+            self._used -= size
+            self._condition.notify_all()
 
 
 class HTTPTransport:
     def __init__(
-        self, url: str, timeout: float = 30.0, headers: Optional[Dict[str, str]] = None
+        self,
+        url: str,
+        timeout: float = 30.0,
+        headers: Optional[Dict[str, str]] = None,
+        download: Optional[DownloadPolicy] = None,
+        budget: Optional[ByteBudget] = None,
     ):
         self.url = url
         self.timeout = timeout
         self.custom_headers = headers or {}
         self.client = httpx.Client(timeout=timeout)
+        self.download = download
+        if budget is None and download is not None and download.max_in_flight_bytes:
+            budget = ByteBudget(download.max_in_flight_bytes)
+        self.budget = budget
+        self._local = threading.local()
+
+    @property
+    def last_response_size(self) -> Optional[int]:
+        """Body size in bytes of the last response received on this thread."""
+        return getattr(self._local, "last_response_size", None)
+
+    def send(
+        self, request: Union[Dict[str, Any], List[Dict[str, Any]]]
+    ) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        if self.download is not None:
+            return self._send_bounded(request)
 
-    def send(self, request: Dict[str, Any]) -> Dict[str, Any]:
         headers = {"Content-Type": "application/json"}
         headers.update(self.custom_headers)
 
         response = self.client.post(self.url, json=request, headers=headers)
 
         response.raise_for_status()
+        self._local.last_response_size = len(response.content)
         return response.json()
 
+    def _send_bounded(
+        self, request: Union[Dict[str, Any], List[Dict[str, Any]]]
+    ) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        """Send a request under the download policy's memory bounds."""
+        policy = self.download
+        headers = {"Content-Type": "application/json"}
+        headers.update(self.custom_headers)
+
+        reserved = 0
+        body: BinaryIO = io.BytesIO()
+        try:
+            with self.client.stream(
+                "POST", self.url, json=request, headers=headers
+            ) as response:
+                response.raise_for_status()
+                reserved = self._reserve_announced(response)
+
+                size = 0
+                for chunk in response.iter_bytes(_SPILL_READ_SIZE):
+                    size += len(chunk)
+                    reserved = self._reserve_received(size, reserved)
+                    if isinstance(body, io.BytesIO) and size > policy.spill_threshold:
+                        body = self._spill(body)
+                    body.write(chunk)
+
+            self._local.last_response_size = size
+            if isinstance(body, io.BytesIO):
+                return json.loads(body.getvalue())
+            return _decode_spilled(body, size)
+        finally:
+            body.close()
+            if self.budget is not None and reserved:
+                self.budget.release(reserved)
+
+    def _reserve_announced(self, response: httpx.Response) -> int:
+        """Check an announced body size against the cap and reserve it.
+
+        Returns:
+            Bytes reserved from the budget, 0 if the size is not announced
+        """
+        announced = response.headers.get("Content-Length")
+        if announced is None:
+            return 0
+        if int(announced) > self.download.max_response_bytes:
+            raise ResponseTooLargeError(int(announced), self.download.max_response_bytes)
+        if self.budget is None:
+            return 0
+        self.budget.reserve(int(announced))
+        return int(announced)
+
+    def _reserve_received(self, size: int, reserved: int) -> int:
+        """Check the bytes received so far, reserving those beyond ``reserved``.
+
+        Returns:
+            Bytes reserved from the budget
+        """
+        if size > self.download.max_response_bytes:
+            raise ResponseTooLargeError(size, self.download.max_response_bytes)
+        if self.budget is not None and size > reserved:
+            self.budget.reserve(size - reserved, wait=False)
+            return size
+        return reserved
+
+    def _spill(self, buffer: io.BytesIO) -> BinaryIO:
+        spilled = tempfile.TemporaryFile(
+            prefix="pokebal-response-", dir=self.download.spill_dir
+        )
+        spilled.write(buffer.getbuffer())
+        return spilled
+
+    def stream(
+        self, request: Dict[str, Any], chunk_size: int = 1 << 16
+    ) -> Iterator[bytes]:
+        """Send a request and yield the raw response body in chunks.
+
+        With a download policy, the body counts against its size cap and
+        byte budget until the stream ends. Nothing is spilled, since the
+        chunks are handed on as they arrive.
+
+        Raises:
+            ResponseTooLargeError: Once the body exceeds the policy's cap
+        """
+        headers = {"Content-Type": "application/json"}
+        headers.update(self.custom_headers)
+
+        with self.client.stream(
+            "POST", self.url, json=request, headers=headers
+        ) as response:
+            response.raise_for_status()
+            if self.download is None:
+                yield from response.iter_bytes(chunk_size)
+                return
+
+            reserved = self._reserve_announced(response)
+            try:
+                size = 0
+                for chunk in response.iter_bytes(chunk_size):
+                    size += len(chunk)
+                    reserved = self._reserve_received(size, reserved)
+                    yield chunk
+            finally:
+                if self.budget is not None and reserved:
+                    self.budget.release(reserved)
+
     def close(self):
         self.client.close()
 
     def __enter__(self):
         return self
 
-    def __exit__(self):
+    def __exit__(self, *exc_info):
         self.close()
+
+
+def _decode_spilled(file: BinaryIO, size: int) -> Any:
+    """Decode a response body from a file without reading it into memory.
+
+    Each element of a ``result`` array or object is decoded on its own from a
+    memory map, so the raw body is never held in memory as a whole.
+    """
+    file.flush()
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        chunks = (
+            data[start : start + _SPILL_READ_SIZE]
+            for start in range(0, size, _SPILL_READ_SIZE)
+        )
+        if data[:64].lstrip()[:1] == b"[":
+            # A batch response, small per entry but possibly many of them
+            return json.loads(data[:])
+
+        response: Dict[str, Any] = {}
+        for path, value in iter_json_items(chunks, _RESPONSE_PATTERNS):
+            if len(path) == 1:
+                response[path[0]] = value
+            elif isinstance(path[1], int):
+                response.setdefault("result", []).append(value)
+            else:
+                response.setdefault("result", {})[path[1]] = value
+
+        if "result" not in response and "error" not in response:
+            # An empty or scalar result, cheap to decode in full
+            return json.loads(data[:])
+        return response
@@ -1,5 +1,5 @@
-from typing import Dict, List, Optional
-from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, model_validator
 
 from pokebal.common.types import (
     HexString,
@@ -13,6 +13,7 @@ class AccountState(BaseModel):
 
     balance: Optional[HexString] = None
     code: Optional[HexString] = None
+    codeHash: Optional[Hash] = None
     nonce: Optional[int] = None
     storage: Optional[Dict[HexString, HexString]] = None
 
@@ -31,5 +32,55 @@ class TransactionTrace(BaseModel):
     txHash: Hash
 
 
+class PrestateTransactionTrace(BaseModel):
+    """Individual transaction trace from the prestate tracer outside diff mode.
+
+    ``result`` holds the pre-transaction state of every account and storage
+    slot the transaction accessed, whether or not it changed.
+    """
+
+    result: Dict[Address, AccountState]
+    txHash: Hash
+
+
+class CompactAccountRecord(BaseModel):
+    """Account record emitted by the compact BAL tracer.
+
+    Decoded from the tracer's array layout
+    ``[address, balance, nonce, code, writes, reads]``. ``balance``, ``nonce``
+    and ``code`` hold post-transaction values and are None when unchanged.
+    """
+
+    address: Address
+    balance: Optional[HexString] = None
+    nonce: Optional[int] = None
+    code: Optional[HexString] = None
+    storage_writes: Dict[HexString, HexString] = {}
+    storage_reads: List[HexString] = []
+
+    @model_validator(mode="before")
+    @classmethod
+    def _from_array(cls, data: Any) -> Any:
+        if not isinstance(data, (list, tuple)):
+            return data
+        address, balance, nonce, code, writes, reads = data
+        return {
+            "address": address,
+            "balance": balance,
+            "nonce": nonce,
+            "code": code,
+            "storage_writes": dict(zip(writes[::2], writes[1::2])),
+            "storage_reads": reads,
+        }
+
+
+class CompactTransactionTrace(BaseModel):
+    """Individual transaction trace from the compact BAL tracer."""
+
+    result: List[CompactAccountRecord]
+    txHash: Hash
+
+
 # Type aliases for common RPC types
 BlockDebugTraceResult = List[TransactionTrace]
+CompactBlockTraceResult = List[CompactTransactionTrace]
@@ -0,0 +1,137 @@
+"""Tests for the append-only BlockAccessList archive."""
+
+import os
+
+import pytest
+
+from pokebal.bal.archive import INDEX_SUFFIX, Archive, ArchiveWriter, write_blocks
+from pokebal.bal.builder import from_execution_trace
+from pokebal.bal.types import BlockAccessList
+from pokebal.rpc.mocknode import SyntheticChain
+from pokebal.rpc.types import TransactionTrace
+
+from .constants import Addresses
+
+CHAIN = SyntheticChain(txs_per_block=6, account_pool=20)
+
+
+def block_access_list(number: int) -> BlockAccessList:
+    raw = CHAIN.handlers()["debug_traceBlockByNumber"]([hex(number)])
+    return from_execution_trace([TransactionTrace.model_validate(item) for item in raw])
+
+
+BLOCKS = {number: block_access_list(number) for number in range(100, 106)}
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / "blocks.archive")
+    write_blocks(path, BLOCKS.items())
+    return path
+
+
+class TestArchive:
+    """Test suite for writing and reading archives."""
+
+    def test_random_access(self, path):
+        """Test each block decodes to the list that was written."""
+        with Archive(path) as archive:
+            assert len(archive) == len(BLOCKS)
+            assert archive.block_numbers() == sorted(BLOCKS)
+            for number in (103, 100, 105):
+                assert archive.load_block(number) == BLOCKS[number]
+            assert 104 in archive and 99 not in archive
+            with pytest.raises(KeyError):
+                archive.load_block(99)
+
+    def test_ranges(self, path):
+        """Test iteration yields the blocks of a range in order."""
+        with Archive(path) as archive:
+            blocks = list(archive.iter_blocks(101, 104))
+            views = list(archive.iter_views(104))
+
+        assert blocks == [(number, BLOCKS[number]) for number in (101, 102, 103)]
+        assert [number for number, _ in views] == [104, 105]
+        assert views[0][1].materialize() == BLOCKS[104]
+
+    def test_lazy_view(self, path):
+        """Test a view looks accounts up without decoding the block."""
+        bal = BLOCKS[102]
+        account = bal.account_changes[2]
+
+        with Archive(path) as archive:
+            view = archive.view(102)
+            assert view.get(account.address).materialize() == account
+            assert view.get(Addresses.ALICE) is None
+
+    def test_append_and_replace(self, path):
+        """Test reopening appends, and a rewritten block replaces the old one."""
+        replacement = BlockAccessList()
+        replacement.add_balance_change(Addresses.ALICE, 0, 1)
+        with ArchiveWriter(path, level=0) as writer:
+            writer.write_block(50, BLOCKS[100])
+            writer.write_block(103, replacement)
+
+        with Archive(path) as archive:
+            assert archive.block_numbers() == [50] + sorted(BLOCKS)
+            assert archive.load_block(50) == BLOCKS[100]
+            assert archive.load_block(103) == replacement
+
+    def test_compression(self, tmp_path):
+        """Test compressed records are smaller than stored ones."""
+        sizes = {}
+        for level in (0, 6):
+            path = str(tmp_path / f"level{level}")
+            write_blocks(path, BLOCKS.items(), level=level)
+            sizes[level] = os.path.getsize(path)
+
+        assert sizes[6] < sizes[0]
+
+
+class TestRecovery:
+    """Test suite for archives whose index is missing or behind."""
+
+    def test_missing_index(self, path):
+        """Test records are found by scanning when there is no index."""
+        os.remove(path + INDEX_SUFFIX)
+
+        with Archive(path) as archive:
+            assert archive.block_numbers() == sorted(BLOCKS)
+            assert archive.load_block(105) == BLOCKS[105]
+
+    def test_unindexed_and_torn_records(self, path):
+        """Test records past the index are read and a torn one is dropped."""
+        with open(path + INDEX_SUFFIX, "rb") as file:
+            index = file.read()
+        write_blocks(path, [(200, BLOCKS[100])])
+        with open(path + INDEX_SUFFIX, "wb") as file:
+            file.write(index)
+        with open(path, "ab") as file:
+            file.write(b"\x01" * 30)
+
+        with Archive(path) as archive:
+            assert archive.block_numbers() == sorted(BLOCKS) + [200]
+            assert archive.load_block(200) == BLOCKS[100]
+
+        write_blocks(path, [(201, BLOCKS[101])])
+        with Archive(path) as archive:
+            assert archive.load_block(201) == BLOCKS[101]
+
+    def test_truncated_index(self, path):
+        """Test a truncated index is rejected rather than misread."""
+        with open(path + INDEX_SUFFIX, "rb") as file:
+            index = file.read()
+
+        for size in (2, len(index) - 16):
+            with open(path + INDEX_SUFFIX, "wb") as file:
+                file.write(index[:size])
+            with pytest.raises(ValueError, match="truncated"):
+                Archive(path)
+
+    def test_not_an_archive(self, tmp_path):
+        """Test other files are rejected."""
+        path = tmp_path / "other"
+        path.write_bytes(b"{}" * 10)
+
+        with pytest.raises(ValueError):
+            Archive(str(path))
@@ -0,0 +1,211 @@
+"""Tests for building a BlockAccessList from diff-mode execution traces."""
+
+from pokebal.bal.builder import (
+    from_compact_trace,
+    from_execution_trace,
+    from_merged_traces,
+)
+from pokebal.rpc.types import (
+    AccountState,
+    CompactTransactionTrace,
+    PrePostStates,
+    PrestateTransactionTrace,
+    TransactionTrace,
+)
+
+from .constants import Addresses, StorageSlots, StorageValues, CodeSamples
+
+TX_HASH = "0x" + "11" * 32
+
+
+def make_trace(pre: dict, post: dict) -> TransactionTrace:
+    """Build a TransactionTrace from pre/post account state dicts."""
+    return TransactionTrace(
+        result=PrePostStates(
+            pre={address: AccountState(**state) for address, state in pre.items()},
+            post={address: AccountState(**state) for address, state in post.items()},
+        ),
+        txHash=TX_HASH,
+    )
+
+
+class TestFromExecutionTrace:
+    """Test suite for from_execution_trace."""
+
+    def test_empty_trace(self):
+        """Test an empty block produces an empty BAL."""
+        assert from_execution_trace([]).account_changes == []
+
+    def test_balance_and_nonce_changes(self):
+        """Test post balance and nonce are recorded per transaction."""
+        trace = make_trace(
+            pre={Addresses.ALICE: {"balance": "0x64", "nonce": 1}},
+            post={Addresses.ALICE: {"balance": "0x32", "nonce": 2}},
+        )
+
+        bal = from_execution_trace([trace])
+
+        account = bal.account_changes[0]
+        assert account.address == Addresses.ALICE
+        assert account.balance_changes[0].tx_index == 0
+        assert account.balance_changes[0].post_balance == 0x32
+        assert account.nonce_changes[0].new_nonce == 2
+
+    def test_unchanged_fields_are_omitted_from_post(self):
+        """Test fields missing from a diff-mode post entry count as unchanged."""
+        trace = make_trace(
+            pre={
+                Addresses.ALICE: {
+                    "balance": "0x64",
+                    "nonce": 1,
+                    "storage": {StorageSlots.SLOT_1: StorageValues.VALUE_1},
+                }
+            },
+            post={
+                Addresses.ALICE: {"storage": {StorageSlots.SLOT_1: StorageValues.VALUE_2}}
+            },
+        )
+
+        bal = from_execution_trace([trace])
+
+        account = bal.account_changes[0]
+        assert account.balance_changes == []
+        assert account.nonce_changes == []
+        assert account.storage_changes[0].changes[0].new_value == StorageValues.VALUE_2
+
+    def test_cleared_slot_is_written_as_zero(self):
+        """Test a slot missing from post storage is recorded as a zero write."""
+        trace = make_trace(
+            pre={Addresses.BOB: {"storage": {StorageSlots.SLOT_1: StorageValues.VALUE_1}}},
+            post={Addresses.BOB: {"storage": {}}},
+        )
+
+        bal = from_execution_trace([trace])
+
+        change = bal.account_changes[0].storage_changes[0].changes[0]
+        assert change.new_value == StorageValues.ZERO_VALUE
+
+    def test_code_change_keeps_tx_index(self):
+        """Test code deployments are recorded with their transaction index."""
+        traces = [
+            make_trace(pre={}, post={}),
+            make_trace(
+                pre={Addresses.CAROL: {"balance": "0x0"}},
+                post={Addresses.CAROL: {"code": CodeSamples.SIMPLE_CODE, "nonce": 1}},
+            ),
+        ]
+
+        bal = from_execution_trace(traces)
+
+        account = bal.account_changes[0]
+        assert account.code_changes[0].tx_index == 1
+        assert account.code_changes[0].new_code == CodeSamples.SIMPLE_CODE
+        assert account.nonce_changes[0].new_nonce == 1
+
+
+class TestFromCompactTrace:
+    """Test suite for from_compact_trace."""
+
+    @staticmethod
+    def make_trace(records: list) -> CompactTransactionTrace:
+        return CompactTransactionTrace.model_validate(
+            {"txHash": TX_HASH, "result": records}
+        )
+
+    def test_changes_and_reads(self):
+        """Test post values and storage reads are recorded."""
+        trace = self.make_trace(
+            [
+                [
+                    Addresses.ALICE,
+                    "0x64",
+                    2,
+                    CodeSamples.SIMPLE_CODE,
+                    [StorageSlots.SLOT_1, StorageValues.VALUE_1],
+                    [StorageSlots.SLOT_2],
+                ]
+            ]
+        )
+
+        bal = from_compact_trace([trace])
+
+        account = bal.account_changes[0]
+        assert account.balance_changes[0].post_balance == 100
+        assert account.nonce_changes[0].new_nonce == 2
+        assert account.code_changes[0].new_code == CodeSamples.SIMPLE_CODE
+        assert account.storage_changes[0].slot == StorageSlots.SLOT_1
+        assert [read.slot for read in account.storage_reads] == [StorageSlots.SLOT_2]
+
+    def test_reads_of_written_slots_are_dropped(self):
+        """Test a slot read in one tx and written in another is only a write."""
+        traces = [
+            self.make_trace([[Addresses.BOB, None, None, None, [], [StorageSlots.SLOT_1]]]),
+            self.make_trace(
+                [
+                    [
+                        Addresses.BOB,
+                        None,
+                        None,
+                        None,
+                        [StorageSlots.SLOT_1, StorageValues.VALUE_2],
+                        [],
+                    ]
+                ]
+            ),
+        ]
+
+        bal = from_compact_trace(traces)
+
+        account = bal.account_changes[0]
+        assert account.storage_reads == []
+        assert account.storage_changes[0].changes[0].tx_index == 1
+
+
+class TestFromMergedTraces:
+    """Test suite for merging diff-mode and full prestate traces."""
+
+    @staticmethod
+    def make_prestate(accounts: dict) -> PrestateTransactionTrace:
+        return PrestateTransactionTrace.model_validate(
+            {"txHash": TX_HASH, "result": accounts}
+        )
+
+    def test_reads_are_accessed_minus_written(self):
+        """Test slots in the full prestate but not the diff become reads."""
+        diff = make_trace(
+            pre={Addresses.ALICE: {"storage": {StorageSlots.SLOT_1: StorageValues.VALUE_1}}},
+            post={Addresses.ALICE: {"storage": {StorageSlots.SLOT_1: StorageValues.VALUE_2}}},
+        )
+        full = self.make_prestate(
+            {
+                Addresses.ALICE: {
+                    "storage": {
+                        StorageSlots.SLOT_1: StorageValues.VALUE_1,
+                        StorageSlots.SLOT_2: StorageValues.VALUE_1,
+                    }
+                },
+                Addresses.BOB: {"storage": {StorageSlots.SLOT_3: StorageValues.ZERO_VALUE}},
+            }
+        )
+
+        bal = from_merged_traces([(diff, full)])
+
+        alice, bob = bal.account_changes
+        assert [read.slot for read in alice.storage_reads] == [StorageSlots.SLOT_2]
+        assert alice.storage_changes[0].slot == StorageSlots.SLOT_1
+        assert [read.slot for read in bob.storage_reads] == [StorageSlots.SLOT_3]
+
+    def test_slot_written_later_in_block_is_not_a_read(self):
+        """Test a read in tx 0 is dropped when tx 1 writes the slot."""
+        read_only = make_trace(pre={}, post={})
+        write = make_trace(
+            pre={Addresses.BOB: {"storage": {StorageSlots.SLOT_1: StorageValues.VALUE_1}}},
+            post={Addresses.BOB: {"storage": {StorageSlots.SLOT_1: StorageValues.VALUE_2}}},
+        )
+        accessed = self.make_prestate(
+            {Addresses.BOB: {"storage": {StorageSlots.SLOT_1: StorageValues.VALUE_1}}}
+        )
+
+        bal = from_merged_traces([(read_only, accessed), (write, accessed)])
+
+        assert bal.account_changes[0].storage_reads == []
@@ -0,0 +1,103 @@
+"""Tests for the columnar export of BAL changes."""
+
+import pytest
+
+from pokebal.bal.columns import NO_TX, ROW, ChangeKind, pack_rows, to_arrow, to_numpy
+from pokebal.bal.types import BlockAccessList
+
+from .constants import Addresses, StorageSlots, StorageValues
+from .test_ssz import mixed_access_list, synthetic_access_list
+
+
+def change_count(bal) -> int:
+    return sum(
+        sum(len(slot_changes.changes) for slot_changes in account.storage_changes)
+        + len(account.storage_reads)
+        + len(account.balance_changes)
+        + len(account.nonce_changes)
+        + len(account.code_changes)
+        for account in bal.account_changes
+    )
+
+
+class TestPackRows:
+    """Test suite for packing changes into fixed-width rows."""
+
+    def test_one_row_per_change(self):
+        """Test every change of every block becomes one row."""
+        blocks = [(7, mixed_access_list()), (8, synthetic_access_list())]
+
+        data = pack_rows(blocks)
+
+        assert len(data) == ROW.size * sum(change_count(bal) for _, bal in blocks)
+        numbers = [row[0] for row in ROW.iter_unpack(data)]
+        assert numbers == sorted(numbers) and set(numbers) == {7, 8}
+
+    def test_row_layout(self):
+        """Test the fields of each kind of row."""
+        rows = list(ROW.iter_unpack(pack_rows([(7, mixed_access_list())])))
+        alice = bytes.fromhex(Addresses.ALICE[2:])
+        slot = bytes.fromhex(StorageSlots.SLOT_1[2:])
+
+        assert rows[0] == (
+            7,
+            alice,
+            slot,
+            0,
+            ChangeKind.STORAGE_WRITE,
+            bytes.fromhex(StorageValues.VALUE_1[2:]),
+        )
+        read = rows[2]
+        assert read[2] == bytes.fromhex(StorageSlots.SLOT_2[2:])
+        assert (read[3], read[4], read[5]) == (NO_TX, ChangeKind.STORAGE_READ, bytes(32))
+        balance = rows[4]
+        assert balance[4] == ChangeKind.BALANCE
+        assert balance[5] == (2**128 - 1).to_bytes(32, "big")
+        kinds = [row[4] for row in rows]
+        assert kinds.count(ChangeKind.NONCE) == 1
+        assert kinds.count(ChangeKind.CODE) == 2
+
+
+class TestNumpy:
+    """Test suite for the NumPy and Arrow exports."""
+
+    def test_structured_array(self):
+        """Test columns support vectorized aggregation."""
+        numpy = pytest.importorskip("numpy")
+        bal = synthetic_access_list()
+
+        rows = to_numpy([(1, bal), (2, bal)])
+
+        assert len(rows) == 2 * change_count(bal)
+        writes = rows[rows["kind"] == ChangeKind.STORAGE_WRITE]
+        slots, counts = numpy.unique(writes["slot"], return_counts=True)
+        assert counts.sum() == len(writes) and len(slots) > 0
+        assert set(numpy.unique(rows["block_number"])) == {1, 2}
+
+    def test_trailing_zero_bytes_survive(self):
+        """Test byte columns keep trailing zero bytes when elements are read."""
+        pytest.importorskip("numpy")
+        pyarrow = pytest.importorskip("pyarrow")
+        address = "0x" + "11" * 19 + "00"
+        bal = BlockAccessList()
+        bal.add_balance_change(address, 1, 256)
+
+        rows = to_numpy([(1, bal)])
+        table = to_arrow([(1, bal)])
+
+        assert bytes(rows["address"][0]) == bytes.fromhex(address[2:])
+        assert int.from_bytes(rows["value"][0], "big") == 256
+        assert table.column("address").to_pylist() == [bytes.fromhex(address[2:])]
+        assert int.from_bytes(table.column("value").to_pylist()[0], "big") == 256
+        assert table.schema.field("value").type == pyarrow.binary(32)
+
+    def test_arrow_table(self):
+        """Test the Arrow table has one fixed-size column per field."""
+        pytest.importorskip("numpy")
+        pyarrow = pytest.importorskip("pyarrow")
+
+        table = to_arrow([(1, mixed_access_list())])
+
+        assert table.num_rows == change_count(mixed_access_list())
+        assert table.schema.field("address").type == pyarrow.binary(20)
+        assert table.column("kind").to_pylist()[0] == ChangeKind.STORAGE_WRITE
@@ -0,0 +1,37 @@
+"""Tests for fast model creation."""
+
+import gc
+
+from pokebal.bal.construct import STORAGE_CHANGE_FIELDS, construct, gc_paused
+from pokebal.bal.types import StorageChange
+
+from .constants import StorageValues
+
+
+class TestConstruct:
+    """Test suite for construct and gc_paused."""
+
+    def test_matches_validated_model(self):
+        """Test a constructed model equals the validated one and can be updated."""
+        values = {"tx_index": 3, "new_value": StorageValues.VALUE_1}
+
+        change = construct(StorageChange, dict(values), STORAGE_CHANGE_FIELDS)
+
+        assert change == StorageChange.model_validate(values)
+        change.tx_index += 1
+        assert change.tx_index == 4
+        assert change.model_fields_set == {"tx_index", "new_value"}
+
+    def test_gc_paused_restores_state(self):
+        """Test the collector is re-enabled only if it was enabled before."""
+        with gc_paused():
+            assert not gc.isenabled()
+        assert gc.isenabled()
+
+        gc.disable()
+        try:
+            with gc_paused():
+                pass
+            assert not gc.isenabled()
+        finally:
+            gc.enable()
@@ -0,0 +1,160 @@
+"""Tests for the cross-block dictionary codec."""
+
+import time
+
+import pytest
+
+from pokebal.bal.dictcodec import Dictionary, _write_tx_indices, _write_varint, decode, encode
+from pokebal.bal.builder import from_execution_trace
+from pokebal.bal.ssz import encode as ssz_encode
+from pokebal.bal.sszview import decode as ssz_decode
+from pokebal.bal.types import MAX_TXS, BalanceChange, BlockAccessList
+from pokebal.rpc.mocknode import SyntheticChain
+from pokebal.rpc.types import TransactionTrace
+
+from .constants import Addresses, StorageSlots, StorageValues
+from .test_archive import BLOCKS
+from .test_ssz import mixed_access_list, synthetic_access_list
+
+
+@pytest.fixture(scope="module")
+def dictionary():
+    return Dictionary.train(BLOCKS.values())
+
+
+def bounded_access_list() -> BlockAccessList:
+    """``mixed_access_list`` with its last tx_index lowered to MAX_TXS."""
+    bal = mixed_access_list()
+    bal.account_changes[2].code_changes[-1].tx_index = MAX_TXS
+    return bal
+
+
+class TestDictionary:
+    """Test suite for training and storing dictionaries."""
+
+    def test_train_orders_by_frequency(self):
+        """Test entries seen in more blocks come first, and rare ones are left out."""
+        common = BlockAccessList()
+        common.add_storage_read(Addresses.ALICE, StorageSlots.SLOT_1)
+        rare = BlockAccessList()
+        rare.add_storage_read(Addresses.BOB, StorageSlots.SLOT_2)
+        rare.add_storage_read(Addresses.ALICE, StorageSlots.SLOT_1)
+
+        dictionary = Dictionary.train([common, common, rare])
+
+        assert dictionary.addresses == [bytes.fromhex(Addresses.ALICE[2:])]
+        assert dictionary.slots == [bytes.fromhex(StorageSlots.SLOT_1[2:])]
+
+    def test_bytes_round_trip(self, dictionary):
+        """Test a stored dictionary keeps its entries and id."""
+        restored = Dictionary.from_bytes(dictionary.to_bytes())
+
+        assert restored.addresses == dictionary.addresses
+        assert restored.slots == dictionary.slots
+        assert restored.id == dictionary.id
+        assert Dictionary().id != dictionary.id
+
+
+class TestCodec:
+    """Test suite for encoding blocks against a dictionary."""
+
+    @pytest.mark.parametrize(
+        "bal", [BlockAccessList(), bounded_access_list(), synthetic_access_list()]
+    )
+    def test_round_trip(self, bal, dictionary):
+        """Test decoding gives back the list, with and without a dictionary."""
+        assert decode(encode(bal, dictionary), dictionary) == bal
+        assert decode(encode(bal, Dictionary()), Dictionary()) == bal
+
+    def test_smaller_than_ssz(self, dictionary):
+        """Test blocks the dictionary was trained on shrink well below SSZ."""
+        for bal in BLOCKS.values():
+            assert len(encode(bal, dictionary)) < len(ssz_encode(bal)) * 3 // 4
+
+    def test_unsorted_and_sparse_indices(self, dictionary):
+        """Test tx_index lists in any order, with large gaps."""
+        bal = BlockAccessList()
+        for tx_index in (5, 2, MAX_TXS, 0):
+            bal.add_storage_write(
+                Addresses.ALICE, StorageSlots.SLOT_1, tx_index, StorageValues.VALUE_1
+            )
+        bal.add_nonce_change(Addresses.ALICE, 3, 2**64 - 1)
+
+        assert decode(encode(bal, dictionary), dictionary) == bal
+
+    def test_other_dictionary(self, dictionary):
+        """Test a block cannot be decoded against another dictionary."""
+        data = encode(bounded_access_list(), dictionary)
+
+        with pytest.raises(ValueError, match="dictionary"):
+            decode(data, Dictionary())
+
+    def test_truncated(self, dictionary):
+        """Test truncated data is rejected."""
+        data = encode(bounded_access_list(), dictionary)
+
+        for end in (5, len(data) // 2, len(data) - 1):
+            with pytest.raises(ValueError):
+                decode(data[:end], dictionary)
+        with pytest.raises(ValueError):
+            decode(data + b"\x00", dictionary)
+
+    @pytest.mark.parametrize(
+        "tx_index, balance, nonce",
+        [(-4, 1, 1), (MAX_TXS + 1, 1, 1), (1, 2**128, 1), (1, 1, 2**64)],
+    )
+    def test_out_of_range_values(self, tx_index, balance, nonce):
+        """Test crafted tx indices, balances and nonces are rejected."""
+        dictionary = Dictionary()
+        data = bytearray(encode(BlockAccessList(), dictionary)[:-1])
+        data += bytes([1, 0]) + bytes.fromhex(Addresses.ALICE[2:]) + bytes([0, 0])
+        for value in (balance, nonce):
+            _write_tx_indices(data, [BalanceChange.model_construct(tx_index=tx_index)])
+            _write_varint(data, value)
+        data += bytes([0])
+
+        with pytest.raises(ValueError, match="range|bits"):
+            decode(bytes(data), dictionary)
+
+    @pytest.mark.parametrize(
+        "limit, value", [("MAX_ACCOUNTS", 3), ("MAX_SLOTS", 0), ("MAX_CODE_SIZE", 10)]
+    )
+    def test_list_and_code_limits(self, monkeypatch, limit, value):
+        """Test counts and code lengths over the MAX_* limits are rejected."""
+        data = encode(bounded_access_list(), Dictionary())
+        monkeypatch.setattr(f"pokebal.bal.dictcodec.{limit}", value)
+
+        with pytest.raises(ValueError, match="more than"):
+            decode(data, Dictionary())
+
+    def test_faster_than_uncompressed_ssz(self, tmp_path):
+        """Test loading blocks beats reading and decoding them as uncompressed SSZ."""
+        handler = SyntheticChain(txs_per_block=100).handlers()["debug_traceBlockByNumber"]
+        bals = [
+            from_execution_trace([TransactionTrace.model_validate(i) for i in handler([hex(n)])])
+            for n in range(1, 9)
+        ]
+        dictionary = Dictionary.train(bals[:4])
+        encoded = [encode(bal, dictionary) for bal in bals[4:]]
+        uncompressed_ssz = [ssz_encode(bal) for bal in bals[4:]]
+        (tmp_path / "blocks.pbd").write_bytes(b"".join(encoded))
+        (tmp_path / "blocks.ssz").write_bytes(b"".join(uncompressed_ssz))
+        sizes = [len(data) for data in encoded]
+        ssz_sizes = [len(data) for data in uncompressed_ssz]
+
+        def load(name, sizes, decode_block):
+            started = time.perf_counter()
+            data = (tmp_path / name).read_bytes()
+            position = 0
+            for size in sizes:
+                decode_block(data[position : position + size])
+                position += size
+            return time.perf_counter() - started
+
+        compressed = min(
+            load("blocks.pbd", sizes, lambda data: decode(data, dictionary)) for _ in range(3)
+        )
+        uncompressed = min(load("blocks.ssz", ssz_sizes, ssz_decode) for _ in range(3))
+
+        assert sum(sizes) < sum(ssz_sizes)
+        assert compressed < uncompressed
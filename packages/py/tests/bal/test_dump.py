@@ -0,0 +1,122 @@
+"""Tests for parallel ingestion of JSONL trace dumps."""
+
+import json
+
+import pytest
+
+from pokebal.bal.builder import from_execution_trace
+from pokebal.bal.dump import _build_range, iter_dump_access_lists, iter_trace_dump, split_lines
+from pokebal.bal.types import BlockAccessList
+from pokebal.rpc.mocknode import SyntheticChain
+from pokebal.rpc.types import TransactionTrace
+
+CHAIN = SyntheticChain(txs_per_block=4)
+
+
+def block_traces(number: int) -> list:
+    return CHAIN.handlers()["debug_traceBlockByNumber"]([hex(number)])
+
+
+def write_tx_lines(path, blocks) -> None:
+    """Write one transaction trace per line."""
+    with open(path, "w") as file:
+        for number in blocks:
+            for trace in block_traces(number):
+                file.write(json.dumps({"blockNumber": hex(number), **trace}) + "\n")
+
+
+class TestSplitLines:
+    """Test suite for cutting files at line boundaries."""
+
+    def test_ranges_cover_file_at_newlines(self, tmp_path):
+        """Test ranges are contiguous and end after a newline."""
+        path = tmp_path / "dump.jsonl"
+        write_tx_lines(path, range(1, 4))
+        raw = path.read_bytes()
+
+        ranges = split_lines(str(path), chunk_size=500)
+
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(raw)
+        assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+        assert all(raw[end - 1 : end] == b"\n" for _, end in ranges)
+
+    def test_empty_file(self, tmp_path):
+        """Test an empty file has no ranges."""
+        path = tmp_path / "empty.jsonl"
+        path.write_bytes(b"")
+        assert split_lines(str(path)) == []
+        assert list(iter_trace_dump(str(path))) == []
+
+
+class TestIterTraceDump:
+    """Test suite for reading dumps into blocks."""
+
+    @pytest.mark.parametrize("workers", [1, 3])
+    def test_transaction_lines_grouped_by_block(self, tmp_path, workers):
+        """Test per-transaction lines are regrouped across range boundaries."""
+        path = tmp_path / "dump.jsonl"
+        write_tx_lines(path, range(1, 6))
+
+        blocks = list(iter_trace_dump(str(path), workers=workers, chunk_size=700))
+
+        assert [number for number, _ in blocks] == [1, 2, 3, 4, 5]
+        for number, traces in blocks:
+            expected = [TransactionTrace.model_validate(item) for item in block_traces(number)]
+            assert traces == expected
+
+    def test_block_lines(self, tmp_path):
+        """Test wrapped and bare block lines."""
+        path = tmp_path / "dump.jsonl"
+        path.write_text(
+            json.dumps({"blockNumber": 7, "result": block_traces(7)})
+            + "\n\n"
+            + json.dumps(block_traces(8))
+            + "\n"
+        )
+
+        blocks = list(iter_trace_dump(str(path), workers=1))
+
+        assert [(number, len(traces)) for number, traces in blocks] == [(7, 4), (None, 4)]
+
+    def test_invalid_line(self, tmp_path):
+        """Test a malformed line raises ValueError."""
+        path = tmp_path / "dump.jsonl"
+        path.write_text('{"blockNumber": 1, "txHash": "0x01"}\n')
+
+        with pytest.raises(ValueError):
+            list(iter_trace_dump(str(path), workers=1))
+
+
+class TestIterDumpAccessLists:
+    """Test suite for building BALs from dumps."""
+
+    @pytest.mark.parametrize("workers, chunk_size", [(2, 1_000), (1, 700), (3, 700)])
+    def test_matches_rpc_build(self, tmp_path, workers, chunk_size):
+        """Test BALs equal those built from the same traces fetched over RPC."""
+        path = tmp_path / "dump.jsonl"
+        write_tx_lines(path, range(1, 4))
+
+        results = list(
+            iter_dump_access_lists(str(path), workers=workers, chunk_size=chunk_size)
+        )
+
+        for number, bal in results:
+            traces = [TransactionTrace.model_validate(item) for item in block_traces(number)]
+            assert bal == from_execution_trace(traces)
+        assert len(results) == 3
+
+    def test_blocks_are_built_per_range(self, tmp_path):
+        """Test a range yields the BAL of each block part it holds, not traces."""
+        path = tmp_path / "dump.jsonl"
+        write_tx_lines(path, range(1, 4))
+        ranges = split_lines(str(path), chunk_size=700)
+
+        parts = [
+            part
+            for start, end in ranges
+            for part in _build_range(str(path), start, end, from_execution_trace)
+        ]
+
+        assert len(parts) > 3
+        assert all(isinstance(bal, BlockAccessList) for _, _, bal in parts)
+        assert sum(tx_count for number, tx_count, _ in parts if number == 2) == 4
@@ -0,0 +1,164 @@
+"""Tests for streaming JSON serialization and decoding of BlockAccessList."""
+
+import io
+import json
+
+import pytest
+
+from pokebal.bal.jsonstream import _BATCH, iter_account_changes, iter_json, write_json
+from pokebal.bal.types import AccountChanges, BlockAccessList
+
+from .constants import Addresses, CodeSamples, StorageSlots, StorageValues
+from .test_ssz import mixed_access_list, synthetic_access_list
+
+
+class TestIterJson:
+    """Test suite for the streaming JSON writer."""
+
+    @pytest.mark.parametrize(
+        "bal", [BlockAccessList(), mixed_access_list(), synthetic_access_list()]
+    )
+    def test_matches_model_dump_json(self, bal):
+        """Test the chunks join to pydantic's output, byte for byte."""
+        assert b"".join(iter_json(bal)) == bal.model_dump_json().encode()
+
+    @pytest.mark.parametrize("chunk_size", [1, 100, 4096])
+    def test_chunk_sizes(self, chunk_size):
+        """Test chunks stay within one batch of entries of the requested size."""
+        bal = synthetic_access_list()
+        bal.add_code_change(Addresses.ALICE, 0, CodeSamples.COMPLEX_CODE)
+
+        chunks = list(iter_json(bal, chunk_size))
+
+        assert b"".join(chunks) == bal.model_dump_json().encode()
+        assert len(chunks) > 1
+        longest_entry = max(100, len(CodeSamples.COMPLEX_CODE) + 50)
+        assert max(len(chunk) for chunk in chunks) <= chunk_size + _BATCH * longest_entry
+
+    def test_write_json(self):
+        """Test writing to a binary file."""
+        bal = mixed_access_list()
+        out = io.BytesIO()
+
+        size = write_json(bal, out, chunk_size=64)
+
+        assert out.getvalue() == bal.model_dump_json().encode()
+        assert size == len(out.getvalue())
+
+
+class TestIterAccountChanges:
+    """Test suite for the streaming JSON decoder."""
+
+    @pytest.mark.parametrize("validate", [True, False])
+    @pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+    def test_round_trip(self, validate, chunk_size):
+        """Test decoding iter_json output read in chunks of any size."""
+        bal = mixed_access_list()
+
+        accounts = list(iter_account_changes(iter_json(bal, chunk_size), validate=validate))
+
+        assert BlockAccessList(account_changes=accounts) == bal
+
+    def test_reads_file(self):
+        """Test decoding a binary file, with whitespace between tokens."""
+        bal = synthetic_access_list()
+        document = json.dumps(bal.model_dump(), indent=2).encode()
+
+        accounts = list(iter_account_changes(io.BytesIO(document), chunk_size=5))
+
+        assert accounts == bal.account_changes
+
+    def test_yields_before_end_of_input(self):
+        """Test an account is yielded as soon as its JSON is complete."""
+        bal = mixed_access_list()
+        chunks = iter(iter_json(bal, chunk_size=1))
+
+        first = next(iter_account_changes(chunks))
+
+        assert first == bal.account_changes[0]
+        assert next(chunks, None) is not None
+
+    def test_bare_storage_reads(self):
+        """Test storage reads given as slot strings."""
+        account = {"address": Addresses.ALICE, "storage_reads": [StorageSlots.SLOT_1]}
+        document = {"account_changes": [account]}
+
+        (account,) = iter_account_changes([json.dumps(document).encode()])
+
+        assert account.storage_reads[0].slot == StorageSlots.SLOT_1
+
+    def test_web_schema_layout(self):
+        """Test slot accesses of the web schema become storage changes."""
+        document = {
+            "account_accesses": [
+                {
+                    "address": Addresses.ALICE,
+                    "accesses": [
+                        {
+                            "slot": StorageSlots.SLOT_1,
+                            "accesses": [{"tx_index": 2, "value_after": StorageValues.VALUE_1}],
+                        }
+                    ],
+                }
+            ],
+            "balance_diffs": [],
+            "code_diffs": [],
+            "nonce_diffs": [{"address": Addresses.BOB, "nonce": 1}],
+        }
+
+        accounts = list(iter_account_changes([json.dumps(document).encode()]))
+
+        assert len(accounts) == 1
+        change = accounts[0].storage_changes[0]
+        assert accounts[0].address == Addresses.ALICE
+        assert change.slot == StorageSlots.SLOT_1
+        assert (change.changes[0].tx_index, change.changes[0].new_value) == (
+            2,
+            StorageValues.VALUE_1,
+        )
+
+    def test_web_schema_slot_without_accesses(self):
+        """Test a slot access without accesses becomes a storage read."""
+        access = {
+            "address": Addresses.ALICE,
+            "accesses": [{"slot": StorageSlots.SLOT_2, "accesses": []}],
+        }
+        document = json.dumps({"account_accesses": [access]}).encode()
+
+        for validate in (True, False):
+            (account,) = iter_account_changes([document], validate=validate)
+            assert account.storage_changes == []
+            assert [read.slot for read in account.storage_reads] == [StorageSlots.SLOT_2]
+
+    @pytest.mark.parametrize("validate", [True, False])
+    @pytest.mark.parametrize(
+        "access",
+        [
+            {"address": Addresses.ALICE},
+            {"address": Addresses.ALICE, "accesses": [{"slot": StorageSlots.SLOT_1}]},
+            {"address": Addresses.ALICE, "accesses": [{"accesses": [{"tx_index": 1}]}]},
+        ],
+    )
+    def test_malformed_web_schema_account(self, access, validate):
+        """Test malformed account accesses raise ValueError on both paths."""
+        document = json.dumps({"account_accesses": [access]}).encode()
+
+        with pytest.raises(ValueError, match="Malformed account"):
+            list(iter_account_changes([document], validate=validate))
+
+    def test_validation_error(self):
+        """Test an invalid account fails only when validating."""
+        document = json.dumps({"account_changes": [{"address": "0x1234"}]}).encode()
+
+        with pytest.raises(ValueError):
+            list(iter_account_changes([document]))
+        (account,) = iter_account_changes([document], validate=False)
+        assert isinstance(account, AccountChanges)
+
+    @pytest.mark.parametrize(
+        "document", [b"", b"[]", b'{"account_changes": [{}', b'{"account_changes": [1]}']
+    )
+    def test_malformed(self, document):
+        """Test malformed documents raise ValueError."""
+        with pytest.raises(ValueError):
+            list(iter_account_changes([document], validate=False))
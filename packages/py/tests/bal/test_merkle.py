@@ -0,0 +1,121 @@
+"""Tests for hash_tree_root with cached subtree roots."""
+
+import pytest
+import ssz
+
+from pokebal.bal import merkle
+from pokebal.bal.builder import BlockAccessListBuilder
+from pokebal.bal.merkle import ChunkTree, hash_tree_root, merkleize
+from pokebal.bal.ssz import BlockAccessListSedes, to_ssz_value
+from pokebal.bal.types import AccountChanges, BlockAccessList
+
+from .constants import Addresses, StorageSlots, StorageValues
+from .test_ssz import mixed_access_list, synthetic_access_list
+
+
+def reference_root(bal: BlockAccessList) -> bytes:
+    return ssz.get_hash_tree_root(to_ssz_value(bal), BlockAccessListSedes)
+
+
+def chunks(count: int) -> list:
+    return [bytes([i % 256]) * 32 for i in range(count)]
+
+
+class TestChunkTree:
+    """Test suite for incremental Merkle trees."""
+
+    @pytest.mark.parametrize("count", [0, 1, 2, 3, 5, 8, 13])
+    def test_appends_and_updates(self, count):
+        """Test a tree built one chunk at a time matches one built at once."""
+        tree = ChunkTree(16)
+        for position, chunk in enumerate(chunks(count)):
+            tree[position] = chunk
+        assert tree.root() == merkleize(chunks(count), 16)
+
+        if count:
+            tree[count // 2] = b"\xff" * 32
+            expected = chunks(count)
+            expected[count // 2] = b"\xff" * 32
+            assert tree.root() == merkleize(expected, 16)
+
+    def test_branch(self):
+        """Test a chunk's branch hashes up to the root."""
+        tree = ChunkTree(1024, chunks(5))
+        for position in range(6):
+            node = tree.layers[0][position] if position < 5 else b"\x00" * 32
+            for level, sibling in enumerate(tree.branch(position)):
+                bit = (position >> level) & 1
+                node = merkle.hash_pair(sibling, node) if bit else merkle.hash_pair(node, sibling)
+            assert node == tree.root()
+
+
+class TestHashTreeRoot:
+    """Test suite for BlockAccessList roots."""
+
+    @pytest.mark.parametrize(
+        "bal", [BlockAccessList(), mixed_access_list(), synthetic_access_list()]
+    )
+    def test_matches_generic_ssz(self, bal):
+        """Test the root equals the generic ssz package's."""
+        assert hash_tree_root(bal) == reference_root(bal)
+
+    def test_updates_through_add_methods(self, monkeypatch):
+        """Test later changes re-hash only their path."""
+        bal = synthetic_access_list()
+        hash_tree_root(bal)
+        hashes = []
+        original = merkle.hash_pair
+        monkeypatch.setattr(
+            merkle, "hash_pair", lambda left, right: hashes.append(1) or original(left, right)
+        )
+
+        address = bal.account_changes[3].address
+        bal.add_storage_write(address, StorageSlots.SLOT_1, 50, StorageValues.VALUE_1)
+        bal.add_balance_change(address, 50, 12345)
+        bal.add_storage_read(Addresses.ALICE, StorageSlots.SLOT_2)
+        root = hash_tree_root(bal)
+
+        monkeypatch.undo()
+        assert root == reference_root(bal)
+        assert len(hashes) < 200
+
+    def test_direct_edits(self):
+        """Test edits to account_changes are detected, others need mark_changed."""
+        bal = mixed_access_list()
+        hash_tree_root(bal)
+
+        bal.account_changes.append(AccountChanges(address="0x" + "ab" * 20))
+        assert hash_tree_root(bal) == reference_root(bal)
+
+        bal.account_changes = bal.account_changes[1:]
+        assert hash_tree_root(bal) == reference_root(bal)
+
+        bal.account_changes[0].balance_changes[0].post_balance = 1
+        bal.mark_changed(bal.account_changes[0].address)
+        assert hash_tree_root(bal) == reference_root(bal)
+
+    def test_roots_do_not_affect_equality(self):
+        """Test a hashed list still equals an unhashed copy."""
+        bal = mixed_access_list()
+        hash_tree_root(bal)
+        assert bal == mixed_access_list()
+
+
+class TestStreamingRoot:
+    """Test suite for roots of a list being built."""
+
+    def test_root_after_every_transaction(self):
+        """Test per-transaction roots track the list, including pruned reads."""
+        builder = BlockAccessListBuilder()
+        for tx_index in range(3):
+            builder.bal.add_storage_read(Addresses.BOB, StorageSlots.SLOT_1)
+            builder.bal.add_balance_change(Addresses.ALICE, tx_index, 100 + tx_index)
+            assert builder.hash_tree_root() == reference_root(builder.bal)
+
+        builder.bal.add_storage_write(
+            Addresses.BOB, StorageSlots.SLOT_1, 3, StorageValues.VALUE_2
+        )
+        builder.prune_written_reads()
+
+        assert builder.build().account_changes[1].storage_reads == []
+        assert builder.hash_tree_root() == reference_root(builder.build())
@@ -0,0 +1,98 @@
+"""Tests for the prefetching block pipeline."""
+
+import threading
+import time
+
+import pytest
+
+from pokebal.bal.pipeline import BlockPipeline
+from pokebal.bal.types import BlockAccessList
+
+
+class TestBlockPipeline:
+    """Test suite for BlockPipeline."""
+
+    def test_results_are_in_block_order(self):
+        """Test blocks are yielded in input order regardless of fetch timing."""
+
+        def fetch(block_number):
+            # Later blocks finish first
+            time.sleep(0.01 * (5 - block_number % 5))
+            return [block_number]
+
+        pipeline = BlockPipeline(
+            fetch, build=lambda trace: trace[0], read_ahead=5
+        )
+
+        assert [result for _, result in pipeline.run(range(10))] == list(range(10))
+
+    def test_default_build_stage(self):
+        """Test the default build stage is from_execution_trace."""
+        pipeline = BlockPipeline(lambda block_number: [])
+
+        results = list(pipeline.run([1, 2]))
+
+        assert [block for block, _ in results] == [1, 2]
+        assert all(isinstance(bal, BlockAccessList) for _, bal in results)
+
+    def test_read_ahead_bounds_in_flight_fetches(self):
+        """Test no more than read_ahead blocks are fetched but unbuilt."""
+        lock = threading.Lock()
+        fetched = []
+        built = []
+        max_outstanding = 0
+
+        def fetch(block_number):
+            nonlocal max_outstanding
+            with lock:
+                fetched.append(block_number)
+                max_outstanding = max(max_outstanding, len(fetched) - len(built))
+            return block_number
+
+        def build(trace):
+            time.sleep(0.005)
+            built.append(trace)
+            return trace
+
+        list(BlockPipeline(fetch, build=build, read_ahead=3).run(range(20)))
+
+        # One block may sit in the build stage on top of the read-ahead queue
+        assert max_outstanding <= 4
+
+    def test_fetch_overlaps_build(self):
+        """Test fetch latency is hidden behind build time."""
+
+        def fetch(block_number):
+            time.sleep(0.02)
+            return block_number
+
+        def build(trace):
+            time.sleep(0.02)
+            return trace
+
+        pipeline = BlockPipeline(fetch, build=build, read_ahead=2)
+        list(pipeline.run(range(10)))
+
+        # Strictly sequential would take 10 * 40ms
+        assert pipeline.stats.wall_seconds < 0.35
+        assert pipeline.stats.fetch.items == 10
+        assert pipeline.stats.build.items == 10
+        assert pipeline.stats.build_utilization > 0.5
+
+    def test_fetch_error_propagates(self):
+        """Test a failed fetch is raised to the consumer."""
+
+        def fetch(block_number):
+            if block_number == 2:
+                raise ConnectionError("node went away")
+            return block_number
+
+        pipeline = BlockPipeline(fetch, build=lambda trace: trace)
+
+        with pytest.raises(ConnectionError):
+            list(pipeline.run(range(5)))
+
+    def test_invalid_read_ahead(self):
+        """Test read_ahead must be positive."""
+        with pytest.raises(ValueError):
+            BlockPipeline(lambda block_number: [], read_ahead=0)
@@ -0,0 +1,150 @@
+"""Tests for Merkle inclusion proofs of BlockAccessList entries."""
+
+import pytest
+
+from pokebal.bal.merkle import hash_tree_root
+from pokebal.bal.proofs import MultiProof, helper_indices, prove, verify
+from pokebal.bal.types import BalanceChange, StorageChange
+
+from .constants import Addresses, StorageSlots, StorageValues
+from .test_ssz import mixed_access_list, synthetic_access_list
+
+
+def storage_entries(bal):
+    return [
+        (account.address, slot_changes.slot, change)
+        for account in bal.account_changes
+        for slot_changes in account.storage_changes
+        for change in slot_changes.changes
+    ]
+
+
+def balance_entries(bal):
+    return [
+        (account.address, change)
+        for account in bal.account_changes
+        for change in account.balance_changes
+    ]
+
+
+class TestProve:
+    """Test suite for inclusion proofs."""
+
+    def test_every_entry(self):
+        """Test each storage and balance change proves on its own."""
+        bal = synthetic_access_list()
+        root = hash_tree_root(bal)
+
+        for address, slot, change in storage_entries(bal):
+            proof = prove(bal, storage=[(address, slot, change.tx_index)])
+            assert verify(root, proof, storage=[(address, slot, change)])
+        for address, change in balance_entries(bal):
+            proof = prove(bal, balances=[(address, change.tx_index)])
+            assert verify(root, proof, balances=[(address, change)])
+
+    def test_multiproof_shares_nodes(self):
+        """Test one proof of many entries is smaller than separate proofs."""
+        bal = synthetic_access_list()
+        root = hash_tree_root(bal)
+        storage = storage_entries(bal)
+        balances = balance_entries(bal)
+
+        proof = prove(
+            bal,
+            storage=[(address, slot, change.tx_index) for address, slot, change in storage],
+            balances=[(address, change.tx_index) for address, change in balances],
+        )
+
+        assert verify(root, proof, storage=storage, balances=balances)
+        separate = sum(
+            len(prove(bal, storage=[(address, slot, change.tx_index)]).helpers)
+            for address, slot, change in storage
+        )
+        assert len(proof.helpers) < separate / 2
+
+    def test_survives_serialization(self):
+        """Test a proof verifies after a JSON round trip."""
+        bal = mixed_access_list()
+        proof = prove(bal, storage=[(Addresses.ALICE, StorageSlots.SLOT_1, 2)])
+
+        restored = MultiProof.model_validate_json(proof.model_dump_json())
+
+        change = StorageChange(tx_index=2, new_value=StorageValues.VALUE_2)
+        assert verify(
+            hash_tree_root(bal), restored, storage=[(Addresses.ALICE, StorageSlots.SLOT_1, change)]
+        )
+
+    def test_after_changes(self):
+        """Test proofs follow entries added after the first root."""
+        bal = mixed_access_list()
+        hash_tree_root(bal)
+        bal.add_balance_change(Addresses.CAROL, 7, 77)
+
+        proof = prove(bal, balances=[(Addresses.CAROL, 7)])
+
+        change = BalanceChange(tx_index=7, post_balance=77)
+        assert verify(hash_tree_root(bal), proof, balances=[(Addresses.CAROL, change)])
+
+    @pytest.mark.parametrize(
+        "storage, balances",
+        [
+            ([(Addresses.CAROL, StorageSlots.SLOT_1, 0)], []),
+            ([(Addresses.ALICE, StorageSlots.SLOT_2, 0)], []),
+            ([(Addresses.ALICE, StorageSlots.SLOT_1, 1)], []),
+            ([], [(Addresses.BOB, 2)]),
+        ],
+    )
+    def test_missing_entries(self, storage, balances):
+        """Test entries that are not in the list cannot be proven."""
+        with pytest.raises(KeyError):
+            prove(mixed_access_list(), storage=storage, balances=balances)
+
+
+class TestVerify:
+    """Test suite for proof verification."""
+
+    @pytest.fixture
+    def proven(self):
+        bal = mixed_access_list()
+        proof = prove(
+            bal,
+            storage=[(Addresses.ALICE, StorageSlots.SLOT_1, 2)],
+            balances=[(Addresses.BOB, 3)],
+        )
+        change = StorageChange(tx_index=2, new_value=StorageValues.VALUE_2)
+        storage = [(Addresses.ALICE, StorageSlots.SLOT_1, change)]
+        balances = [(Addresses.BOB, BalanceChange(tx_index=3, post_balance=2**128 - 1))]
+        return hash_tree_root(bal), proof, storage, balances
+
+    def test_valid(self, proven):
+        """Test the proven entries verify."""
+        root, proof, storage, balances = proven
+        assert verify(root, proof, storage=storage, balances=balances)
+
+    def test_wrong_value(self, proven):
+        """Test another value of a proven entry fails."""
+        root, proof, storage, balances = proven
+        change = StorageChange(tx_index=2, new_value=StorageValues.VALUE_1)
+        wrong = [(Addresses.ALICE, StorageSlots.SLOT_1, change)]
+        assert not verify(root, proof, storage=wrong, balances=balances)
+
+    def test_wrong_account(self, proven):
+        """Test a proven entry cannot be claimed for another account."""
+        root, proof, storage, balances = proven
+        moved = [(Addresses.CAROL, balances[0][1])]
+        assert not verify(root, proof, storage=storage, balances=moved)
+
+    def test_tampered_helper(self, proven):
+        """Test a modified or missing helper node fails."""
+        root, proof, storage, balances = proven
+        tampered = proof.model_copy(update={"helpers": ["0x" + "11" * 32] + proof.helpers[1:]})
+        assert not verify(root, tampered, storage=storage, balances=balances)
+        truncated = proof.model_copy(update={"helpers": proof.helpers[:-1]})
+        assert not verify(root, truncated, storage=storage, balances=balances)
+
+    def test_helper_indices(self):
+        """Test helpers are the path siblings that are not on another path."""
+        # Leaves 4 and 7 of a depth-2 tree need nodes 5 and 6
+        assert helper_indices([4, 7]) == [6, 5]
+        assert helper_indices([4, 5]) == [3]
+        assert helper_indices([1]) == []
@@ -0,0 +1,152 @@
+"""Tests for RLP encoding of BlockAccessList."""
+
+import pytest
+from eth_hash.auto import keccak
+
+from pokebal.bal.rlp import (
+    DecodingError,
+    EncodingError,
+    block_access_list_hash,
+    decode,
+    encode,
+    iter_encode,
+)
+from pokebal.bal.types import BlockAccessList
+
+from .constants import Addresses, StorageSlots
+from .test_ssz import mixed_access_list, synthetic_access_list
+
+
+def rlp(item) -> bytes:
+    """Straightforward recursive RLP encoder, the reference for ``encode``."""
+    if isinstance(item, int):
+        item = item.to_bytes((item.bit_length() + 7) // 8, "big")
+    if isinstance(item, bytes):
+        if len(item) == 1 and item[0] < 0x80:
+            return item
+        return prefix(0x80, len(item)) + item
+    payload = b"".join(rlp(child) for child in item)
+    return prefix(0xC0, len(payload)) + payload
+
+
+def prefix(offset: int, length: int) -> bytes:
+    if length <= 55:
+        return bytes([offset + length])
+    length_bytes = length.to_bytes((length.bit_length() + 7) // 8, "big")
+    return bytes([offset + 55 + len(length_bytes)]) + length_bytes
+
+
+def reference_encoding(bal: BlockAccessList) -> bytes:
+    def word(value: str) -> int:
+        return int(value, 16)
+
+    return rlp(
+        [
+            [
+                bytes.fromhex(account.address[2:]),
+                [
+                    [
+                        word(slot_changes.slot),
+                        [[c.tx_index, word(c.new_value)] for c in slot_changes.changes],
+                    ]
+                    for slot_changes in account.storage_changes
+                ],
+                [word(slot_read.slot) for slot_read in account.storage_reads],
+                [[c.tx_index, c.post_balance] for c in account.balance_changes],
+                [[c.tx_index, c.new_nonce] for c in account.nonce_changes],
+                [[c.tx_index, bytes.fromhex(c.new_code[2:])] for c in account.code_changes],
+            ]
+            for account in bal.account_changes
+        ]
+    )
+
+
+class TestEncode:
+    """Test suite for the RLP encoder."""
+
+    @pytest.mark.parametrize(
+        "bal", [BlockAccessList(), mixed_access_list(), synthetic_access_list()]
+    )
+    def test_matches_reference_encoder(self, bal):
+        """Test the encoder produces the reference encoder's bytes."""
+        assert encode(bal) == reference_encoding(bal)
+
+    def test_single_byte_code_and_long_lists(self):
+        """Test one-byte strings and payloads over 55 bytes."""
+        bal = BlockAccessList()
+        bal.add_code_change(Addresses.ALICE, 0, "0x7f")
+        bal.add_code_change(Addresses.ALICE, 1, "0x80")
+        for tx_index in range(40):
+            bal.add_storage_read(Addresses.BOB, "0x" + f"{tx_index + 1:064x}")
+
+        assert encode(bal) == reference_encoding(bal)
+
+    def test_chunks_per_account(self):
+        """Test the list prefix is followed by one chunk per account."""
+        bal = mixed_access_list()
+        chunks = [bytes(chunk) for chunk in iter_encode(bal)]
+
+        assert len(chunks) == 1 + len(bal.account_changes)
+        assert b"".join(chunks) == encode(bal)
+
+    def test_negative_value(self):
+        """Test negative integers are rejected."""
+        bal = BlockAccessList()
+        bal.add_balance_change(Addresses.ALICE, 0, -1)
+
+        with pytest.raises(EncodingError):
+            encode(bal)
+
+
+class TestDecode:
+    """Test suite for the RLP decoder."""
+
+    @pytest.mark.parametrize(
+        "bal", [BlockAccessList(), mixed_access_list(), synthetic_access_list()]
+    )
+    def test_round_trip(self, bal):
+        """Test decoding an encoding gives back the list."""
+        assert decode(encode(bal)) == bal
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            b"",
+            rlp([]) + b"\x00",
+            b"\xf8\x00",
+            rlp([[b"\x00" * 20, [], [], [], []]]),
+            rlp([[b"\x00" * 19, [], [], [], [], []]]),
+            rlp([[b"\x00" * 20, [], [b"\x00\x01"], [], [], []]]),
+            rlp([[b"\x00" * 20, [], [b"\x01" * 33], [], [], []]]),
+            rlp([[b"\x00" * 20, [], [], [[1]], [], []]]),
+            rlp([[b"\x00" * 20, [], [], [], [], [[0, []]]]]),
+            b"\xc8\xc7\x94" + b"\x00" * 4,
+            b"\xc1\x81\x05",
+        ],
+    )
+    def test_rejects_malformed(self, data):
+        """Test truncated, non-canonical and misshapen encodings are rejected."""
+        with pytest.raises(DecodingError):
+            decode(data)
+
+    def test_storage_words(self):
+        """Test slots and values decode as 32-byte words."""
+        bal = BlockAccessList()
+        bal.add_storage_write(Addresses.ALICE, StorageSlots.SLOT_1, 0, "0x" + "00" * 31 + "01")
+
+        assert decode(encode(bal)) == bal
+
+
+class TestBlockAccessListHash:
+    """Test suite for the header hash."""
+
+    def test_empty_list(self):
+        """Test the hash of an empty list is keccak256(0xc0)."""
+        assert block_access_list_hash(BlockAccessList()).hex() == (
+            "1dcc4de8dec75d7aab85b567b6ccd41ad312451b948a7413f0a142fd40d49347"
+        )
+
+    def test_matches_hash_of_encoding(self):
+        """Test hashing while encoding equals hashing the encoding."""
+        bal = synthetic_access_list()
+        assert block_access_list_hash(bal) == keccak(encode(bal))
@@ -0,0 +1,124 @@
+"""Tests for SSZ encoding of BlockAccessList."""
+
+import pytest
+import ssz
+
+from pokebal.bal.builder import from_execution_trace
+from pokebal.bal.ssz import decode_generic, encode, encode_generic
+from pokebal.bal.types import (
+    AccountChanges,
+    BlockAccessList,
+    SlotChanges,
+    SlotRead,
+    StorageChange,
+)
+from pokebal.rpc.mocknode import SyntheticChain
+from pokebal.rpc.types import TransactionTrace
+
+from .constants import Addresses, Balances, CodeSamples, StorageSlots, StorageValues
+
+
+def synthetic_access_list() -> BlockAccessList:
+    raw = SyntheticChain(txs_per_block=20, account_pool=15).handlers()[
+        "debug_traceBlockByNumber"
+    ]([hex(3)])
+    return from_execution_trace([TransactionTrace.model_validate(item) for item in raw])
+
+
+def mixed_access_list() -> BlockAccessList:
+    """Every kind of entry, including empty code and reads."""
+    bal = BlockAccessList()
+    bal.add_storage_write(Addresses.ALICE, StorageSlots.SLOT_1, 0, StorageValues.VALUE_1)
+    bal.add_storage_write(Addresses.ALICE, StorageSlots.SLOT_1, 2, StorageValues.VALUE_2)
+    bal.add_storage_read(Addresses.ALICE, StorageSlots.SLOT_2)
+    bal.add_balance_change(Addresses.BOB, 1, Balances.BALANCE_1000)
+    bal.add_balance_change(Addresses.BOB, 3, 2**128 - 1)
+    bal.add_nonce_change(Addresses.BOB, 1, 2**64 - 1)
+    bal.add_code_change(Addresses.CAROL, 0, CodeSamples.COMPLEX_CODE)
+    bal.add_code_change(Addresses.CAROL, 65535, "0x")
+    bal.add_touched_account("0x" + "dd" * 20)
+    return bal
+
+
+class TestEncode:
+    """Test suite for the fast SSZ encoder."""
+
+    @pytest.mark.parametrize(
+        "bal", [BlockAccessList(), mixed_access_list(), synthetic_access_list()]
+    )
+    def test_matches_generic_encoder(self, bal):
+        """Test the fast encoder produces the generic encoder's bytes."""
+        data = encode(bal)
+
+        assert data == encode_generic(bal)
+        assert decode_generic(data) == bal
+
+    def test_layout_of_single_balance_change(self):
+        """Test offsets and little-endian integers of a small list."""
+        bal = BlockAccessList()
+        bal.add_balance_change(Addresses.ALICE, 1, 5)
+
+        data = encode(bal)
+
+        assert data[:4] == (4).to_bytes(4, "little")
+        account = data[4:]
+        assert account[:20] == bytes.fromhex(Addresses.ALICE[2:])
+        # Every list but balance_changes is empty, so offsets point at the end
+        offsets = [int.from_bytes(account[20 + 4 * i : 24 + 4 * i], "little") for i in range(5)]
+        assert offsets == [40, 40, 40, 58, 58]
+        assert account[40:] == (1).to_bytes(2, "little") + (5).to_bytes(16, "little")
+
+    @pytest.mark.parametrize(
+        "mutate",
+        [
+            lambda bal: bal.add_balance_change(Addresses.ALICE, 0, 2**128),
+            lambda bal: bal.add_nonce_change(Addresses.ALICE, 2**16, 1),
+            lambda bal: bal.add_code_change(Addresses.ALICE, 0, "0x" + "00" * 24_577),
+            lambda bal: bal.add_storage_write(Addresses.ALICE, StorageSlots.SLOT_1, 0, "0x01"),
+        ],
+    )
+    def test_values_out_of_range(self, mutate):
+        """Test values that do not fit their SSZ type are rejected."""
+        bal = BlockAccessList()
+        mutate(bal)
+
+        with pytest.raises(ssz.SerializationError):
+            encode(bal)
+
+    @pytest.mark.parametrize(
+        "address, slot, read",
+        [
+            ("0x" + "11" * 19, "0x" + "22" * 33, "0x" + "33" * 32),
+            ("0x" + "11" * 20, "0x" + "22" * 31, "0x" + "33" * 32),
+            ("0x" + "11" * 20, "0x" + "22" * 32, "0x" + "33" * 33),
+            ("0x" + "11" * 20, "0x" + "22" * 32, "0xzz"),
+        ],
+    )
+    def test_malformed_fixed_size_values(self, address, slot, read):
+        """Test unvalidated addresses and slots of the wrong length are rejected."""
+        account = AccountChanges.model_construct(
+            address=address,
+            storage_changes=[
+                SlotChanges.model_construct(
+                    slot=slot,
+                    changes=[StorageChange.model_construct(tx_index=0, new_value=slot)],
+                )
+            ],
+            storage_reads=[SlotRead.model_construct(slot=read)],
+            balance_changes=[],
+            nonce_changes=[],
+            code_changes=[],
+        )
+
+        with pytest.raises(ssz.SerializationError):
+            encode(BlockAccessList.model_construct(account_changes=[account]))
+
+    def test_list_limit(self, monkeypatch):
+        """Test lists longer than their MAX_* limit are rejected."""
+        monkeypatch.setattr("pokebal.bal.ssz.MAX_TXS", 2)
+        bal = BlockAccessList()
+        for tx_index in range(3):
+            bal.add_nonce_change(Addresses.ALICE, tx_index, tx_index + 1)
+
+        with pytest.raises(ssz.SerializationError, match="nonce_changes"):
+            encode(bal)
@@ -0,0 +1,78 @@
+"""Tests for lazy views over SSZ-encoded BlockAccessList."""
+
+import pytest
+from ssz import DeserializationError
+
+from pokebal.bal.ssz import encode
+from pokebal.bal.sszview import BlockAccessListView, decode
+from pokebal.bal.types import BlockAccessList
+
+from .constants import Addresses, Balances, CodeSamples, StorageSlots, StorageValues
+from .test_ssz import mixed_access_list, synthetic_access_list
+
+
+class TestBlockAccessListView:
+    """Test suite for lazy account access."""
+
+    @pytest.mark.parametrize(
+        "bal", [BlockAccessList(), mixed_access_list(), synthetic_access_list()]
+    )
+    def test_materialize_round_trip(self, bal):
+        """Test materializing a view gives back the encoded list."""
+        data = encode(bal)
+
+        assert decode(data) == bal
+        assert BlockAccessListView(memoryview(data)).materialize() == bal
+
+    def test_account_lookup(self):
+        """Test accounts are found by address and decoded field by field."""
+        view = BlockAccessListView(encode(mixed_access_list()))
+
+        assert len(view) == 4
+        assert [account.address for account in view][:2] == [Addresses.ALICE, Addresses.BOB]
+        assert Addresses.CAROL in view and "0x" + "ee" * 20 not in view
+        assert view.get("0x" + "ee" * 20) is None
+
+        alice = view.get(Addresses.ALICE)
+        assert [read.slot for read in alice.storage_reads] == [StorageSlots.SLOT_2]
+        slot = alice.slot(StorageSlots.SLOT_1)
+        assert [change.new_value for change in slot.changes] == [
+            StorageValues.VALUE_1,
+            StorageValues.VALUE_2,
+        ]
+        assert alice.slot(StorageSlots.SLOT_2) is None
+
+        bob = view[-3]
+        assert [change.post_balance for change in bob.balance_changes] == [
+            Balances.BALANCE_1000,
+            2**128 - 1,
+        ]
+        assert bob.nonce_changes[0].new_nonce == 2**64 - 1
+        carol = view.get(Addresses.CAROL)
+        assert [change.new_code for change in carol.code_changes] == [
+            CodeSamples.COMPLEX_CODE,
+            "0x",
+        ]
+        assert carol.materialize() == mixed_access_list().account_changes[2]
+
+    def test_untouched_accounts_are_not_decoded(self):
+        """Test corrupt bytes of other accounts do not affect a lookup."""
+        bal = mixed_access_list()
+        data = bytearray(encode(bal))
+        view = BlockAccessListView(data)
+        # Point Bob's storage_reads offset past the end of his entry
+        bob_start = view._offsets[1]
+        data[bob_start + 24 : bob_start + 28] = (10**6).to_bytes(4, "little")
+
+        assert view.get(Addresses.CAROL).materialize() == bal.account_changes[2]
+        with pytest.raises(DeserializationError):
+            view.get(Addresses.BOB).storage_reads
+
+    @pytest.mark.parametrize(
+        "data",
+        [b"\x01", b"\x03\x00\x00\x00", b"\x08\x00\x00\x00\x04\x00\x00\x00", b"\x04\x00\x00\x00"],
+    )
+    def test_malformed_offsets(self, data):
+        """Test malformed account offset tables are rejected."""
+        with pytest.raises(DeserializationError):
+            BlockAccessListView(data)[0]
@@ -0,0 +1,174 @@
+"""Tests for storage access extraction from streamed struct logs."""
+
+import json
+
+import pytest
+
+from pokebal.bal.structlog import StructLogAccessTracker, from_struct_log_stream
+from pokebal.rpc.client import RPCError
+
+from .constants import Addresses
+
+TARGET = Addresses.ALICE
+CALLEE = Addresses.BOB
+CREATED = Addresses.CAROL
+
+
+def word(value: int) -> str:
+    """Encode an int as a 32-byte hex word."""
+    return f"0x{value:064x}"
+
+
+def log(op: str, depth: int, *stack) -> dict:
+    """Build a struct log entry with a stack given bottom to top."""
+    return {"op": op, "depth": depth, "stack": [hex(item) for item in stack]}
+
+
+def addr(address: str) -> int:
+    return int(address, 16)
+
+
+def response(transactions: list) -> bytes:
+    """Build a debug_traceBlockByNumber response body."""
+    return json.dumps(
+        {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "result": [
+                {
+                    "txHash": "0x" + f"{index:064x}",
+                    "result": {"gas": 1, "failed": failed, "structLogs": logs},
+                }
+                for index, (failed, logs) in enumerate(transactions)
+            ],
+        }
+    ).encode()
+
+
+def chunked(raw: bytes, size: int = 7) -> list:
+    return [raw[index : index + size] for index in range(0, len(raw), size)]
+
+
+def slots(account, attribute: str) -> list:
+    return [entry.slot for entry in getattr(account, attribute)]
+
+
+class TestFromStructLogStream:
+    """Test suite for from_struct_log_stream."""
+
+    def test_sload_and_sstore(self):
+        """Test SLOAD becomes a read and SSTORE a write with its last value."""
+        logs = [
+            log("SLOAD", 1, 1),
+            log("SSTORE", 1, 5, 2),
+            log("SSTORE", 1, 6, 2),
+            log("STOP", 1),
+        ]
+
+        bal = from_struct_log_stream(chunked(response([(False, logs)])), [TARGET])
+
+        account = bal.account_changes[0]
+        assert account.address == TARGET
+        assert slots(account, "storage_reads") == [word(1)]
+        assert account.storage_changes[0].slot == word(2)
+        assert account.storage_changes[0].changes[0].new_value == word(6)
+
+    def test_call_context_stack(self):
+        """Test CALL switches storage context and DELEGATECALL keeps it."""
+        logs = [
+            log("CALL", 1, 0, 0, 0, 0, 0, addr(CALLEE), 100),
+            log("SSTORE", 2, 1, 1),
+            log("RETURN", 2),
+            log("DELEGATECALL", 1, 0, 0, 0, 0, addr(CALLEE), 100, 1),
+            log("SSTORE", 2, 2, 2),
+            log("RETURN", 2),
+            log("STOP", 1, 1),
+        ]
+
+        bal = from_struct_log_stream([response([(False, logs)])], [TARGET])
+
+        accounts = {account.address: account for account in bal.account_changes}
+        assert slots(accounts[CALLEE], "storage_changes") == [word(1)]
+        assert slots(accounts[TARGET], "storage_changes") == [word(2)]
+
+    def test_reverted_frame_writes_become_reads(self):
+        """Test writes of a frame that returned 0 are demoted to reads."""
+        logs = [
+            log("CALL", 1, 0, 0, 0, 0, 0, addr(CALLEE), 100),
+            log("SSTORE", 2, 9, 3),
+            log("REVERT", 2, 0, 0),
+            log("POP", 1, 0),
+        ]
+
+        bal = from_struct_log_stream([response([(False, logs)])], [TARGET])
+
+        callee = next(account for account in bal.account_changes if account.address == CALLEE)
+        assert callee.storage_changes == []
+        assert slots(callee, "storage_reads") == [word(3)]
+
+    def test_failed_transaction_writes_become_reads(self):
+        """Test a failed transaction records no writes."""
+        logs = [log("SSTORE", 1, 1, 4), log("REVERT", 1, 0, 0)]
+
+        bal = from_struct_log_stream([response([(True, logs)])], [TARGET])
+
+        account = bal.account_changes[0]
+        assert account.storage_changes == []
+        assert slots(account, "storage_reads") == [word(4)]
+
+    def test_create_context_is_resolved_on_return(self):
+        """Test storage of a created contract is keyed by its new address."""
+        logs = [
+            log("CREATE", 1, 0, 0, 0),
+            log("SSTORE", 2, 7, 1),
+            log("RETURN", 2, 0, 0),
+            log("POP", 1, addr(CREATED)),
+        ]
+
+        bal = from_struct_log_stream([response([(False, logs)])], [TARGET])
+
+        created = next(account for account in bal.account_changes if account.address == CREATED)
+        assert created.storage_changes[0].changes[0].new_value == word(7)
+
+    def test_account_ops_touch_accounts(self):
+        """Test BALANCE targets are recorded as touched accounts."""
+        logs = [log("BALANCE", 1, addr(CALLEE)), log("STOP", 1)]
+
+        bal = from_struct_log_stream([response([(False, logs)])], [TARGET])
+
+        assert {account.address for account in bal.account_changes} == {TARGET, CALLEE}
+
+    def test_tx_index_and_written_reads(self):
+        """Test writes carry their tx index and reads of written slots are pruned."""
+        transactions = [
+            (False, [log("SLOAD", 1, 1), log("STOP", 1)]),
+            (False, [log("SSTORE", 1, 8, 1), log("STOP", 1)]),
+        ]
+
+        bal = from_struct_log_stream(chunked(response(transactions)), [TARGET, TARGET])
+
+        account = bal.account_changes[0]
+        assert account.storage_reads == []
+        assert account.storage_changes[0].changes[0].tx_index == 1
+
+    def test_rpc_error(self):
+        """Test an error response is raised as RPCError."""
+        raw = json.dumps({"jsonrpc": "2.0", "id": 1, "error": {"code": -1, "message": "no"}})
+
+        with pytest.raises(RPCError):
+            from_struct_log_stream([raw.encode()], [])
+
+
+class TestStructLogAccessTracker:
+    """Test suite for driving the tracker directly."""
+
+    def test_tracker_api(self):
+        """Test begin/step/end can be driven without a stream."""
+        tracker = StructLogAccessTracker()
+        tracker.begin_transaction(0, TARGET)
+        tracker.step(log("SSTORE", 1, 1, 1))
+        tracker.end_transaction()
+
+        bal = tracker.build()
+
+        assert bal.account_changes[0].storage_changes[0].slot == word(1)
@@ -0,0 +1,171 @@
+"""Tests for the normalized binary trace store."""
+
+import pytest
+
+from pokebal.bal.builder import from_execution_trace
+from pokebal.bal.tracestore import TraceStore, TraceStoreWriter, write_blocks
+from pokebal.rpc.mocknode import SyntheticChain
+from pokebal.rpc.types import TransactionTrace
+
+CHAIN = SyntheticChain(txs_per_block=6, account_pool=20)
+
+CONTRACT = "0x" + "c0" * 20
+DELETED = "0x" + "de" * 20
+SLOT_A = "0x" + "01".zfill(64)
+SLOT_B = "0x" + "02".zfill(64)
+
+
+def block_traces(number: int) -> list:
+    raw = CHAIN.handlers()["debug_traceBlockByNumber"]([hex(number)])
+    return [TransactionTrace.model_validate(item) for item in raw]
+
+
+def edge_traces() -> list:
+    """A deployment, a deletion, a reset slot and an unchanged slot."""
+    deploy = {
+        "txHash": "0x" + "aa" * 32,
+        "result": {
+            "pre": {DELETED: {"balance": "0x10", "nonce": 1, "code": "0x6001"}},
+            "post": {
+                CONTRACT: {
+                    "balance": "0x0",
+                    "nonce": 1,
+                    "code": "0x6080604052",
+                    "storage": {SLOT_A: "0x" + "ff".zfill(64)},
+                }
+            },
+        },
+    }
+    update = {
+        "txHash": "0x" + "bb" * 32,
+        "result": {
+            "pre": {
+                CONTRACT: {
+                    "balance": "0x0",
+                    "nonce": 1,
+                    "code": "0x6080604052",
+                    "codeHash": "0x" + "12" * 32,
+                    "storage": {SLOT_A: "0x" + "ff".zfill(64), SLOT_B: "0x" + "01".zfill(64)},
+                }
+            },
+            "post": {
+                CONTRACT: {"balance": "0x5", "storage": {SLOT_B: "0x" + "01".zfill(64)}}
+            },
+        },
+    }
+    return [TransactionTrace.model_validate(item) for item in (deploy, update)]
+
+
+class TestRoundTrip:
+    """Test suite for writing and loading blocks."""
+
+    def test_load_block_equals_traces(self, tmp_path):
+        """Test stored blocks decode to the traces that were written."""
+        blocks = [(number, block_traces(number)) for number in (3, 4)]
+        assert write_blocks(str(tmp_path), blocks) == 2
+
+        with TraceStore(str(tmp_path)) as store:
+            assert store.block_numbers() == [3, 4]
+            assert 3 in store and 5 not in store
+            for number, traces in blocks:
+                assert store.load_block(number) == traces
+            assert store.load_transaction(4, 2) == blocks[1][1][2]
+
+    def test_edge_cases(self, tmp_path):
+        """Test code, code hashes and deleted accounts survive a round trip."""
+        traces = edge_traces()
+        write_blocks(str(tmp_path), [(1, traces)])
+
+        with TraceStore(str(tmp_path)) as store:
+            loaded = store.load_block(1)
+
+        assert loaded == traces
+        assert loaded[1].result.post[CONTRACT].nonce is None
+        assert loaded[0].result.post[CONTRACT].model_fields_set == {
+            "balance",
+            "nonce",
+            "code",
+            "storage",
+        }
+
+    def test_values_are_normalized(self, tmp_path):
+        """Test hex is lowercased and storage padded to 32 bytes."""
+        trace = TransactionTrace.model_validate(
+            {
+                "txHash": "0x" + "AB" * 32,
+                "result": {
+                    "pre": {"0x" + "AA" * 20: {"balance": "0x0A", "storage": {"0x1": "0x2"}}},
+                    "post": {},
+                },
+            }
+        )
+        write_blocks(str(tmp_path), [(1, [trace])])
+
+        with TraceStore(str(tmp_path)) as store:
+            loaded = store.load_transaction(1, 0)
+
+        state = loaded.result.pre["0x" + "aa" * 20]
+        assert loaded.txHash == "0x" + "ab" * 32
+        assert state.balance == "0xa"
+        assert state.storage == {"0x" + "1".zfill(64): "0x" + "2".zfill(64)}
+
+    def test_missing_entries(self, tmp_path):
+        """Test unknown blocks and transactions raise."""
+        write_blocks(str(tmp_path), [(1, block_traces(1))])
+
+        with TraceStore(str(tmp_path)) as store:
+            with pytest.raises(KeyError):
+                store.load_block(2)
+            with pytest.raises(IndexError):
+                store.load_transaction(1, 6)
+
+
+class TestWriter:
+    """Test suite for appending to a store."""
+
+    def test_append_and_replace(self, tmp_path):
+        """Test a second writer adds blocks and rewritten blocks replace old ones."""
+        write_blocks(str(tmp_path), [(1, block_traces(1)), (2, block_traces(2))])
+        write_blocks(str(tmp_path), [(2, edge_traces()), (3, block_traces(3))])
+
+        with TraceStore(str(tmp_path)) as store:
+            assert len(store) == 3
+            assert store.load_block(1) == block_traces(1)
+            assert store.load_block(2) == edge_traces()
+
+    def test_code_stored_once(self, tmp_path):
+        """Test identical code is written once per store."""
+        with TraceStoreWriter(str(tmp_path)) as writer:
+            writer.write_block(1, edge_traces())
+            writer.write_block(2, edge_traces())
+
+        code_size = (tmp_path / "code.bin").stat().st_size
+        assert code_size == len(bytes.fromhex("6001")) + len(bytes.fromhex("6080604052"))
+
+
+class TestBuildBlock:
+    """Test suite for building access lists from the store."""
+
+    @pytest.mark.parametrize("traces", [block_traces(7), edge_traces()])
+    def test_equals_from_execution_trace(self, tmp_path, traces):
+        """Test the direct build matches building from the loaded traces."""
+        write_blocks(str(tmp_path), [(7, traces)])
+
+        with TraceStore(str(tmp_path)) as store:
+            bal = store.build_block(7)
+            assert bal == from_execution_trace(store.load_block(7))
+        assert bal.model_dump() == from_execution_trace(traces).model_dump()
+
+    def test_oversized_code(self, tmp_path):
+        """Test code over MAX_CODE_SIZE is rejected like the builder does."""
+        trace = TransactionTrace.model_validate(
+            {
+                "txHash": "0x" + "cc" * 32,
+                "result": {"pre": {}, "post": {CONTRACT: {"code": "0x" + "00" * 24_577}}},
+            }
+        )
+        write_blocks(str(tmp_path), [(1, [trace])])
+
+        with TraceStore(str(tmp_path)) as store:
+            with pytest.raises(ValueError, match="exceeds maximum"):
+                store.build_block(1)
@@ -1041,3 +1041,71 @@ class TestMixedOperations:
         assert account.balance_changes[0].post_balance == Balances.BALANCE_1000
         assert account.nonce_changes[0].new_nonce == Nonces.NONCE_1
         assert account.storage_changes[0].slot == StorageSlots.SLOT_1
+
+
+class TestTouchedAccounts:
+    """Test cases for accounts accessed without changes."""
+
+    def test_touched_account_untouched(self):
+        """Test touching a fresh account creates an empty entry."""
+        bal = BlockAccessList()
+
+        bal.add_touched_account(Addresses.ALICE)
+
+        assert len(bal.account_changes) == 1
+        assert bal.account_changes[0].address == Addresses.ALICE
+        assert bal.account_changes[0].storage_changes == []
+
+    def test_touched_account_duplicates(self):
+        """Test touching an already present account adds nothing."""
+        bal = BlockAccessList()
+        bal.add_balance_change(Addresses.ALICE, TxIndices.TX_0, Balances.BALANCE_1000)
+
+        bal.add_touched_account(Addresses.ALICE)
+
+        assert len(bal.account_changes) == 1
+        assert len(bal.account_changes[0].balance_changes) == 1
+
+
+class TestLookupIndex:
+    """Test cases for account and slot lookups of the add_* methods."""
+
+    def test_lists_changed_directly(self):
+        """Test lookups see entries appended or replaced outside add_*."""
+        bal = BlockAccessList()
+        bal.add_balance_change(Addresses.ALICE, TxIndices.TX_0, Balances.BALANCE_1000)
+        other = BlockAccessList()
+        other.add_storage_write(
+            Addresses.BOB, StorageSlots.SLOT_1, TxIndices.TX_0, StorageValues.VALUE_1
+        )
+
+        bal.account_changes.append(other.account_changes[0])
+        bal.add_storage_write(
+            Addresses.BOB, StorageSlots.SLOT_1, TxIndices.TX_1, StorageValues.VALUE_2
+        )
+        bal.account_changes[0].balance_changes = []
+        bal.add_balance_change(Addresses.ALICE, TxIndices.TX_0, Balances.BALANCE_2000)
+
+        assert len(bal.account_changes) == 2
+        bob = bal.account_changes[1]
+        assert len(bob.storage_changes) == 1
+        assert [change.tx_index for change in bob.storage_changes[0].changes] == [
+            TxIndices.TX_0,
+            TxIndices.TX_1,
+        ]
+        assert len(bal.account_changes[0].balance_changes) == 1
+
+    def test_equality_and_copies(self):
+        """Test lookups affect neither equality nor copies."""
+        bal = BlockAccessList()
+        bal.add_storage_read(Addresses.ALICE, StorageSlots.SLOT_1)
+        fresh = BlockAccessList.model_validate(bal.model_dump())
+
+        copied = bal.model_copy(deep=True)
+        copied.add_storage_read(Addresses.ALICE, StorageSlots.SLOT_1)
+        copied.add_storage_read(Addresses.BOB, StorageSlots.SLOT_1)
+
+        assert bal == fresh
+        assert len(bal.account_changes) == 1
+        assert len(copied.account_changes) == 2
+        assert len(copied.account_changes[0].storage_reads) == 1
@@ -0,0 +1,110 @@
+"""Tests for incremental JSON value extraction."""
+
+import json
+import random
+
+import pytest
+
+from pokebal.common.jsonstream import JsonItemStream, iter_json_items, path_matches
+
+DOCUMENT = {
+    "jsonrpc": "2.0",
+    "id": 1,
+    "result": [
+        {
+            "txHash": "0x01",
+            "result": {
+                "failed": False,
+                "structLogs": [
+                    {"op": "SLOAD", "depth": 1, "stack": ["0x1"]},
+                    {"op": "STOP", "depth": 1, "note": "tricky \" ] } [ { string"},
+                ],
+            },
+        },
+        {"txHash": "0x02", "result": {"failed": True, "structLogs": []}},
+    ],
+}
+
+PATTERNS = [
+    ("result", "*", "txHash"),
+    ("result", "*", "result", "structLogs", "*"),
+]
+
+EXPECTED = [
+    (("result", 0, "txHash"), "0x01"),
+    (("result", 0, "result", "structLogs", 0), DOCUMENT["result"][0]["result"]["structLogs"][0]),
+    (("result", 0, "result", "structLogs", 1), DOCUMENT["result"][0]["result"]["structLogs"][1]),
+    (("result", 1, "txHash"), "0x02"),
+]
+
+
+def split(raw: bytes, count: int, seed: int) -> list:
+    """Split bytes into ``count + 1`` chunks at random offsets."""
+    rng = random.Random(seed)
+    cuts = sorted(rng.sample(range(1, len(raw)), count))
+    return [raw[start:end] for start, end in zip([0] + cuts, cuts + [len(raw)])]
+
+
+class TestIterJsonItems:
+    """Test suite for iter_json_items."""
+
+    def test_single_chunk(self):
+        """Test matched values are yielded in document order."""
+        raw = json.dumps(DOCUMENT).encode()
+        assert list(iter_json_items([raw], PATTERNS)) == EXPECTED
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_arbitrary_chunk_boundaries(self, seed):
+        """Test results do not depend on where chunks are split."""
+        raw = json.dumps(DOCUMENT, indent=2).encode()
+        chunks = split(raw, 25, seed)
+        assert list(iter_json_items(chunks, PATTERNS)) == EXPECTED
+
+    def test_byte_at_a_time(self):
+        """Test the stream copes with one-byte chunks."""
+        raw = json.dumps(DOCUMENT).encode()
+        chunks = [raw[index : index + 1] for index in range(len(raw))]
+        assert list(iter_json_items(chunks, PATTERNS)) == EXPECTED
+
+    def test_scalar_values(self):
+        """Test scalars at matched paths are decoded."""
+        raw = b'{"a": [1, 2.5, true, null, "x"]}'
+        values = [value for _, value in iter_json_items([raw], [("a", "*")])]
+        assert values == [1, 2.5, True, None, "x"]
+
+    def test_custom_decoder_gets_raw_bytes(self):
+        """Test the decode hook receives the raw bytes of each value."""
+        raw = b'{"a": [{"b": 1}]}'
+        values = [value for _, value in iter_json_items([raw], [("a", 0)], decode=bytes)]
+        assert values == [b'{"b": 1}']
+
+    def test_truncated_document_raises(self):
+        """Test close fails when the root value is incomplete."""
+        stream = JsonItemStream([("result", "*")])
+        stream.feed(b'{"result": [1, 2')
+        with pytest.raises(ValueError):
+            stream.close()
+
+    def test_buffer_stays_bounded(self):
+        """Test consumed bytes are released while streaming."""
+        items = [{"index": index, "payload": "ff" * 100} for index in range(5_000)]
+        raw = json.dumps({"result": items}).encode()
+        stream = JsonItemStream([("result", "*")])
+
+        count = 0
+        for chunk in split(raw, 500, seed=1):
+            count += len(stream.feed(chunk))
+            assert len(stream._buffer) < len(raw) // 4
+        count += len(stream.close())
+
+        assert count == 5_000
+
+
+class TestPathMatches:
+    """Test suite for wildcard path matching."""
+
+    def test_wildcard(self):
+        """Test wildcards match keys and indices."""
+        assert path_matches(("result", "*"), ("result", 3))
+        assert not path_matches(("result", "*"), ("error", 3))
+        assert not path_matches(("result", "*"), ("result",))
@@ -0,0 +1,44 @@
+"""In-memory stand-ins for RPC transports used by the RPC tests."""
+
+import json
+import threading
+from typing import Any, Callable, Dict, Iterator, List
+
+
+class FakeTransport:
+    """Transport that answers requests from per-method handlers.
+
+    Every payload passed to ``send`` or ``stream`` is recorded in ``sent`` so
+    tests can assert on how calls were grouped into requests. ``stream``
+    yields the JSON of the response in small chunks.
+    """
+
+    def __init__(self, handlers: Dict[str, Callable[[list], Any]]):
+        self.handlers = handlers
+        self.sent: List[Any] = []
+        self._lock = threading.Lock()
+
+    def _answer(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        handler = self.handlers.get(request["method"])
+        if handler is None:
+            return {
+                "jsonrpc": "2.0",
+                "id": request["id"],
+                "error": {"code": -32601, "message": "method not found"},
+            }
+        return {"jsonrpc": "2.0", "id": request["id"], "result": handler(request["params"])}
+
+    def send(self, request):
+        with self._lock:
+            self.sent.append(request)
+        if isinstance(request, list):
+            # Answer in reverse to make sure clients match responses by id
+            return [self._answer(item) for item in reversed(request)]
+        return self._answer(request)
+
+    def stream(self, request: Dict[str, Any], chunk_size: int = 64) -> Iterator[bytes]:
+        with self._lock:
+            self.sent.append(request)
+        body = json.dumps(self._answer(request)).encode()
+        for start in range(0, len(body), chunk_size):
+            yield body[start : start + chunk_size]
@@ -0,0 +1,133 @@
+"""Tests for JSON-RPC batching in RPCClient and BatchingRPCClient."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pokebal.rpc.batching import BatchingRPCClient
+from pokebal.rpc.client import RPCClient, RPCError
+from pokebal.rpc.methods import EthereumMethods
+
+from .fakes import FakeTransport
+
+
+def balance_handler(params):
+    """Return the address' last byte as its balance."""
+    address, _block = params
+    return hex(int(address[-2:], 16))
+
+
+ADDRESSES = [f"0x{index:040x}" for index in range(1, 201)]
+
+
+class TestCallBatch:
+    """Test suite for RPCClient.call_batch."""
+
+    def test_results_follow_call_order(self):
+        """Test results are matched back to calls by request id."""
+        transport = FakeTransport({"eth_getBalance": balance_handler})
+        client = RPCClient(transport)
+
+        results = client.call_batch(
+            [("eth_getBalance", [address, "latest"]) for address in ADDRESSES[:3]]
+        )
+
+        assert results == ["0x1", "0x2", "0x3"]
+        assert len(transport.sent) == 1
+        assert len(transport.sent[0]) == 3
+
+    def test_failed_entry_does_not_fail_batch(self):
+        """Test a failed entry is returned as RPCError alongside good results."""
+        transport = FakeTransport({"eth_getBalance": balance_handler})
+        client = RPCClient(transport)
+
+        results = client.call_batch(
+            [("eth_getBalance", [ADDRESSES[0], "latest"]), ("eth_unknown", [])]
+        )
+
+        assert results[0] == "0x1"
+        assert isinstance(results[1], RPCError)
+        assert results[1].code == -32601
+
+    def test_rejected_batch_raises(self):
+        """Test a single error object answering the whole batch raises RPCError."""
+        transport = FakeTransport({"eth_getBalance": balance_handler})
+        transport.send = lambda request: {
+            "jsonrpc": "2.0",
+            "id": None,
+            "error": {"code": -32600, "message": "batch too large"},
+        }
+
+        with pytest.raises(RPCError) as error:
+            RPCClient(transport).call_batch([("eth_getBalance", [ADDRESSES[0], "latest"])])
+        assert error.value.code == -32600
+
+    def test_empty_batch_sends_nothing(self):
+        """Test an empty batch does not hit the transport."""
+        transport = FakeTransport({})
+        assert RPCClient(transport).call_batch([]) == []
+        assert transport.sent == []
+
+
+class TestBatchingRPCClient:
+    """Test suite for automatic micro-batching."""
+
+    def test_submit_coalesces_calls(self):
+        """Test futures submitted within the window share one request."""
+        transport = FakeTransport({"eth_getBalance": balance_handler})
+
+        with BatchingRPCClient(transport, max_wait=0.05, max_batch_size=50) as client:
+            futures = [
+                client.submit("eth_getBalance", [address, "latest"])
+                for address in ADDRESSES[:50]
+            ]
+            results = [future.result() for future in futures]
+
+        assert results == [hex(index) for index in range(1, 51)]
+        assert len(transport.sent) == 1
+
+    def test_max_batch_size_splits_batches(self):
+        """Test no batch exceeds max_batch_size calls."""
+        transport = FakeTransport({"eth_getBalance": balance_handler})
+
+        with BatchingRPCClient(transport, max_wait=0.05, max_batch_size=64) as client:
+            futures = [
+                client.submit("eth_getBalance", [address, "latest"])
+                for address in ADDRESSES
+            ]
+            [future.result() for future in futures]
+
+        assert all(len(request) <= 64 for request in transport.sent)
+        assert sum(len(request) for request in transport.sent) == len(ADDRESSES)
+
+    def test_concurrent_methods_are_batched_transparently(self):
+        """Test EthereumMethods used from threads gets batched without changes."""
+        transport = FakeTransport({"eth_getBalance": balance_handler})
+
+        with BatchingRPCClient(transport, max_wait=0.05) as client:
+            eth = EthereumMethods(client)
+            with ThreadPoolExecutor(max_workers=32) as pool:
+                balances = list(pool.map(eth.get_balance, ADDRESSES[:32]))
+
+        assert balances == list(range(1, 33))
+        assert len(transport.sent) < 32
+
+    def test_error_is_raised_on_the_failing_call_only(self):
+        """Test an RPC error resolves only its own future with an exception."""
+        transport = FakeTransport({"eth_getBalance": balance_handler})
+
+        with BatchingRPCClient(transport, max_wait=0.05) as client:
+            good = client.submit("eth_getBalance", [ADDRESSES[0], "latest"])
+            bad = client.submit("eth_unknown")
+
+            assert good.result() == "0x1"
+            with pytest.raises(RPCError):
+                bad.result()
+
+    def test_submit_after_close_raises(self):
+        """Test a closed client rejects new calls."""
+        client = BatchingRPCClient(FakeTransport({}))
+        client.close()
+
+        with pytest.raises(RuntimeError):
+            client.submit("eth_blockNumber")
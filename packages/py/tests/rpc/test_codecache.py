@@ -0,0 +1,39 @@
+"""Tests for the content-addressed bytecode cache."""
+
+from pokebal.rpc.codecache import BytecodeCache
+
+HASH_A = "0x" + "aa" * 32
+HASH_B = "0x" + "bb" * 32
+HASH_C = "0x" + "cc" * 32
+
+
+class TestBytecodeCache:
+    """Test suite for BytecodeCache."""
+
+    def test_get_returns_stored_code(self):
+        """Test code is retrievable by its hash in any case."""
+        cache = BytecodeCache()
+        cache.put(HASH_A, "0x6000")
+
+        assert cache.get(HASH_A.upper().replace("0X", "0x")) == "0x6000"
+        assert HASH_A in cache
+        assert cache.hits == 1
+
+    def test_unknown_hash_is_a_miss(self):
+        """Test a missing hash returns None and counts a miss."""
+        cache = BytecodeCache()
+
+        assert cache.get(HASH_A) is None
+        assert cache.misses == 1
+
+    def test_least_recently_used_is_evicted(self):
+        """Test the cache keeps at most max_entries, dropping the oldest."""
+        cache = BytecodeCache(max_entries=2)
+        cache.put(HASH_A, "0x01")
+        cache.put(HASH_B, "0x02")
+        cache.get(HASH_A)  # A is now more recent than B
+        cache.put(HASH_C, "0x03")
+
+        assert len(cache) == 2
+        assert HASH_A in cache
+        assert HASH_B not in cache
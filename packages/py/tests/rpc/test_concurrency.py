@@ -0,0 +1,215 @@
+"""Tests for the adaptive concurrency limiter."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from pokebal.rpc.concurrency import (
+    AdaptiveConcurrencyLimiter,
+    AdaptiveConcurrencyTransport,
+    is_overload,
+)
+
+from .fakes import FakeTransport
+
+
+def status_error(status_code: int) -> httpx.HTTPStatusError:
+    """Build an HTTPStatusError carrying the given status code."""
+    request = httpx.Request("POST", "http://node")
+    response = httpx.Response(status_code, request=request)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+
+class TestAdaptiveConcurrencyLimiter:
+    """Test suite for AdaptiveConcurrencyLimiter."""
+
+    def test_flat_latency_raises_limit(self):
+        """Test the limit grows while latency stays at baseline."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=16)
+
+        for _ in range(50):
+            limiter.acquire()
+            limiter.release(latency=0.01)
+
+        assert limiter.limit > 2
+        assert limiter.metrics().successes == 50
+
+    def test_limit_is_capped(self):
+        """Test the limit never exceeds max_limit."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=4)
+
+        for _ in range(500):
+            limiter.acquire()
+            limiter.release(latency=0.01)
+
+        assert limiter.limit == 4
+
+    def test_overload_halves_limit(self):
+        """Test an overload signal backs off multiplicatively."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=16)
+
+        limiter.acquire()
+        limiter.release(overloaded=True)
+
+        assert limiter.limit == 8
+        assert limiter.metrics().backoffs == 1
+
+    def test_rising_latency_backs_off(self):
+        """Test latency well above baseline shrinks the limit."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=16, smoothing=1.0)
+
+        limiter.acquire()
+        limiter.release(latency=0.001)
+        limiter.acquire()
+        limiter.release(latency=0.1)
+
+        assert limiter.limit < 16
+
+    def test_limit_never_below_minimum(self):
+        """Test repeated overloads stop at min_limit."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=4, min_limit=2)
+
+        for _ in range(10):
+            limiter.acquire()
+            limiter.release(overloaded=True)
+
+        assert limiter.limit == 2
+
+    def test_acquire_blocks_at_limit(self):
+        """Test no more than limit requests are admitted at once."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1)
+        limiter.acquire()
+
+        admitted = threading.Event()
+
+        def second():
+            limiter.acquire()
+            admitted.set()
+
+        thread = threading.Thread(target=second)
+        thread.start()
+
+        assert not admitted.wait(0.05)
+        limiter.release(latency=0.01)
+        assert admitted.wait(1)
+        thread.join()
+
+    def test_slot_released_when_closed(self):
+        """Test a slot held by a generator is returned when it is closed early."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=2)
+
+        def request():
+            with limiter.slot():
+                yield 1
+                yield 2
+
+        stream = request()
+        next(stream)
+        assert limiter.in_flight == 1
+        stream.close()
+
+        assert limiter.in_flight == 0
+        assert limiter.metrics().successes == 0
+
+    def test_slot_released_on_other_errors(self):
+        """Test errors that are not overloads return the slot and keep the limit."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=2)
+
+        with pytest.raises(KeyboardInterrupt):
+            with limiter.slot():
+                raise KeyboardInterrupt
+        with pytest.raises(ValueError):
+            with limiter.slot():
+                raise ValueError("bad json")
+
+        assert limiter.in_flight == 0
+        assert limiter.limit == 2
+
+    def test_invalid_initial_limit(self):
+        """Test initial_limit must be within bounds."""
+        with pytest.raises(ValueError):
+            AdaptiveConcurrencyLimiter(initial_limit=100, max_limit=10)
+
+
+class TestIsOverload:
+    """Test suite for overload classification."""
+
+    def test_overload_errors(self):
+        """Test timeouts and overload status codes are overloads."""
+        assert is_overload(httpx.ReadTimeout("slow"))
+        assert is_overload(status_error(429))
+        assert is_overload(status_error(503))
+
+    def test_other_errors(self):
+        """Test client errors and unrelated exceptions are not overloads."""
+        assert not is_overload(status_error(400))
+        assert not is_overload(ValueError("bad json"))
+
+
+class TestAdaptiveConcurrencyTransport:
+    """Test suite for AdaptiveConcurrencyTransport."""
+
+    def test_in_flight_requests_respect_limit(self):
+        """Test concurrent trace requests never exceed the limit."""
+        lock = threading.Lock()
+        in_flight = 0
+        peak = 0
+
+        def trace(params):
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            time.sleep(0.005)
+            with lock:
+                in_flight -= 1
+            return []
+
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=3, max_limit=3)
+        transport = AdaptiveConcurrencyTransport(
+            FakeTransport({"debug_traceBlockByNumber": trace}), limiter
+        )
+        request = {"jsonrpc": "2.0", "id": 1, "method": "debug_traceBlockByNumber", "params": []}
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            list(pool.map(lambda _: transport.send(request), range(30)))
+
+        assert peak <= 3
+
+    def test_unlisted_methods_bypass_limiter(self):
+        """Test methods outside the limited set do not take a slot."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1)
+        limiter.acquire()  # Exhaust the only slot
+        transport = AdaptiveConcurrencyTransport(
+            FakeTransport({"eth_blockNumber": lambda params: "0x1"}),
+            limiter,
+            methods={"debug_traceBlockByNumber"},
+        )
+
+        response = transport.send(
+            {"jsonrpc": "2.0", "id": 1, "method": "eth_blockNumber", "params": []}
+        )
+
+        assert response["result"] == "0x1"
+
+    def test_overload_response_backs_off(self):
+        """Test a 429 from the node shrinks the limit and is re-raised."""
+
+        def trace(params):
+            raise status_error(429)
+
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8)
+        transport = AdaptiveConcurrencyTransport(
+            FakeTransport({"debug_traceBlockByNumber": trace}), limiter
+        )
+
+        with pytest.raises(httpx.HTTPStatusError):
+            transport.send(
+                {"jsonrpc": "2.0", "id": 1, "method": "debug_traceBlockByNumber", "params": []}
+            )
+
+        assert limiter.limit == 4
+        assert limiter.in_flight == 0
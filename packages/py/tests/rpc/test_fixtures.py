@@ -0,0 +1,189 @@
+"""Tests for recording and replaying RPC fixtures."""
+
+import json
+
+import pytest
+
+from pokebal.bal.builder import from_execution_trace
+from pokebal.rpc.client import RPCClient, RPCError
+from pokebal.rpc.fixtures import (
+    INDEX_SUFFIX,
+    FixtureWriter,
+    MissingFixtureError,
+    RecordingTransport,
+    ReplayTransport,
+)
+from pokebal.rpc.methods import EthereumMethods
+from pokebal.rpc.mocknode import MockNode, SyntheticChain
+from pokebal.rpc.transport import HTTPTransport
+
+
+TRACE_REQUEST = {"jsonrpc": "2.0", "method": "debug_traceBlockByNumber", "params": ["0x2"]}
+
+
+@pytest.fixture
+def node():
+    with MockNode(SyntheticChain(txs_per_block=4).handlers()) as node:
+        yield node
+
+
+@pytest.fixture
+def store(tmp_path):
+    return str(tmp_path / "fixtures.bin")
+
+
+def record_blocks(node: MockNode, store: str, blocks: range) -> list:
+    """Build BALs for ``blocks`` against the node while recording."""
+    with RecordingTransport(HTTPTransport(node.serve_http()), store) as transport:
+        eth = EthereumMethods(RPCClient(transport))
+        return [from_execution_trace(eth.trace_block(block)) for block in blocks]
+
+
+class TestRecordReplay:
+    """Test suite for RecordingTransport and ReplayTransport."""
+
+    def test_replay_reproduces_builds(self, node, store):
+        """Test builds from replayed responses match the recorded run."""
+        recorded = record_blocks(node, store, range(1, 4))
+        served = node.stats().requests
+
+        with ReplayTransport(store) as transport:
+            eth = EthereumMethods(RPCClient(transport))
+            replayed = [from_execution_trace(eth.trace_block(block)) for block in range(1, 4)]
+
+        assert replayed == recorded
+        assert node.stats().requests == served
+
+    def test_batches_are_recorded_per_call(self, node, store):
+        """Test batch entries can be replayed individually and in new batches."""
+        addresses = [SyntheticChain().address(index) for index in range(5)]
+        with RecordingTransport(HTTPTransport(node.serve_http()), store) as transport:
+            expected = EthereumMethods(RPCClient(transport)).get_balances(addresses)
+
+        with ReplayTransport(store) as transport:
+            client = RPCClient(transport)
+            assert EthereumMethods(client).get_balances(reversed(addresses)) == expected
+            assert client.call("eth_getBalance", [addresses[0], "latest"]) == hex(
+                expected[addresses[0]]
+            )
+            assert transport.last_response_size > 0
+
+    def test_errors_are_replayed(self, node, store):
+        """Test recorded JSON-RPC errors are raised again on replay."""
+        with RecordingTransport(HTTPTransport(node.serve_http()), store) as transport:
+            with pytest.raises(RPCError):
+                RPCClient(transport).call("eth_unknown", [1])
+
+        with ReplayTransport(store) as transport:
+            with pytest.raises(RPCError) as excinfo:
+                RPCClient(transport).call("eth_unknown", [1])
+
+        assert excinfo.value.code == -32601
+
+    def test_rejected_batch_is_passed_through(self, store):
+        """Test a whole-batch error object still raises RPCError and is not recorded."""
+
+        class RejectingTransport:
+            def send(self, request):
+                return {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "big"}}
+
+            def close(self):
+                pass
+
+        with RecordingTransport(RejectingTransport(), store) as transport:
+            with pytest.raises(RPCError) as excinfo:
+                RPCClient(transport).call_batch([("eth_blockNumber", []), ("eth_chainId", [])])
+            assert len(transport.writer) == 0
+
+        assert excinfo.value.code == -32600
+
+    def test_missing_fixture(self, store):
+        """Test replaying an unrecorded call raises MissingFixtureError."""
+        with FixtureWriter(store) as writer:
+            writer.write("eth_blockNumber", [], {"result": "0x1"})
+
+        with ReplayTransport(store) as transport:
+            assert ("eth_blockNumber", []) in transport
+            with pytest.raises(MissingFixtureError):
+                RPCClient(transport).call("eth_chainId")
+
+    def test_params_formatting_is_canonical(self, store):
+        """Test calls match regardless of object key order."""
+        with FixtureWriter(store) as writer:
+            writer.write("m", [{"a": 1, "b": 2}], {"result": "ok"})
+
+        with ReplayTransport(store) as transport:
+            assert RPCClient(transport).call("m", [{"b": 2, "a": 1}]) == "ok"
+
+    def test_append_to_existing_store(self, store):
+        """Test reopening a store keeps earlier entries and overrides repeats."""
+        with FixtureWriter(store) as writer:
+            writer.write("a", [], {"result": 1})
+            writer.write("b", [], {"result": 2})
+        with FixtureWriter(store) as writer:
+            writer.write("b", [], {"result": 3})
+
+        with ReplayTransport(store) as transport:
+            client = RPCClient(transport)
+            assert len(transport) == 2
+            assert client.call("a") == 1
+            assert client.call("b") == 3
+
+    def test_stream_round_trip(self, node, store):
+        """Test streamed responses are recorded and can be streamed back."""
+        with RecordingTransport(HTTPTransport(node.serve_http()), store) as transport:
+            live = b"".join(RPCClient(transport).stream("debug_traceBlockByNumber", ["0x2"]))
+
+        with ReplayTransport(store) as transport:
+            replayed = b"".join(
+                RPCClient(transport).stream("debug_traceBlockByNumber", ["0x2"])
+            )
+
+        assert replayed == live
+
+    def test_streamed_response_is_replayed_in_chunks(self, node, store):
+        """Test replayed streams are split at the chunk size and can be sent too."""
+        with RecordingTransport(HTTPTransport(node.serve_http()), store) as transport:
+            live = b"".join(transport.stream({"id": 1, **TRACE_REQUEST}))
+
+        with ReplayTransport(store) as transport:
+            chunks = list(transport.stream({"id": 1, **TRACE_REQUEST}, chunk_size=100))
+            response = transport.send({"id": 7, **TRACE_REQUEST})
+
+        assert b"".join(chunks) == live
+        assert len(chunks) > 1
+        assert all(len(chunk) <= 100 for chunk in chunks)
+        assert response["id"] == 7
+        assert response["result"] == json.loads(live)["result"]
+
+    def test_sent_response_can_be_streamed(self, store):
+        """Test a response recorded with send streams back as a full envelope."""
+        with FixtureWriter(store) as writer:
+            writer.write("m", [], {"result": {"a": [1, 2]}})
+
+        with ReplayTransport(store) as transport:
+            body = b"".join(transport.stream({"jsonrpc": "2.0", "id": 3, "method": "m"}, 4))
+
+        assert json.loads(body) == {"jsonrpc": "2.0", "id": 3, "result": {"a": [1, 2]}}
+
+    def test_index_is_written_as_entries_are_added(self, store):
+        """Test entries survive a recording that is never closed."""
+        writer = FixtureWriter(store)
+        writer.write("a", [], {"result": 1})
+        list(writer.write_stream("b", [], [b'{"id":1,', b'"result":2}']))
+        with open(store + INDEX_SUFFIX, "a") as index:
+            index.write('["torn')
+
+        with ReplayTransport(store) as transport:
+            client = RPCClient(transport)
+            assert client.call("a") == 1
+            assert client.call("b") == 2
+        writer.close()
+
+    def test_abandoned_stream_is_not_recorded(self, store):
+        """Test a stream closed before its end leaves no entry."""
+        with FixtureWriter(store) as writer:
+            stream = writer.write_stream("m", [], [b'{"result":', b"1}"])
+            next(stream)
+            stream.close()
+            assert len(writer) == 0
@@ -0,0 +1,415 @@
+"""Tests for EthereumMethods against an in-memory transport."""
+
+import json
+
+import pytest
+
+from pokebal.rpc.client import RPCClient, RPCError
+from pokebal.rpc.concurrency import AdaptiveConcurrencyLimiter, AdaptiveConcurrencyTransport
+from pokebal.rpc.methods import BulkPolicy, EthereumMethods, FanOutPolicy
+
+from .fakes import FakeTransport
+
+ALICE = "0x" + "aa" * 20
+BOB = "0x" + "bb" * 20
+
+
+def tx_hash(index: int) -> str:
+    """Build a deterministic transaction hash for an index."""
+    return f"0x{index:064x}"
+
+
+def prestate(index: int) -> dict:
+    """Build a diff-mode prestate result where ALICE's balance grows by index."""
+    return {
+        "pre": {ALICE: {"balance": hex(index)}},
+        "post": {ALICE: {"balance": hex(index + 1)}},
+    }
+
+
+class FakeNode:
+    """Serves a single block with ``tx_count`` transactions."""
+
+    def __init__(self, tx_count: int):
+        self.tx_count = tx_count
+        self.failures = {}
+
+    def handlers(self) -> dict:
+        return {
+            "eth_getBlockByNumber": self.get_block,
+            "debug_traceBlockByNumber": self.trace_block,
+            "debug_traceTransaction": self.trace_transaction,
+        }
+
+    def get_block(self, params):
+        return {"transactions": [tx_hash(index) for index in range(self.tx_count)]}
+
+    def trace_block(self, params):
+        return [
+            {"txHash": tx_hash(index), "result": prestate(index)}
+            for index in range(self.tx_count)
+        ]
+
+    def trace_transaction(self, params):
+        index = int(params[0], 16)
+        if self.failures.get(index, 0) > 0:
+            self.failures[index] -= 1
+            raise ConnectionError("flaky node")
+        return prestate(index)
+
+
+def sent_methods(transport: FakeTransport) -> list:
+    requests = []
+    for request in transport.sent:
+        requests.extend(request if isinstance(request, list) else [request])
+    return [request["method"] for request in requests]
+
+
+class TestTraceBlock:
+    """Test suite for whole-block versus per-transaction tracing."""
+
+    def test_small_block_is_traced_whole(self):
+        """Test blocks under the threshold use debug_traceBlockByNumber."""
+        transport = FakeTransport(FakeNode(3).handlers())
+        eth = EthereumMethods(RPCClient(transport))
+
+        traces = eth.trace_block(1)
+
+        assert len(traces) == 3
+        assert "debug_traceBlockByNumber" in sent_methods(transport)
+        assert "debug_traceTransaction" not in sent_methods(transport)
+
+    def test_large_block_fans_out_in_order(self):
+        """Test blocks over the threshold are traced per tx and reassembled."""
+        transport = FakeTransport(FakeNode(40).handlers())
+        eth = EthereumMethods(RPCClient(transport), FanOutPolicy(max_block_txs=10))
+
+        traces = eth.trace_block(1)
+
+        assert [trace.txHash for trace in traces] == [tx_hash(i) for i in range(40)]
+        assert traces[7].result.post[ALICE].balance == hex(8)
+        assert sent_methods(transport).count("debug_traceTransaction") == 40
+        assert "debug_traceBlockByNumber" not in sent_methods(transport)
+
+    def test_failed_transaction_is_retried(self):
+        """Test one flaky transaction is retried without refetching the rest."""
+        node = FakeNode(20)
+        node.failures = {5: 2}
+        transport = FakeTransport(node.handlers())
+        eth = EthereumMethods(
+            RPCClient(transport), FanOutPolicy(max_block_txs=1, retries=2, backoff=0)
+        )
+
+        traces = eth.trace_block(1)
+
+        assert len(traces) == 20
+        assert sent_methods(transport).count("debug_traceTransaction") == 22
+
+    def test_exhausted_retries_raise(self):
+        """Test a transaction failing past its retries fails the block."""
+        node = FakeNode(4)
+        node.failures = {2: 5}
+        eth = EthereumMethods(
+            RPCClient(FakeTransport(node.handlers())),
+            FanOutPolicy(max_block_txs=1, retries=1, backoff=0),
+        )
+
+        with pytest.raises(ConnectionError):
+            eth.trace_block(1)
+
+    def test_observed_response_size_triggers_fan_out(self):
+        """Test a large observed bytes-per-tx switches later blocks to fan-out."""
+        transport = FakeTransport(FakeNode(5).handlers())
+        eth = EthereumMethods(RPCClient(transport), FanOutPolicy(max_block_bytes=200))
+
+        eth.trace_block(1)
+        assert "debug_traceTransaction" not in sent_methods(transport)
+
+        eth.trace_block(2)
+        assert "debug_traceTransaction" in sent_methods(transport)
+
+    def test_response_size_is_measured_per_call(self):
+        """Test the size comes from the trace response, not transport state."""
+        transport = FakeTransport(FakeNode(5).handlers())
+        transport.last_response_size = 10**9
+        eth = EthereumMethods(RPCClient(transport))
+
+        eth.trace_block(1)
+
+        response = {"jsonrpc": "2.0", "id": 2, "result": FakeNode(5).trace_block([])}
+        assert eth._trace_bytes_per_tx == len(json.dumps(response)) / 5
+
+    def test_retries_back_off(self, monkeypatch):
+        """Test retries wait twice as long each time."""
+        sleeps = []
+        monkeypatch.setattr("pokebal.rpc.methods.time.sleep", sleeps.append)
+        node = FakeNode(2)
+        node.failures = {1: 2}
+        eth = EthereumMethods(
+            RPCClient(FakeTransport(node.handlers())),
+            FanOutPolicy(max_block_txs=1, retries=2, backoff=0.25),
+        )
+
+        eth.trace_block(1)
+
+        assert sleeps == [0.25, 0.5]
+
+    def test_rpc_error_in_whole_block_trace(self):
+        """Test an error response to a streamed block trace raises RPCError."""
+        transport = FakeTransport({"eth_getBlockByNumber": FakeNode(1).get_block})
+        eth = EthereumMethods(RPCClient(transport))
+
+        with pytest.raises(RPCError):
+            eth.trace_block(1)
+
+    def test_error_responses_return_limiter_slots(self):
+        """Test streamed error responses do not keep their concurrency slots."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=2)
+        eth = EthereumMethods(RPCClient(AdaptiveConcurrencyTransport(FakeTransport({}), limiter)))
+
+        for _ in range(2):
+            with pytest.raises(RPCError):
+                eth.debug_traceBlockByNumber(1)
+        assert limiter.in_flight == 0
+
+        # Would block forever had the first two calls kept their slots
+        with pytest.raises(RPCError):
+            eth.debug_traceBlockByNumber(1)
+        assert limiter.in_flight == 0
+
+
+class TestPointMethods:
+    """Test suite for simple point lookups."""
+
+    def test_get_balance(self):
+        """Test eth_getBalance results are decoded to int."""
+        transport = FakeTransport({"eth_getBalance": lambda params: "0x2a"})
+        assert EthereumMethods(RPCClient(transport)).get_balance(ALICE) == 42
+
+    def test_rpc_error_is_raised(self):
+        """Test node errors surface as RPCError."""
+        eth = EthereumMethods(RPCClient(FakeTransport({})))
+        with pytest.raises(RPCError):
+            eth.get_block_number()
+
+
+class TestBulkLookups:
+    """Test suite for bulk state lookups."""
+
+    ADDRESSES = [f"0x{index:040x}" for index in range(1, 251)]
+
+    @staticmethod
+    def make_eth(handlers: dict) -> tuple:
+        transport = FakeTransport(handlers)
+        eth = EthereumMethods(
+            RPCClient(transport), bulk=BulkPolicy(batch_size=100, max_workers=4)
+        )
+        return eth, transport
+
+    def test_get_balances_batches_and_keys_by_address(self):
+        """Test balances are fetched in batches and keyed by address."""
+        eth, transport = self.make_eth(
+            {"eth_getBalance": lambda params: hex(int(params[0], 16) * 10)}
+        )
+
+        balances = eth.get_balances(self.ADDRESSES, block=100)
+
+        assert balances[self.ADDRESSES[4]] == 50
+        assert len(balances) == 250
+        assert [len(request) for request in transport.sent] == [100, 100, 50]
+        assert transport.sent[0][0]["params"][1] == hex(100)
+
+    def test_repeated_keys_are_fetched_once(self):
+        """Test duplicate addresses cost a single call."""
+        eth, transport = self.make_eth({"eth_getTransactionCount": lambda params: "0x7"})
+
+        nonces = eth.get_nonces([ALICE, BOB, ALICE, ALICE])
+
+        assert nonces == {ALICE: 7, BOB: 7}
+        assert sum(len(request) for request in transport.sent) == 2
+
+    def test_get_codes(self):
+        """Test code lookups return the raw hex code."""
+        eth, _ = self.make_eth(
+            {"eth_getCode": lambda params: "0x6000" if params[0] == ALICE else "0x"}
+        )
+
+        assert eth.get_codes([ALICE, BOB]) == {ALICE: "0x6000", BOB: "0x"}
+
+    def test_get_storage_at_keys_by_address_and_slot(self):
+        """Test storage lookups are keyed by (address, slot)."""
+        slot_1 = "0x" + "00" * 31 + "01"
+        slot_2 = "0x" + "00" * 31 + "02"
+        eth, _ = self.make_eth(
+            {"eth_getStorageAt": lambda params: params[1].replace("0x00", "0xff", 1)}
+        )
+
+        values = eth.get_storage_at([(ALICE, slot_1), (ALICE, slot_2), (ALICE, slot_1)])
+
+        assert len(values) == 2
+        assert values[(ALICE, slot_2)] == "0xff" + "00" * 30 + "02"
+
+    def test_error_in_any_call_raises(self):
+        """Test an error for one key fails the bulk lookup."""
+        eth, _ = self.make_eth({})
+
+        with pytest.raises(RPCError):
+            eth.get_balances([ALICE])
+
+    def test_empty_input(self):
+        """Test no keys means no requests."""
+        eth, transport = self.make_eth({})
+
+        assert eth.get_balances([]) == {}
+        assert transport.sent == []
+
+
+class TestCodeAwareTracing:
+    """Test suite for tracing with disableCode and a bytecode cache."""
+
+    CODE_1 = "0x600160005500"
+    CODE_2 = "0x600260005500"
+    HASH_1 = "0x" + "01" * 32
+    HASH_2 = "0x" + "02" * 32
+
+    def make_node(self, block_traces: list, final_codes: dict, tx_codes: dict):
+        handlers = {
+            "debug_traceBlockByNumber": lambda params: block_traces,
+            "eth_getCode": lambda params: final_codes[params[0]],
+            "debug_traceTransaction": lambda params: {
+                "pre": {},
+                "post": {ALICE: {"code": tx_codes[params[0]]}},
+            },
+        }
+        return FakeTransport(handlers)
+
+    def test_tracer_options_are_sent(self):
+        """Test disableCode is passed to the prestate tracer."""
+        transport = self.make_node([], {}, {})
+        EthereumMethods(RPCClient(transport)).trace_block_code_aware(1)
+
+        config = transport.sent[0]["params"][1]
+        assert config["tracer"] == "prestateTracer"
+        assert config["tracerConfig"] == {"diffMode": True, "disableCode": True}
+
+    def test_changed_code_is_fetched_once_and_cached(self):
+        """Test only changed code is fetched and later blocks hit the cache."""
+        traces = [
+            {
+                "txHash": tx_hash(0),
+                "result": {
+                    "pre": {
+                        ALICE: {"balance": "0x0"},
+                        BOB: {"codeHash": self.HASH_2, "nonce": 1},
+                    },
+                    "post": {ALICE: {"codeHash": self.HASH_1, "nonce": 1}},
+                },
+            }
+        ]
+        transport = self.make_node(traces, {ALICE: self.CODE_1}, {})
+        eth = EthereumMethods(RPCClient(transport))
+
+        first = eth.trace_block_code_aware(1)
+        second = eth.trace_block_code_aware(2)
+
+        assert first[0].result.post[ALICE].code == self.CODE_1
+        assert second[0].result.post[ALICE].code == self.CODE_1
+        assert first[0].result.pre[BOB].code is None
+        assert sent_methods(transport).count("eth_getCode") == 1
+
+    def test_code_overwritten_within_block(self):
+        """Test an earlier code change is recovered from its own transaction."""
+        traces = [
+            {
+                "txHash": tx_hash(position),
+                "result": {
+                    "pre": {ALICE: {"codeHash": pre_hash}},
+                    "post": {ALICE: {"codeHash": post_hash}},
+                },
+            }
+            for position, (pre_hash, post_hash) in enumerate(
+                [("0x" + "00" * 32, self.HASH_1), (self.HASH_1, self.HASH_2)]
+            )
+        ]
+        transport = self.make_node(
+            traces, {ALICE: self.CODE_2}, {tx_hash(0): self.CODE_1}
+        )
+
+        result = EthereumMethods(RPCClient(transport)).trace_block_code_aware(1)
+
+        assert result[0].result.post[ALICE].code == self.CODE_1
+        assert result[1].result.post[ALICE].code == self.CODE_2
+        retrace = [
+            request for request in transport.sent
+            if isinstance(request, dict) and request["method"] == "debug_traceTransaction"
+        ]
+        assert retrace[0]["params"][1]["tracerConfig"]["disableStorage"] is True
+
+
+class TestTraceBlockWithReads:
+    """Test suite for fetching diff-mode and full prestate traces together."""
+
+    def test_pairs_are_yielded_in_order(self):
+        """Test both tracer modes are requested and paired per transaction."""
+        slot = "0x" + "00" * 32
+
+        def trace(params):
+            if params[1]["tracerConfig"]["diffMode"]:
+                return [{"txHash": tx_hash(i), "result": prestate(i)} for i in range(3)]
+            return [
+                {"txHash": tx_hash(i), "result": {ALICE: {"storage": {slot: slot}}}}
+                for i in range(3)
+            ]
+
+        transport = FakeTransport({"debug_traceBlockByNumber": trace})
+        eth = EthereumMethods(RPCClient(transport))
+
+        pairs = list(eth.trace_block_with_reads(5))
+
+        assert [diff.txHash for diff, _ in pairs] == [tx_hash(i) for i in range(3)]
+        assert all(full.result[ALICE].storage == {slot: slot} for _, full in pairs)
+        configs = sorted(
+            request["params"][1]["tracerConfig"]["diffMode"] for request in transport.sent
+        )
+        assert configs == [False, True]
+
+    def test_responses_are_streamed(self):
+        """Test the first pair is yielded before either response is fully read."""
+
+        def trace(params):
+            if params[1]["tracerConfig"]["diffMode"]:
+                return [{"txHash": tx_hash(i), "result": prestate(i)} for i in range(50)]
+            return [{"txHash": tx_hash(i), "result": prestate(i)["pre"]} for i in range(50)]
+
+        transport = FakeTransport({"debug_traceBlockByNumber": trace})
+        read = []
+        stream = transport.stream
+
+        def counting_stream(request, chunk_size=64):
+            for chunk in stream(request, chunk_size):
+                read.append(len(chunk))
+                yield chunk
+
+        transport.stream = counting_stream
+        pairs = EthereumMethods(RPCClient(transport)).trace_block_with_reads(5)
+
+        diff, _ = next(pairs)
+
+        assert diff.txHash == tx_hash(0)
+        diff_params = [None, {"tracerConfig": {"diffMode": True}}]
+        full_params = [None, {"tracerConfig": {"diffMode": False}}]
+        bodies = [trace(diff_params), trace(full_params)]
+        assert sum(read) < len(json.dumps(bodies)) // 2
+        assert len(list(pairs)) == 49
+
+    def test_length_mismatch_raises(self):
+        """Test traces of different lengths are rejected."""
+
+        def trace(params):
+            count = 2 if params[1]["tracerConfig"]["diffMode"] else 1
+            return [{"txHash": tx_hash(i), "result": {}} for i in range(count)]
+
+        eth = EthereumMethods(RPCClient(FakeTransport({"debug_traceBlockByNumber": trace})))
+
+        with pytest.raises(ValueError):
+            list(eth.trace_block_with_reads(5))
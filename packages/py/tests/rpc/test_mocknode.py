@@ -0,0 +1,230 @@
+"""Tests for the local mock JSON-RPC node."""
+
+import base64
+import json
+import os
+import socket
+import tempfile
+import time
+
+import httpx
+import pytest
+
+from pokebal.bal.builder import from_execution_trace
+from pokebal.rpc.client import RPCClient, RPCError
+from pokebal.rpc.methods import EthereumMethods
+from pokebal.rpc.mocknode import (
+    FaultProfile,
+    LatencyProfile,
+    MockNode,
+    MockNodeConfig,
+    RecordedResponses,
+    SyntheticChain,
+)
+from pokebal.rpc.transport import HTTPTransport
+
+
+def echo_handlers() -> dict:
+    return {
+        "echo": lambda params: params,
+        "fail": lambda params: (_ for _ in ()).throw(RPCError({"code": 3, "message": "reverted"})),
+    }
+
+
+@pytest.fixture
+def serve():
+    """Start a MockNode over HTTP and return an RPC client for it."""
+    nodes = []
+    transports = []
+
+    def start(handlers, config=None):
+        node = MockNode(handlers, config)
+        nodes.append(node)
+        transport = HTTPTransport(node.serve_http())
+        transports.append(transport)
+        return node, RPCClient(transport)
+
+    yield start
+
+    for transport in transports:
+        transport.close()
+    for node in nodes:
+        node.close()
+
+
+class TestHTTP:
+    """Test suite for the HTTP endpoint."""
+
+    def test_call_and_batch(self, serve):
+        """Test single calls and batches are answered by id."""
+        node, client = serve(echo_handlers())
+
+        assert client.call("echo", [1, "a"]) == [1, "a"]
+        results = client.call_batch([("echo", [1]), ("missing", []), ("fail", [])])
+
+        assert results[0] == [1]
+        assert isinstance(results[1], RPCError) and results[1].code == -32601
+        assert isinstance(results[2], RPCError) and results[2].code == 3
+        assert node.stats().requests == 2
+        assert node.stats().calls == 4
+
+    def test_synthetic_chain_builds(self, serve):
+        """Test EthereumMethods and the builder run against a synthetic chain."""
+        chain = SyntheticChain(txs_per_block=5)
+        _, client = serve(chain.handlers())
+        eth = EthereumMethods(client)
+
+        bal = from_execution_trace(eth.trace_block(10))
+
+        assert eth.get_block_number() == chain.head
+        assert len(bal.account_changes) > 0
+        assert any(account.storage_changes for account in bal.account_changes)
+
+    def test_synthetic_chain_is_deterministic(self):
+        """Test the same seed yields the same traces."""
+        first = SyntheticChain(seed=7).handlers()["debug_traceBlockByNumber"](["0xa"])
+        second = SyntheticChain(seed=7).handlers()["debug_traceBlockByNumber"](["0xa"])
+        other = SyntheticChain(seed=8).handlers()["debug_traceBlockByNumber"](["0xa"])
+
+        assert first == second
+        assert first != other
+
+    def test_trace_transaction_matches_block_trace(self):
+        """Test per-transaction traces agree with the block trace."""
+        handlers = SyntheticChain(txs_per_block=3).handlers()
+        block = handlers["debug_traceBlockByNumber"](["0x5"])
+
+        for entry in block:
+            assert handlers["debug_traceTransaction"]([entry["txHash"]]) == entry["result"]
+
+    def test_recorded_responses(self, serve):
+        """Test recorded results are served by method and params."""
+        recorded = RecordedResponses()
+        recorded.record("eth_getBalance", ["0x01", "latest"], "0x10")
+        _, client = serve(recorded.handlers())
+
+        assert client.call("eth_getBalance", ["0x01", "latest"]) == "0x10"
+        with pytest.raises(RPCError):
+            client.call("eth_getBalance", ["0x02", "latest"])
+
+
+class TestInjection:
+    """Test suite for latency, faults and bandwidth."""
+
+    def test_constant_latency(self, serve):
+        """Test every request waits at least the configured latency."""
+        config = MockNodeConfig(latency=LatencyProfile(mean=0.05))
+        _, client = serve(echo_handlers(), config)
+
+        start = time.monotonic()
+        client.call("echo")
+        client.call("echo")
+
+        assert time.monotonic() - start >= 0.1
+
+    def test_latency_distributions_are_seeded(self):
+        """Test samples are reproducible and bounded as configured."""
+        import random
+
+        profile = LatencyProfile(distribution="lognormal", mean=0.01, spread=1.0)
+        first = [profile.sample(random.Random(1)) for _ in range(3)]
+        second = [profile.sample(random.Random(1)) for _ in range(3)]
+        uniform = LatencyProfile(distribution="uniform", mean=0.01, spread=0.005)
+
+        assert first == second
+        assert all(
+            0.005 <= uniform.sample(random.Random(seed)) <= 0.015 for seed in range(20)
+        )
+
+    def test_rpc_error_injection(self, serve):
+        """Test injected errors surface as RPCError."""
+        config = MockNodeConfig(faults=FaultProfile(error_rate=1.0, error_code=-32005))
+        node, client = serve(echo_handlers(), config)
+
+        with pytest.raises(RPCError) as excinfo:
+            client.call("echo")
+
+        assert excinfo.value.code == -32005
+        assert node.stats().injected_errors == 1
+
+    def test_http_error_injection(self, serve):
+        """Test injected HTTP failures use the configured status."""
+        config = MockNodeConfig(faults=FaultProfile(http_error_rate=1.0, http_status=429))
+        _, client = serve(echo_handlers(), config)
+
+        with pytest.raises(httpx.HTTPStatusError) as excinfo:
+            client.call("echo")
+
+        assert excinfo.value.response.status_code == 429
+
+    def test_bandwidth_throttling(self, serve):
+        """Test large responses are paced to the configured bandwidth."""
+        config = MockNodeConfig(bandwidth=1_000_000)
+        node, client = serve({"blob": lambda params: "ff" * 100_000}, config)
+
+        start = time.monotonic()
+        client.call("blob")
+
+        assert time.monotonic() - start >= 0.18
+        assert node.stats().bytes_sent > 200_000
+
+
+class TestOtherEndpoints:
+    """Test suite for the IPC and WebSocket endpoints."""
+
+    def test_ipc(self):
+        """Test concatenated requests over a unix socket are each answered."""
+        path = os.path.join(tempfile.mkdtemp(), "node.ipc")
+        with MockNode(echo_handlers()) as node:
+            node.serve_ipc(path)
+            with socket.socket(socket.AF_UNIX) as sock:
+                sock.connect(path)
+                request = json.dumps({"jsonrpc": "2.0", "id": 1, "method": "echo", "params": [1]})
+                batch = json.dumps([{"jsonrpc": "2.0", "id": 2, "method": "echo", "params": [2]}])
+                payload = (request + batch).encode()
+                # Split mid-value to exercise buffering
+                sock.sendall(payload[:10])
+                time.sleep(0.01)
+                sock.sendall(payload[10:])
+
+                reader = sock.makefile("rb")
+                first = json.loads(reader.readline())
+                second = json.loads(reader.readline())
+
+        assert first["result"] == [1]
+        assert second[0]["result"] == [2]
+        assert not os.path.exists(path)
+
+    def test_websocket(self):
+        """Test a masked text frame is answered with a text frame."""
+        with MockNode(echo_handlers()) as node:
+            host, port = node.serve_websocket()[len("ws://") :].split(":")
+            with socket.create_connection((host, int(port))) as sock:
+                key = base64.b64encode(b"0123456789abcdef").decode()
+                sock.sendall(
+                    (
+                        f"GET / HTTP/1.1\r\nHost: {host}\r\nUpgrade: websocket\r\n"
+                        f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n"
+                        "Sec-WebSocket-Version: 13\r\n\r\n"
+                    ).encode()
+                )
+                reader = sock.makefile("rb")
+                assert b"101" in reader.readline()
+                while reader.readline() not in (b"\r\n", b""):
+                    pass
+
+                body = json.dumps(
+                    {"jsonrpc": "2.0", "id": 1, "method": "echo", "params": ["x" * 200]}
+                ).encode()
+                mask = b"\x01\x02\x03\x04"
+                masked = bytes(byte ^ mask[index % 4] for index, byte in enumerate(body))
+                sock.sendall(bytes([0x81, 0x80 | 126]) + len(body).to_bytes(2, "big") + mask + masked)
+
+                header = reader.read(2)
+                length = header[1] & 0x7F
+                if length == 126:
+                    length = int.from_bytes(reader.read(2), "big")
+                response = json.loads(reader.read(length))
+
+        assert header[0] == 0x81
+        assert response["result"] == ["x" * 200]
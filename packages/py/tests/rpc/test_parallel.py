@@ -0,0 +1,133 @@
+"""Tests for multi-core decoding of large trace responses."""
+
+import json
+
+import pytest
+
+from pokebal.bal.builder import from_execution_trace, from_trace_body
+from pokebal.rpc import parallel
+from pokebal.rpc.client import RPCClient, RPCError
+from pokebal.rpc.methods import EthereumMethods
+from pokebal.rpc.mocknode import MockNode, SyntheticChain
+from pokebal.rpc.parallel import (
+    decode_block_trace,
+    exact_trace_ranges,
+    guess_trace_ranges,
+    map_trace_slices,
+)
+from pokebal.rpc.transport import HTTPTransport
+from pokebal.rpc.types import TransactionTrace
+
+CHAIN = SyntheticChain(txs_per_block=40, slots_per_tx=3)
+
+
+def trace_result(number: int = 1) -> list:
+    return CHAIN.handlers()["debug_traceBlockByNumber"]([hex(number)])
+
+
+def response_body(result, indent=None) -> bytes:
+    return json.dumps({"jsonrpc": "2.0", "id": 1, "result": result}, indent=indent).encode()
+
+
+def expected_traces(result) -> list:
+    return [TransactionTrace.model_validate(item) for item in result]
+
+
+@pytest.fixture
+def parallel_always(monkeypatch):
+    """Use worker processes regardless of body size."""
+    monkeypatch.setattr(parallel, "MIN_PARALLEL_BYTES", 0)
+
+
+class TestRanges:
+    """Test suite for cutting the result array."""
+
+    @pytest.mark.parametrize("indent", [None, 2])
+    def test_guessed_ranges_hold_whole_elements(self, indent):
+        """Test each guessed range parses as a run of complete traces."""
+        body = response_body(trace_result(), indent)
+
+        ranges = guess_trace_ranges(body, 6)
+
+        assert len(ranges) > 1
+        decoded = [
+            item for start, end in ranges for item in json.loads(b"[" + body[start:end] + b"]")
+        ]
+        assert decoded == trace_result()
+
+    def test_exact_ranges_match_guessed(self):
+        """Test the exact scan cuts at element boundaries too."""
+        body = response_body(trace_result())
+
+        ranges = exact_trace_ranges(body, 5)
+
+        decoded = [
+            item for start, end in ranges for item in json.loads(b"[" + body[start:end] + b"]")
+        ]
+        assert decoded == trace_result()
+
+    def test_error_body(self):
+        """Test an error response raises RPCError."""
+        body = json.dumps({"jsonrpc": "2.0", "id": 1, "error": {"code": -32000, "message": "x"}})
+
+        with pytest.raises(RPCError):
+            map_trace_slices(body.encode())
+
+    def test_empty_result(self):
+        """Test an empty block decodes to no traces."""
+        assert decode_block_trace(response_body([])) == []
+
+
+class TestDecode:
+    """Test suite for decoding in worker processes."""
+
+    def test_in_process(self):
+        """Test a small body is decoded in the calling process."""
+        result = trace_result()
+        assert decode_block_trace(response_body(result)) == expected_traces(result)
+
+    def test_workers(self, parallel_always):
+        """Test decoding through shared memory and a process pool."""
+        result = trace_result()
+        assert decode_block_trace(response_body(result), workers=2) == expected_traces(result)
+
+    def test_wrong_guess_falls_back_to_exact_scan(self, parallel_always):
+        """Test cuts landing inside a trace are detected and redone."""
+        result = trace_result()
+        # Strings holding the cut pattern, and nested arrays of objects
+        body = response_body(
+            [dict(item, note="},{" * 2000, calls=[{"a": 1}, {"b": 2}]) for item in result]
+        )
+
+        traces = decode_block_trace(body, workers=2)
+
+        assert [trace.txHash for trace in traces] == [item["txHash"] for item in result]
+
+    def test_invalid_trace(self, parallel_always):
+        """Test an invalid trace raises ValueError."""
+        result = trace_result()
+        result[3]["result"] = "bad"
+
+        with pytest.raises(ValueError):
+            decode_block_trace(response_body(result), workers=2)
+
+
+class TestFromTraceBody:
+    """Test suite for building BALs from raw bodies in parallel."""
+
+    @pytest.mark.parametrize("workers", [1, 3])
+    def test_matches_sequential_build(self, parallel_always, workers):
+        """Test merged per-slice BALs equal a whole-block build."""
+        result = trace_result(4)
+
+        bal = from_trace_body(response_body(result), workers=workers)
+
+        assert bal == from_execution_trace(expected_traces(result))
+
+    def test_trace_block_raw(self):
+        """Test the raw body fetched over HTTP builds the same BAL."""
+        with MockNode(CHAIN.handlers()) as node:
+            eth = EthereumMethods(RPCClient(HTTPTransport(node.serve_http())))
+            body = eth.trace_block_raw(9)
+
+            assert from_trace_body(body) == from_execution_trace(eth.trace_block(9))
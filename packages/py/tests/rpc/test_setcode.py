@@ -0,0 +1,71 @@
+"""Tests for recovering EIP-7702 authorities."""
+
+from coincurve import PrivateKey
+
+from pokebal.rpc.setcode import (
+    _N,
+    authorization_hash,
+    block_authorities,
+    recover_address,
+    recover_authority,
+)
+
+# Address of private key 1
+KEY_1_ADDRESS = "0x7e5f4552091a69125d5dfcb7b8c2659029395bdf"
+# Address of private key 2
+KEY_2_ADDRESS = "0x2b5ad5c4795c026514f8317c7a215e218dccd6cf"
+DELEGATE = "0x" + "de" * 20
+
+
+def sign_authorization(private_key: int, chain_id: int, address: str, nonce: int) -> dict:
+    """Sign an authorization tuple, in the layout nodes return over RPC."""
+    digest = authorization_hash(chain_id, address, nonce)
+    signature = PrivateKey.from_int(private_key).sign_recoverable(digest, hasher=None)
+    r, s = int.from_bytes(signature[:32], "big"), int.from_bytes(signature[32:64], "big")
+    y_parity = signature[64]
+    return {
+        "chainId": hex(chain_id),
+        "address": address,
+        "nonce": hex(nonce),
+        "yParity": hex(y_parity),
+        "r": hex(r),
+        "s": hex(s),
+    }
+
+
+class TestRecoverAuthority:
+    """Test suite for authority recovery."""
+
+    def test_known_keys(self):
+        """Test authorities signed with known keys are recovered."""
+        assert recover_authority(sign_authorization(1, 1, DELEGATE, 0)) == KEY_1_ADDRESS
+        assert recover_authority(sign_authorization(2, 7, DELEGATE, 5)) == KEY_2_ADDRESS
+
+    def test_invalid_signatures(self):
+        """Test malleable and out of range signatures are rejected."""
+        authorization = sign_authorization(1, 1, DELEGATE, 0)
+        digest = authorization_hash(1, DELEGATE, 0)
+        r, s = int(authorization["r"], 16), int(authorization["s"], 16)
+        y_parity = int(authorization["yParity"], 16)
+
+        assert recover_address(digest, y_parity ^ 1, r, _N - s) is None
+        assert recover_address(digest, y_parity, 0, s) is None
+        assert recover_address(digest, 2, r, s) is None
+        # No curve point has x = 5
+        assert recover_address(digest, y_parity, 5, s) is None
+
+    def test_block_authorities(self):
+        """Test only set-code transactions are mapped, by index."""
+        transactions = [
+            {"type": "0x2"},
+            {
+                "type": "0x4",
+                "authorizationList": [
+                    sign_authorization(1, 1, DELEGATE, 0),
+                    sign_authorization(2, 1, DELEGATE, 0),
+                    sign_authorization(1, 1, DELEGATE, 1),
+                ],
+            },
+        ]
+
+        assert block_authorities(transactions) == {"1": [KEY_1_ADDRESS, KEY_2_ADDRESS]}
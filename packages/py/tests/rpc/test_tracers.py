@@ -0,0 +1,323 @@
+"""Tests for the compact BAL tracer and its decoder."""
+
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from pokebal.bal.builder import from_compact_trace
+from pokebal.rpc.client import RPCClient
+from pokebal.rpc.methods import EthereumMethods
+from pokebal.rpc.tracers import COMPACT_BAL_TRACER
+from pokebal.rpc.types import CompactAccountRecord
+
+from .fakes import FakeTransport
+from .test_setcode import KEY_1_ADDRESS, sign_authorization
+
+ALICE = "0x" + "aa" * 20
+BOB = "0x" + "bb" * 20
+AUTHORITY = KEY_1_ADDRESS
+COINBASE = "0x" + "c0" * 20
+CONTRACT = "0x" + "cc" * 20
+DELEGATE = "0x" + "de" * 20
+DESIGNATOR = "0xef0100" + "de" * 20
+SLOT_1 = "0x" + "00" * 31 + "01"
+SLOT_2 = "0x" + "00" * 31 + "02"
+VALUE_9 = "0x" + "00" * 31 + "09"
+
+COMPACT_RESULT = [
+    {
+        "txHash": "0x" + "11" * 32,
+        "result": [
+            [CONTRACT, "0x5", None, None, [SLOT_2, VALUE_9], [SLOT_1]],
+            [ALICE, "0x50", 1, None, [], []],
+        ],
+    }
+]
+
+
+class TestCompactAccountRecord:
+    """Test suite for decoding the compact array layout."""
+
+    def test_decode_array_layout(self):
+        """Test the positional array is decoded into named fields."""
+        record = CompactAccountRecord.model_validate(COMPACT_RESULT[0]["result"][0])
+
+        assert record.address == CONTRACT
+        assert record.balance == "0x5"
+        assert record.nonce is None
+        assert record.code is None
+        assert record.storage_writes == {SLOT_2: VALUE_9}
+        assert record.storage_reads == [SLOT_1]
+
+    def test_decode_named_layout(self):
+        """Test records can also be validated from named fields."""
+        record = CompactAccountRecord.model_validate({"address": ALICE, "nonce": 3})
+
+        assert record.nonce == 3
+        assert record.storage_writes == {}
+
+
+# Runs a tracer against a stub of geth's JavaScript tracer API. The input
+# holds the state at the first step, the steps (opcodes, or state changes
+# they made), the changes made after execution, the context and the config.
+GETH_STUB = r"""
+const input = JSON.parse(require("fs").readFileSync(0, "utf8"));
+
+function fromHex(hex) {
+    hex = hex.replace(/^0x/, "");
+    if (hex.length % 2) hex = "0" + hex;
+    const bytes = new Uint8Array(hex.length / 2);
+    for (let i = 0; i < bytes.length; i++) bytes[i] = parseInt(hex.substr(2 * i, 2), 16);
+    return bytes;
+}
+function pad(bytes, size) {
+    const out = new Uint8Array(size);
+    out.set(bytes.slice(-size), size - Math.min(size, bytes.length));
+    return out;
+}
+function toHex(bytes) {
+    return "0x" + Array.from(bytes, (b) => b.toString(16).padStart(2, "0")).join("");
+}
+function toAddress(value) { return pad(typeof value === "string" ? fromHex(value) : value, 20); }
+function toWord(value) { return pad(typeof value === "string" ? fromHex(value) : value, 32); }
+class Big {
+    constructor(value) { this.value = BigInt(value); }
+    add(other) { return new Big(this.value + other.value); }
+    subtract(other) { return new Big(this.value - other.value); }
+    equals(other) { return this.value === other.value; }
+    toString(radix) { return this.value.toString(radix); }
+}
+function bigInt(value) { return new Big(value); }
+bigInt.zero = new Big(0);
+
+const state = input.state;
+function account(addr) {
+    const key = toHex(toAddress(addr));
+    return state[key] || (state[key] = {balance: "0x0", nonce: 0, code: "0x", storage: {}});
+}
+function apply(changes) {
+    for (const addr in changes) Object.assign(account(addr), changes[addr]);
+}
+const db = {
+    getBalance: (addr) => new Big(account(addr).balance),
+    getNonce: (addr) => account(addr).nonce,
+    getCode: (addr) => fromHex(account(addr).code),
+    getState: (addr, slot) => toWord(account(addr).storage[toHex(slot)] || "0x00"),
+};
+function word(hex) {
+    return {toString: (radix) => BigInt(hex).toString(radix), valueOf: () => Number(BigInt(hex))};
+}
+
+const tracer = eval("(" + input.tracer + ")");
+tracer.setup(input.config);
+for (const step of input.steps) {
+    if (step.set) {
+        apply(step.set);
+        continue;
+    }
+    tracer.step({
+        op: {toString: () => step.op},
+        contract: {getAddress: () => toAddress(step.contract)},
+        stack: {peek: (i) => word(step.stack[i])},
+    }, db);
+}
+apply(input.post);
+const ctx = {
+    type: input.ctx.type,
+    from: toAddress(input.ctx.from),
+    to: toAddress(input.ctx.to),
+    value: bigInt(input.ctx.value),
+    txIndex: input.ctx.txIndex,
+};
+process.stdout.write(JSON.stringify(tracer.result(ctx, db)));
+"""
+
+
+def run_tracer(state, steps, post, ctx, config):
+    """Run COMPACT_BAL_TRACER in Node against the geth API stub."""
+    node = shutil.which("node")
+    if node is None:
+        pytest.skip("node is not installed")
+    document = {
+        "tracer": COMPACT_BAL_TRACER,
+        "state": state,
+        "steps": steps,
+        "post": post,
+        "ctx": ctx,
+        "config": config,
+    }
+    output = subprocess.run(
+        [node, "-e", GETH_STUB],
+        input=json.dumps(document),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    records = [CompactAccountRecord.model_validate(record) for record in json.loads(output)]
+    return {record.address: record for record in records}
+
+
+def eoa(balance: int, nonce: int = 0, code: str = "0x") -> dict:
+    return {"balance": hex(balance), "nonce": nonce, "code": code, "storage": {}}
+
+
+class TestCompactTracerScript:
+    """Test suite running the tracer script against a stub of geth's API."""
+
+    def test_call_with_storage_and_fee(self):
+        """Test storage reads and writes, the sender and the coinbase fee."""
+        # State at the first step: gas bought, nonce bumped, value sent
+        state = {
+            ALICE: eoa(890, nonce=1),
+            CONTRACT: {"balance": hex(10), "nonce": 1, "code": "0x6000", "storage": {}},
+            COINBASE: eoa(50),
+        }
+        state[CONTRACT]["storage"][SLOT_1] = "0x05"
+        steps = [
+            {"op": "SLOAD", "contract": CONTRACT, "stack": [SLOT_1]},
+            {"op": "SSTORE", "contract": CONTRACT, "stack": [SLOT_2]},
+            {"set": {CONTRACT: {"storage": {SLOT_1: "0x05", SLOT_2: VALUE_9}}}},
+        ]
+        # Gas refund and the coinbase fee come after execution
+        post = {ALICE: {"balance": hex(910)}, COINBASE: {"balance": hex(80)}}
+        ctx = {"type": "CALL", "from": ALICE, "to": CONTRACT, "value": 10, "txIndex": 0}
+
+        records = run_tracer(state, steps, post, ctx, {"coinbase": COINBASE})
+
+        assert records[CONTRACT].balance == hex(10)
+        assert records[CONTRACT].storage_writes == {SLOT_2: VALUE_9}
+        assert records[CONTRACT].storage_reads == [SLOT_1]
+        assert (records[ALICE].balance, records[ALICE].nonce) == (hex(910), 1)
+        assert records[COINBASE].balance == hex(80)
+
+    def test_transfer_without_steps(self):
+        """Test a plain transfer, where every account is first seen in result."""
+        state = {ALICE: eoa(980, nonce=3), BOB: eoa(15), COINBASE: eoa(7)}
+        ctx = {"type": "CALL", "from": ALICE, "to": BOB, "value": 10, "txIndex": 0}
+
+        records = run_tracer(state, [], {}, ctx, {"coinbase": COINBASE})
+
+        assert records[BOB].balance == hex(15)
+        assert records[BOB].nonce is None
+        assert records[ALICE].nonce == 3
+        assert records[COINBASE].balance == hex(7)
+
+    def test_coinbase_touched_during_execution(self):
+        """Test a coinbase seen before the fee is compared like other accounts."""
+        state = {ALICE: eoa(900, nonce=1), CONTRACT: eoa(0, code="0x6000"), COINBASE: eoa(50)}
+        steps = [{"op": "BALANCE", "contract": CONTRACT, "stack": [COINBASE]}]
+        ctx = {"type": "CALL", "from": ALICE, "to": CONTRACT, "value": 0, "txIndex": 0}
+
+        records = run_tracer(state, steps, {}, ctx, {"coinbase": COINBASE})
+
+        assert records[COINBASE].balance is None
+
+    def test_set_code_authority(self):
+        """Test the nonce and code an authorization set before the first step."""
+        state = {
+            ALICE: eoa(900, nonce=1),
+            AUTHORITY: eoa(0, nonce=1, code=DESIGNATOR),
+            DELEGATE: eoa(0, code="0x6000"),
+            COINBASE: eoa(50),
+        }
+        steps = [{"op": "SLOAD", "contract": AUTHORITY, "stack": [SLOT_1]}]
+        ctx = {"type": "CALL", "from": ALICE, "to": AUTHORITY, "value": 0, "txIndex": 1}
+        config = {"coinbase": COINBASE, "authorities": {"1": [AUTHORITY]}}
+
+        records = run_tracer(state, steps, {COINBASE: {"balance": hex(60)}}, ctx, config)
+
+        assert records[AUTHORITY].nonce == 1
+        assert records[AUTHORITY].code == DESIGNATOR
+        assert records[AUTHORITY].storage_reads == [SLOT_1]
+        assert records[COINBASE].balance == hex(60)
+
+
+# Compact tracer output for a block of two transactions: the first pays the
+# coinbase a fee and sets AUTHORITY's code, the second pays no priority fee
+RECORDED_BLOCK = [
+    {
+        "txHash": "0x" + "11" * 32,
+        "result": [
+            [AUTHORITY, None, 1, DESIGNATOR, [], []],
+            [ALICE, "0x384", 1, None, [], []],
+            [COINBASE, "0x3c", None, None, [], []],
+        ],
+    },
+    {
+        "txHash": "0x" + "22" * 32,
+        "result": [
+            [BOB, "0x5", None, None, [], []],
+            [ALICE, "0x37a", 2, None, [], []],
+            [COINBASE, "0x3c", None, None, [], []],
+        ],
+    },
+]
+
+PARENT_STATE = {
+    "eth_getBalance": {ALICE: 1000, AUTHORITY: 0, COINBASE: 50},
+    "eth_getTransactionCount": {AUTHORITY: 0, COINBASE: 0},
+    "eth_getCode": {AUTHORITY: "0x", COINBASE: "0x"},
+}
+
+
+class TestTraceBlockCompact:
+    """Test suite for EthereumMethods.trace_block_compact."""
+
+    def transport(self, trace=RECORDED_BLOCK):
+        block = {
+            "miner": COINBASE,
+            "transactions": [
+                {"type": "0x4", "authorizationList": [sign_authorization(1, 1, DELEGATE, 0)]},
+                {"type": "0x2"},
+            ],
+        }
+        return FakeTransport(
+            {
+                "eth_getBlockByNumber": lambda params: block,
+                "debug_traceBlockByNumber": lambda params: trace,
+                "eth_getBalance": lambda params: hex(
+                    PARENT_STATE["eth_getBalance"][params[0]]
+                ),
+                "eth_getTransactionCount": lambda params: hex(
+                    PARENT_STATE["eth_getTransactionCount"][params[0]]
+                ),
+                "eth_getCode": lambda params: PARENT_STATE["eth_getCode"][params[0]],
+            }
+        )
+
+    def test_sends_bundled_tracer(self):
+        """Test the bundled JS tracer is passed with the block's coinbase."""
+        transport = self.transport(COMPACT_RESULT)
+
+        traces = EthereumMethods(RPCClient(transport)).trace_block_compact(10)
+
+        trace_request = next(
+            request
+            for request in transport.sent
+            if isinstance(request, dict) and request["method"] == "debug_traceBlockByNumber"
+        )
+        assert trace_request["params"] == [
+            hex(10),
+            {
+                "tracer": COMPACT_BAL_TRACER,
+                "tracerConfig": {"coinbase": COINBASE, "authorities": {"0": [AUTHORITY]}},
+            },
+        ]
+        assert traces[0].result[1].address == ALICE
+        assert traces[0].result[1].nonce == 1
+
+    def test_recorded_block(self):
+        """Test replaying tracer output keeps fees and drops no-op coinbase values."""
+        traces = EthereumMethods(RPCClient(self.transport())).trace_block_compact(10)
+
+        bal = from_compact_trace(traces)
+
+        accounts = {account.address: account for account in bal.account_changes}
+        coinbase = accounts[COINBASE]
+        assert [(c.tx_index, c.post_balance) for c in coinbase.balance_changes] == [(0, 60)]
+        authority = accounts[AUTHORITY]
+        assert [(c.tx_index, c.new_nonce) for c in authority.nonce_changes] == [(0, 1)]
+        assert [(c.tx_index, c.new_code) for c in authority.code_changes] == [(0, DESIGNATOR)]
+        assert [c.new_nonce for c in accounts[ALICE].nonce_changes] == [1, 2]
@@ -0,0 +1,203 @@
+"""Tests for HTTPTransport bounded-memory downloads."""
+
+import threading
+import time
+
+import pytest
+
+from pokebal.rpc.client import RPCClient, RPCError
+from pokebal.rpc.methods import EthereumMethods
+from pokebal.rpc.mocknode import LatencyProfile, MockNode, MockNodeConfig, SyntheticChain
+from pokebal.rpc.transport import (
+    ByteBudget,
+    DownloadPolicy,
+    HTTPTransport,
+    ResponseTooLargeError,
+)
+
+CHAIN = SyntheticChain(txs_per_block=50, slots_per_tx=4)
+
+
+@pytest.fixture
+def node():
+    handlers = CHAIN.handlers()
+    handlers["object"] = lambda params: {str(index): "ab" * 100 for index in range(200)}
+    handlers["fail"] = lambda params: (_ for _ in ()).throw(
+        RPCError({"code": 1, "message": "x" * 50_000})
+    )
+    config = MockNodeConfig(latency=LatencyProfile(mean=0.01))
+    with MockNode(handlers, config) as node:
+        yield node
+
+
+def spy_spills(transport: HTTPTransport) -> list:
+    """Record every spill of a transport to disk."""
+    spills = []
+    spill = transport._spill
+
+    def record(buffer):
+        spills.append(len(buffer.getbuffer()))
+        return spill(buffer)
+
+    transport._spill = record
+    return spills
+
+
+class TestSpillToDisk:
+    """Test suite for responses written to temporary files."""
+
+    def test_spilled_response_decodes_identically(self, node):
+        """Test a spilled block trace equals the in-memory decode."""
+        url = node.serve_http()
+        plain = RPCClient(HTTPTransport(url))
+        transport = HTTPTransport(url, download=DownloadPolicy(spill_threshold=10_000))
+        spills = spy_spills(transport)
+
+        expected = plain.call("debug_traceBlockByNumber", ["0x3"])
+        result = RPCClient(transport).call("debug_traceBlockByNumber", ["0x3"])
+
+        assert result == expected
+        assert len(spills) == 1
+        assert transport.last_response_size > 10_000
+
+    def test_small_responses_stay_in_memory(self, node):
+        """Test bodies under the threshold are not spilled."""
+        transport = HTTPTransport(node.serve_http(), download=DownloadPolicy())
+        spills = spy_spills(transport)
+
+        assert EthereumMethods(RPCClient(transport)).get_block_number() == CHAIN.head
+        assert spills == []
+
+    @pytest.mark.parametrize(
+        "method, check",
+        [
+            ("object", lambda result: len(result) == 200),
+            ("eth_getBalance", lambda result: result.startswith("0x")),
+        ],
+    )
+    def test_spilled_non_array_results(self, node, method, check):
+        """Test object and scalar results survive spilling."""
+        policy = DownloadPolicy(spill_threshold=100)
+        client = RPCClient(HTTPTransport(node.serve_http(), download=policy))
+
+        assert check(client.call(method, ["0x" + "00" * 20, "latest"]))
+
+    def test_spilled_error(self, node):
+        """Test a large error response still raises RPCError."""
+        policy = DownloadPolicy(spill_threshold=1_000)
+        client = RPCClient(HTTPTransport(node.serve_http(), download=policy))
+
+        with pytest.raises(RPCError):
+            client.call("fail")
+
+    def test_spilled_batch(self, node):
+        """Test batch responses can be spilled."""
+        policy = DownloadPolicy(spill_threshold=100)
+        client = RPCClient(HTTPTransport(node.serve_http(), download=policy))
+
+        results = client.call_batch([("eth_blockNumber", [])] * 20)
+
+        assert results == [hex(CHAIN.head)] * 20
+
+
+class TestLimits:
+    """Test suite for size caps and the shared byte budget."""
+
+    def test_size_cap(self, node):
+        """Test responses over the cap are rejected."""
+        policy = DownloadPolicy(max_response_bytes=5_000)
+        client = RPCClient(HTTPTransport(node.serve_http(), download=policy))
+
+        with pytest.raises(ResponseTooLargeError):
+            client.call("debug_traceBlockByNumber", ["0x1"])
+
+    def test_size_cap_on_streams(self, node):
+        """Test streamed responses over the cap are rejected, announced or not."""
+        policy = DownloadPolicy(max_response_bytes=5_000)
+        transport = HTTPTransport(node.serve_http(), download=policy)
+        eth = EthereumMethods(RPCClient(transport))
+
+        with pytest.raises(ResponseTooLargeError):
+            eth.trace_block_raw(1)
+
+        # Without the announced length, the cap applies to the bytes received
+        transport._reserve_announced = lambda response: 0
+        request = {"jsonrpc": "2.0", "id": 1, "method": "debug_traceBlockByNumber"}
+        chunks = []
+        with pytest.raises(ResponseTooLargeError):
+            for chunk in transport.stream({**request, "params": ["0x1"]}, chunk_size=1_000):
+                chunks.append(chunk)
+        assert 0 < sum(map(len, chunks)) <= 5_000
+
+    def test_streams_reserve_from_budget(self, node):
+        """Test a stream holds its bytes in the budget until it ends."""
+        budget = ByteBudget(1 << 30)
+        transport = HTTPTransport(node.serve_http(), download=DownloadPolicy(), budget=budget)
+        stream = RPCClient(transport).stream("debug_traceBlockByNumber", ["0x1"])
+
+        first = next(stream)
+        assert budget.used >= len(first)
+        body = first + b"".join(stream)
+
+        assert budget.used == 0
+        assert body.startswith(b"{")
+
+    def test_budget_backpressure(self, node):
+        """Test concurrent downloads stay within the in-flight budget."""
+        url = node.serve_http()
+        plain = HTTPTransport(url)
+        RPCClient(plain).call("debug_traceBlockByNumber", ["0x1"])
+        size = plain.last_response_size
+        peaks = []
+
+        class RecordingBudget(ByteBudget):
+            def reserve(self, amount, wait=True):
+                super().reserve(amount, wait)
+                peaks.append(self.used)
+
+        budget = RecordingBudget(int(size * 1.5))
+        transport = HTTPTransport(url, download=DownloadPolicy(), budget=budget)
+        client = RPCClient(transport)
+
+        threads = [
+            threading.Thread(target=client.call, args=("debug_traceBlockByNumber", ["0x1"]))
+            for _ in range(6)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(peaks) == 6
+        assert max(peaks) <= budget.limit
+        assert budget.used == 0
+
+
+class TestByteBudget:
+    """Test suite for ByteBudget."""
+
+    def test_waits_for_release(self):
+        """Test a reservation that does not fit waits for a release."""
+        budget = ByteBudget(100)
+        budget.reserve(80)
+        acquired = threading.Event()
+
+        def reserve():
+            budget.reserve(50)
+            acquired.set()
+
+        thread = threading.Thread(target=reserve)
+        thread.start()
+        time.sleep(0.05)
+        assert not acquired.is_set()
+
+        budget.release(80)
+        thread.join(timeout=1)
+        assert acquired.is_set()
+        assert budget.used == 50
+
+    def test_oversized_alone_proceeds(self):
+        """Test a reservation larger than the limit proceeds when alone."""
+        budget = ByteBudget(10)
+        budget.reserve(1_000)
+        assert budget.used == 1_000